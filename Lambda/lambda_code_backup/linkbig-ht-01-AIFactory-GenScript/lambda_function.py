@@ -2,8 +2,8 @@ import json
 import os
 import boto3
 import logging
-import re
 from typing import List, Dict, Any
+from structured_output import generate_structured
 
 # --- 클라이언트 및 환경 변수 초기화 ---
 logger = logging.getLogger()
@@ -16,23 +16,26 @@ bedrock_runtime = boto3.client(
     region_name=BEDROCK_REGION
 )
 
-# ----------------------------------------------------------------------
-# 헬퍼 함수
-# ----------------------------------------------------------------------
-
-def extract_json_from_text(text: str):
-    """ LLM 응답 텍스트에서 JSON 객체({...}) 또는 배열([...]) 부분만 스마트하게 추출합니다. """
-    try:
-        # 가장 먼저 발견되는 '{' 또는 '[' 패턴을 찾아 추출
-        match = re.search(r'(\{.*\}|\[.*\])', text, re.DOTALL)
-        
-        if match:
-            json_str = match.group(0)
-            return json.loads(json_str)
-        
-        return json.loads(text)
-    except json.JSONDecodeError:
-        return None
+# 대본 배열 스키마 (Claude는 이 스키마를 입력으로 받는 도구를 호출해 결과를 돌려줍니다)
+SCRIPT_FIELDS = [
+    "source_title", "source_title_kr", "character_name",
+    "dialogue_text", "dialogue_en", "emotion_tag", "scene_prompt",
+]
+SCRIPTS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "scripts": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {field: {"type": "string", "minLength": 1} for field in SCRIPT_FIELDS},
+                "required": SCRIPT_FIELDS,
+            },
+            "minItems": 1,
+        },
+    },
+    "required": ["scripts"],
+}
 
 
 def call_claude_to_generate_scripts(media_type: str, count: int, lang: str, topic: str) -> List[Dict]:
@@ -45,7 +48,7 @@ def call_claude_to_generate_scripts(media_type: str, count: int, lang: str, topi
     system_prompt = (
         "You are an expert scriptwriter for short educational videos, generating content for a Korean language learning app. "
         "Your task is to generate {count} unique, engaging scene descriptions and dialogues. "
-        "The output MUST be a single JSON object with a key 'scripts' containing an array. Ensure all dialogue is in the target language. Respond ONLY with the JSON."
+        "Return the result by calling the 'save_scripts' tool with a key 'scripts' containing an array. Ensure all dialogue is in the target language."
     )
     
     # [User Prompt] - 상세 지침
@@ -68,43 +71,27 @@ def call_claude_to_generate_scripts(media_type: str, count: int, lang: str, topi
         f"(5) 'dialogue_en' (The exact English translation of the dialogue),\n" 
         f"(6) 'emotion_tag' (Single word: ANGER, JOY, SADNESS, CONFUSION, etc.),\n"
         f"(7) 'scene_prompt' (A highly detailed, cinematic description for Veo and L3 image search).\n"
-        "**Output Format MUST BE a single JSON object with a key 'scripts': [...]**."
+        "**Output Format MUST BE a single JSON object with a key 'scripts': [...], passed to the 'save_scripts' tool**."
     )
 
     try:
-        response = bedrock_runtime.invoke_model(
-            modelId='anthropic.claude-3-5-sonnet-20240620-v1:0', 
-            contentType='application/json',
-            accept='application/json',
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "system": system_prompt,
-                "messages": [{"role": "user", "content": user_prompt}],
-                "max_tokens": 4000, 
-                "temperature": 0.9 
-            })
+        scripts_data = generate_structured(
+            bedrock_runtime,
+            'anthropic.claude-3-5-sonnet-20240620-v1:0',
+            system_prompt,
+            user_prompt,
+            schema=SCRIPTS_SCHEMA,
+            tool_name='save_scripts',
+            tool_description="Save the generated video scripts.",
+            max_tokens=4000,
+            temperature=0.9
         )
-        
-        response_body = json.loads(response.get('body').read())
-        content_text = response_body['content'][0]['text'].strip()
-        
+
         # 🚨 [디버깅용 로그] Claude 응답 확인
-        logger.info(f"--- Raw LLM Output ---\n{content_text[:500]}...\n----------------------")
-        
-        # 강력한 JSON 추출 로직 사용
-        scripts_data = extract_json_from_text(content_text)
-        
-        if not scripts_data:
-            raise ValueError(f"Failed to parse JSON from LLM. Raw text start: {content_text[:100]}")
+        logger.info(f"--- LLM Output ---\n{json.dumps(scripts_data, ensure_ascii=False)[:500]}...\n----------------------")
 
-        # 결과 반환 (배열 추출)
-        if 'scripts' in scripts_data and isinstance(scripts_data['scripts'], list):
-            return scripts_data['scripts']
-        
-        if isinstance(scripts_data, list):
-            return scripts_data
-            
-        raise ValueError("LLM did not return a valid scripts array.")
+        # 결과 반환 (배열 추출, 스키마 검증 완료)
+        return scripts_data['scripts']
 
     except Exception as e:
         logger.error(f"Claude 호출 또는 JSON 파싱 오류: {e}", exc_info=True)
@@ -0,0 +1,289 @@
+import json
+
+# Bedrock Converse API 구조화 생성 공통 모듈 (sf-content-generator, learning-data-generator, AIFactory-GenScript)
+# - "JSON만 출력하라"는 프롬프트 대신 도구(tool) 하나를 강제로 호출하게 해서, 응답을 텍스트가 아닌 도구 입력(JSON)으로 받습니다.
+# - 출력이 maxTokens에서 잘리면 잘린 텍스트(도구 입력이면 그 JSON 원문)를 assistant 메시지로 넘겨 이어서 생성하고,
+#   합친 결과를 파싱합니다. 도구 호출은 잘린 입력 원문을 얻기 위해 ConverseStream으로 보냅니다.
+# - 반환 전에 JSON 스키마로 검증합니다. (Lambda에 jsonschema 패키지가 없어 필요한 부분만 직접 검사)
+
+# 잘린 출력을 이어서 생성하는 최대 횟수
+MAX_CONTINUATIONS = 2
+# 스키마 검증 실패 시 오류를 도구 결과로 알려 다시 호출하게 하는 최대 횟수
+MAX_CORRECTIONS = 1
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+}
+
+# learning_activities 스키마 (활동 타입별 필수 필드)
+# 보기/추천 답변 개수는 여기서 고정하지 않고 sf-content-validator의 보정·검증 단계에 맡깁니다.
+COMPREHENSION_QUIZ_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "activity_id": {"type": "integer"},
+        "activity_type": {"type": "string", "enum": ["COMPREHENSION_QUIZ"]},
+        "correct_option": {"type": "string", "minLength": 1},
+        "incorrect_options": {"type": "array", "items": {"type": "string", "minLength": 1}, "minItems": 1},
+        "question": {"type": "string"},
+        "tip": {"type": "string"},
+    },
+    "required": ["activity_id", "activity_type", "correct_option", "incorrect_options", "question", "tip"],
+}
+
+SENTENCE_RECONSTRUCTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "activity_id": {"type": "integer"},
+        "activity_type": {"type": "string", "enum": ["SENTENCE_RECONSTRUCTION"]},
+        "chunks": {"type": "array", "items": {"type": "string", "minLength": 1}, "minItems": 1},
+        "question": {"type": "string"},
+        "target_sentence": {"type": "string"},
+        "tip": {"type": "string"},
+    },
+    "required": ["activity_id", "activity_type", "chunks", "question", "target_sentence", "tip"],
+}
+
+RECOMMENDED_RESPONSES_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "activity_id": {"type": "integer"},
+        "activity_type": {"type": "string", "enum": ["RECOMMENDED_RESPONSES"]},
+        "recommended_responses": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "recommended_answer": {"type": "string", "minLength": 1},
+                    "pronunciation": {"type": "string", "minLength": 1},
+                    "korean_translation": {"type": "string", "minLength": 1},
+                },
+                "required": ["recommended_answer", "pronunciation", "korean_translation"],
+            },
+            "minItems": 1,
+        },
+    },
+    "required": ["activity_id", "activity_type", "recommended_responses"],
+}
+
+LEARNING_ACTIVITIES_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "learning_activities": {
+            "type": "array",
+            "items": {"anyOf": [COMPREHENSION_QUIZ_SCHEMA, SENTENCE_RECONSTRUCTION_SCHEMA, RECOMMENDED_RESPONSES_SCHEMA]},
+            "minItems": 1,
+        },
+    },
+    "required": ["learning_activities"],
+}
+
+
+def validate_schema(value, schema, path="$"):
+    """
+    value를 스키마로 검사해 오류 메시지 목록을 반환합니다. (빈 목록이면 통과)
+    지원: type, properties, required, items, minItems, maxItems, minLength, enum, anyOf
+    """
+    if "anyOf" in schema:
+        branch_errors = [validate_schema(value, sub, path) for sub in schema["anyOf"]]
+        if any(not errors for errors in branch_errors):
+            return []
+        # 가장 적게 어긋난 후보의 오류를 보여 줍니다.
+        return min(branch_errors, key=len)
+
+    expected = schema.get("type")
+    if expected:
+        # bool은 int의 하위 클래스라 integer/number 검사에서 따로 걸러냅니다.
+        if not isinstance(value, _TYPES[expected]) or (expected in ("integer", "number") and isinstance(value, bool)):
+            return [f"{path}: expected {expected}, got {type(value).__name__}"]
+
+    errors = []
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path}: {value!r} is not one of {schema['enum']}")
+    if isinstance(value, str) and len(value.strip()) < schema.get("minLength", 0):
+        errors.append(f"{path}: string is shorter than {schema['minLength']}")
+
+    if isinstance(value, dict):
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append(f"{path}: missing required property '{key}'")
+        for key, sub in schema.get("properties", {}).items():
+            if key in value:
+                errors.extend(validate_schema(value[key], sub, f"{path}.{key}"))
+
+    if isinstance(value, list):
+        if len(value) < schema.get("minItems", 0):
+            errors.append(f"{path}: expected at least {schema['minItems']} items, got {len(value)}")
+        if "maxItems" in schema and len(value) > schema["maxItems"]:
+            errors.append(f"{path}: expected at most {schema['maxItems']} items, got {len(value)}")
+        if "items" in schema:
+            for i, item in enumerate(value):
+                errors.extend(validate_schema(item, schema["items"], f"{path}[{i}]"))
+
+    return errors
+
+
+def extract_json_object(text):
+    """텍스트에서 첫 JSON 객체를 파싱합니다. 객체 뒤에 붙은 설명 문장은 무시합니다."""
+    start = text.find("{")
+    if start == -1:
+        raise ValueError(f"No JSON object in model output: {text[:100]}")
+    value, _ = json.JSONDecoder().raw_decode(text[start:])
+    return value
+
+
+def _request(model_id, system_prompt, messages, max_tokens, temperature, tool_config=None):
+    inference_config = {"maxTokens": max_tokens}
+    if temperature is not None:
+        inference_config["temperature"] = temperature
+    kwargs = {
+        "modelId": model_id,
+        "system": [{"text": system_prompt}],
+        "messages": messages,
+        "inferenceConfig": inference_config,
+    }
+    if tool_config:
+        kwargs["toolConfig"] = tool_config
+    return kwargs
+
+
+def _log_usage(api, stop_reason, usage):
+    print(f"Bedrock {api}: stopReason={stop_reason}, "
+          f"inputTokens={usage.get('inputTokens')}, outputTokens={usage.get('outputTokens')}")
+
+
+def _converse(client, model_id, system_prompt, messages, max_tokens, temperature):
+    response = client.converse(**_request(model_id, system_prompt, messages, max_tokens, temperature))
+    _log_usage("Converse", response.get("stopReason"), response.get("usage", {}))
+    return response
+
+
+def _converse_tool(client, model_id, system_prompt, messages, max_tokens, temperature, tool_config):
+    """
+    도구 강제 호출을 ConverseStream으로 보냅니다. (Converse는 잘린 도구 입력의 JSON 원문을 돌려주지 않음)
+    반환값: (stopReason, 도구 호출 앞의 텍스트, toolUse {"toolUseId", "name"} 또는 None, 도구 입력 JSON 원문)
+    """
+    response = client.converse_stream(
+        **_request(model_id, system_prompt, messages, max_tokens, temperature, tool_config)
+    )
+    stop_reason, usage = None, {}
+    texts, tool_use, tool_index, input_parts = [], None, None, []
+    for event in response["stream"]:
+        if "contentBlockStart" in event:
+            start = event["contentBlockStart"].get("start", {})
+            if "toolUse" in start and tool_use is None:
+                tool_use = {"toolUseId": start["toolUse"]["toolUseId"], "name": start["toolUse"]["name"]}
+                tool_index = event["contentBlockStart"]["contentBlockIndex"]
+        elif "contentBlockDelta" in event:
+            delta = event["contentBlockDelta"]["delta"]
+            if "toolUse" in delta and event["contentBlockDelta"]["contentBlockIndex"] == tool_index:
+                input_parts.append(delta["toolUse"]["input"])
+            elif "text" in delta:
+                texts.append(delta["text"])
+        elif "messageStop" in event:
+            stop_reason = event["messageStop"]["stopReason"]
+        elif "metadata" in event:
+            usage = event["metadata"].get("usage", {})
+    _log_usage("ConverseStream", stop_reason, usage)
+    return stop_reason, "".join(texts), tool_use, "".join(input_parts)
+
+
+def _generate_with_continuation(client, model_id, system_prompt, user_prompt, schema, max_tokens, temperature,
+                                partial=None):
+    """
+    도구 호출이 잘렸거나 도구 없이 텍스트로 답한 경우의 대체 경로.
+    스키마를 프롬프트에 넣고 partial(잘린 도구 입력 JSON 원문, 없으면 '{')로 assistant 메시지를 미리 채운 뒤,
+    maxTokens에서 멈추면 지금까지의 출력을 assistant 메시지로 넘겨 이어서 생성합니다.
+    """
+    prompt = (
+        f"{user_prompt}\n\n"
+        f"Respond ONLY with a JSON object that conforms to this JSON schema:\n"
+        f"{json.dumps(schema, ensure_ascii=False)}"
+    )
+    output = partial.lstrip() if partial and partial.strip() else "{"
+    for attempt in range(MAX_CONTINUATIONS + 1):
+        # 마지막 assistant 메시지가 공백으로 끝나면 Bedrock이 거부하므로 미리 채우는 메시지에서만 끝 공백을 뺍니다.
+        prefill = output.rstrip()
+        messages = [
+            {"role": "user", "content": [{"text": prompt}]},
+            {"role": "assistant", "content": [{"text": prefill}]},
+        ]
+        response = _converse(client, model_id, system_prompt, messages, max_tokens, temperature)
+        text = "".join(block.get("text", "") for block in response["output"]["message"]["content"])
+        # 모델이 뺀 공백을 스스로 다시 썼으면 그 공백을 쓰고, 아니면 누적 출력을 그대로 둔 채 이어 붙입니다.
+        output = (prefill if text[:1].isspace() else output) + text
+        if response.get("stopReason") != "max_tokens":
+            break
+        print(f"출력이 maxTokens에서 잘려 이어서 생성합니다. ({attempt + 1}/{MAX_CONTINUATIONS})")
+    else:
+        raise ValueError(f"Model output still truncated after {MAX_CONTINUATIONS} continuations.")
+
+    result = extract_json_object(output)
+    errors = validate_schema(result, schema)
+    if errors:
+        raise ValueError(f"Model output does not match schema: {errors[:5]}")
+    return result
+
+
+def generate_structured(client, model_id, system_prompt, user_prompt, schema, tool_name, tool_description,
+                        max_tokens, temperature=None):
+    """
+    Converse API로 tool_name 도구를 강제 호출해 schema를 따르는 dict를 생성합니다.
+    - 스키마 검증에 실패하면 오류를 도구 결과(status=error)로 돌려주고 MAX_CORRECTIONS번까지 다시 호출하게 합니다.
+    - 도구 입력이 maxTokens에서 잘렸으면 잘린 입력 JSON에 이어서 텍스트 모드로 생성합니다.
+    실패 시 ValueError (검증/파싱) 또는 boto3 예외 (API 오류)를 그대로 올립니다.
+    """
+    tool_config = {
+        "tools": [{
+            "toolSpec": {
+                "name": tool_name,
+                "description": tool_description,
+                "inputSchema": {"json": schema},
+            }
+        }],
+        "toolChoice": {"tool": {"name": tool_name}},
+    }
+    messages = [{"role": "user", "content": [{"text": user_prompt}]}]
+
+    for correction in range(MAX_CORRECTIONS + 1):
+        stop_reason, text, tool_use, raw_input = _converse_tool(
+            client, model_id, system_prompt, messages, max_tokens, temperature, tool_config
+        )
+
+        if tool_use is None or stop_reason == "max_tokens":
+            print(f"도구 호출 결과가 없거나 잘려 텍스트 이어쓰기로 전환합니다. (도구 입력 {len(raw_input)}자에서 계속)")
+            return _generate_with_continuation(
+                client, model_id, system_prompt, user_prompt, schema, max_tokens, temperature,
+                partial=raw_input if tool_use else None
+            )
+
+        try:
+            result = json.loads(raw_input or "{}")
+        except ValueError as e:
+            raise ValueError(f"Tool input is not valid JSON: {e}")
+        errors = validate_schema(result, schema)
+        if not errors:
+            return result
+
+        print(f"스키마 검증 실패 ({correction + 1}/{MAX_CORRECTIONS + 1}): {errors[:5]}")
+        messages.append({
+            "role": "assistant",
+            "content": ([{"text": text}] if text.strip() else []) + [{"toolUse": {**tool_use, "input": result}}],
+        })
+        messages.append({
+            "role": "user",
+            "content": [{
+                "toolResult": {
+                    "toolUseId": tool_use["toolUseId"],
+                    "content": [{"text": "Schema validation failed. Fix these errors and call the tool again:\n"
+                                         + "\n".join(errors[:20])}],
+                    "status": "error",
+                }
+            }],
+        })
+
+    raise ValueError(f"Model output does not match schema: {errors[:5]}")
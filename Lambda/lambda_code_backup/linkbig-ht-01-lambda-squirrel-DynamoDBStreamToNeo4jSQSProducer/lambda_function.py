@@ -3,9 +3,13 @@ import os
 import boto3
 from boto3.dynamodb.types import TypeDeserializer
 from decimal import Decimal
+from sqs_producer import pack_events, send_entries
 
 # --- 설정 및 초기화 ---
 SQS_QUEUE_URL = os.environ.get('SQS_QUEUE_URL')
+# 2 이상이면 여러 그래프 이벤트를 {"events": [...]} 메시지 하나로 묶어 SQS 요청 수를 줄입니다.
+# (SQSToNeo4jConsumer는 두 형식을 모두 받습니다)
+EVENTS_PER_MESSAGE = int(os.environ.get('EVENTS_PER_MESSAGE', '1'))
 
 sqs = boto3.client('sqs')
 deserializer = TypeDeserializer()
@@ -23,7 +27,8 @@ def lambda_handler(event, context):
         print("Error: SQS_QUEUE_URL environment variable is not set.")
         raise EnvironmentError("SQS_QUEUE_URL is missing. Cannot send messages.")
 
-    messages_to_send = []
+    events = []
+    sequence_numbers = {}
 
     for record in event.get('Records', []):
         if record.get('eventName') == 'INSERT':
@@ -46,38 +51,34 @@ def lambda_handler(event, context):
                     'relatedWords_KR': python_data.get('relatedWords_kr', {}),
                 }
 
-                # 3. 필수 필드만 담은 딕셔너리를 SQS 메시지 바디 JSON 문자열로 변환
-                message_body = json.dumps(essential_data,
-                                          default=default_serializer,
-                                          ensure_ascii=False)
-
-                messages_to_send.append({
-                    'Id': record['eventID'],
-                    'MessageBody': message_body
-                })
+                # 3. Decimal을 문자열로 바꿔 JSON 직렬화 가능한 형태로 정리
+                events.append((record['eventID'], json.loads(json.dumps(essential_data, default=default_serializer))))
+                sequence_numbers[record['eventID']] = record['dynamodb']['SequenceNumber']
 
             except Exception as e:
                 print(f"Skipping record {record.get('eventID')}: Data processing error: {e}")
                 continue
 
-    if messages_to_send:
-        try:
-            # SQS SendMessageBatch를 사용하여 메시지를 효율적으로 일괄 전송
-            response = sqs.send_message_batch(
-                QueueUrl=SQS_QUEUE_URL,
-                Entries=messages_to_send
-            )
-
-            failed_count = len(response.get('Failed', []))
-            if failed_count > 0:
-                print(f"SQS 전송 중 {failed_count}건 실패: {response.get('Failed')}")
-                raise RuntimeError("SQS batch send partial failure occurred. Rerunning batch.")
-
-            print(f"SQS 전송 성공: {len(response.get('Successful', []))} 건.")
-
-        except Exception as e:
-            # 치명적인 오류 발생 시 DynamoDB Stream 재처리 유도
-            print(f"Fatal SQS Batch Send error: {e}")
-            raise e
-
-    return {'statusCode': 200}
\ No newline at end of file
+    # 4. 메시지 바디 구성 (선택적으로 여러 이벤트를 한 메시지에 묶음)
+    messages = pack_events(events, EVENTS_PER_MESSAGE)
+    entries = [{'Id': message_id, 'MessageBody': body} for message_id, _, body in messages]
+
+    # 5. 10건 / 256KB 단위로 나눠 동시 전송, 실패한 엔트리만 백오프 후 재전송
+    failed_ids = set(send_entries(sqs, SQS_QUEUE_URL, entries))
+    if not failed_ids:
+        return {'batchItemFailures': []}
+
+    # 6. 끝까지 실패한 메시지 중 가장 앞선 스트림 레코드부터 다시 받도록 보고
+    # (이벤트 소스 매핑에 ReportBatchItemFailures 필요, 이미 보낸 앞쪽 레코드는 재전송되지 않음)
+    # 실패 지점 뒤의 이미 보낸 레코드는 다시 전송되므로, Consumer는 PERFORMED 표시로 중복 적재를 걸러냅니다.
+    # SenderFault/크기 초과처럼 재시도해도 실패하는 레코드도 실패로 보고합니다. 샤드가 계속 막히지 않도록
+    # 이벤트 소스 매핑에 MaximumRetryAttempts 제한, BisectBatchOnFunctionError=true,
+    # DestinationConfig.OnFailure(neo4j-ingestion-DLQ)를 설정해 해당 레코드를 DLQ로 넘깁니다.
+    failed_sequences = [
+        int(sequence_numbers[event_id])
+        for message_id, event_ids, _ in messages if message_id in failed_ids
+        for event_id in event_ids
+    ]
+    first_failed = str(min(failed_sequences))
+    print(f"SQS 전송 최종 실패 {len(failed_ids)}건. SequenceNumber {first_failed}부터 재처리합니다.")
+    return {'batchItemFailures': [{'itemIdentifier': first_failed}]}
@@ -0,0 +1,128 @@
+import argparse
+import os
+from neo4j import GraphDatabase
+from neo4j_schema import apply_schema
+
+# 기존 데이터로 UserWordStat을 채우는 일회성 작업입니다.
+# word-history가 사용하던 OR 패턴 집계를 사용자 단위로 실행해 UserWordStat에 더하고,
+# 집계에 포함된 PERFORMED 관계에 statsAppliedAt을 찍어 Consumer가 다시 세지 않게 합니다.
+#
+# Consumer와 동시에 돌 수 있도록:
+# - --cutoff(epoch 초) 이전에 생성된 시나리오만 백필합니다. cutoff는 새 Consumer 배포 시각으로 지정하고,
+#   그 이후 학습 기록은 Consumer가 셉니다.
+# - 아직 statsAppliedAt이 없는 PERFORMED만 같은 트랜잭션에서 표시하고 세므로, Consumer가 이미 센 기록은 건너뛰고
+#   다시 실행해도 두 번 세지 않습니다. (SET이 아니라 기존 값에 더함)
+#
+# 의미 변화: 기존 쿼리는 조회 시점의 RELATED_TO로 세므로 나중에 생긴 RELATED_TO 관계가 과거 학습까지 소급해 집계됩니다.
+# UserWordStat은 적재 시점의 RELATED_TO로 세고 이후 관계 변화는 반영하지 않으므로, 백필 뒤 관계가 늘어난 단어는
+# --verify에서 불일치로 나옵니다. (기존 쿼리 쪽 count가 더 큼)
+#
+# 사용법:
+#   python backfill_word_stats.py --cutoff 1767225600      # 전체 사용자 백필 (cutoff = Consumer 배포 시각, epoch 초)
+#   python backfill_word_stats.py --verify                 # 저장된 지표와 기존 집계 쿼리 결과 비교
+
+# word-history의 기존 집계 쿼리 (기준값)
+CONTEXTUAL_METRICS_QUERY = """
+    MATCH (u:User {id: $userId})-[:STUDYING]->(l:Language)<-[:BELONGS_TO_LANGUAGE]-(w_main:Word)
+    MATCH (s_all:Scenario {language: l.code})
+          WHERE (s_all)-[:FOCUS_ON]->(w_main) OR
+                (s_all)-[:FOCUS_ON]->()-[:RELATED_TO]->(w_main)
+    MATCH (u)-[:PERFORMED]->(s_all)
+    RETURN l.code AS lang, w_main.name AS word,
+           COUNT(s_all) AS count, MAX(s_all.createdAtTs) AS lastStudied
+"""
+
+# 기존 집계와 같은 OR 패턴이지만, cutoff 이전이면서 아직 집계되지 않은 PERFORMED만 표시하고 셉니다.
+BACKFILL_QUERY = """
+    MATCH (u:User {id: $userId})-[p:PERFORMED]->(s:Scenario)
+    WHERE p.statsAppliedAt IS NULL AND s.createdAtTs < $cutoff
+    SET p.statsAppliedAt = s.createdAtTs
+    WITH u, s
+    MATCH (u)-[:STUDYING]->(l:Language {code: s.language})<-[:BELONGS_TO_LANGUAGE]-(w:Word)
+          WHERE (s)-[:FOCUS_ON]->(w) OR
+                (s)-[:FOCUS_ON]->()-[:RELATED_TO]->(w)
+    WITH u, l.code AS lang, w, COUNT(s) AS count, MAX(s.createdAtTs) AS lastStudied
+    MERGE (st:UserWordStat {userId: u.id, word: w.name, lang: lang})
+    ON CREATE SET st.count = 0, st.lastStudied = lastStudied
+    SET st.count = st.count + count,
+        st.lastStudied = CASE WHEN lastStudied > st.lastStudied THEN lastStudied ELSE st.lastStudied END
+    MERGE (u)-[:HAS_WORD_STAT]->(st)
+    MERGE (st)-[:FOR_WORD]->(w)
+    RETURN COUNT(st) AS written
+"""
+
+STORED_METRICS_QUERY = """
+    MATCH (:User {id: $userId})-[:HAS_WORD_STAT]->(st:UserWordStat)
+    RETURN st.lang AS lang, st.word AS word, st.count AS count, st.lastStudied AS lastStudied
+"""
+
+
+def to_metric_map(records):
+    return {(r["lang"], r["word"]): (r["count"], r["lastStudied"]) for r in records}
+
+
+def list_user_ids(session):
+    return [record["id"] for record in session.run("MATCH (u:User) RETURN u.id AS id")]
+
+
+def backfill_user(session, user_id, cutoff):
+    return session.execute_write(
+        lambda tx: tx.run(BACKFILL_QUERY, userId=user_id, cutoff=cutoff).single()["written"]
+    )
+
+
+def verify_user(session, user_id):
+    """기존 집계 쿼리와 저장된 지표를 비교해 다른 (lang, word) 목록을 반환합니다."""
+    expected = to_metric_map(session.run(CONTEXTUAL_METRICS_QUERY, userId=user_id))
+    stored = to_metric_map(session.run(STORED_METRICS_QUERY, userId=user_id))
+    return sorted(key for key in expected.keys() | stored.keys() if expected.get(key) != stored.get(key))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UserWordStat 백필/검증")
+    parser.add_argument("--verify", action="store_true", help="백필 없이 기존 집계와 비교만 수행")
+    parser.add_argument("--cutoff", type=int,
+                        help="이 시각(epoch 초, Scenario.createdAtTs와 같은 단위) 이전에 생성된 시나리오만 백필. 새 Consumer 배포 시각을 지정")
+    args = parser.parse_args()
+    if not args.verify and args.cutoff is None:
+        parser.error("백필에는 --cutoff가 필요합니다. (새 Consumer 배포 시각, epoch 초)")
+    # ms 값을 넣으면 모든 시나리오가 cutoff 이전이 되어 Consumer 몫까지 백필하므로 막습니다.
+    if args.cutoff is not None and args.cutoff >= 10**11:
+        parser.error("--cutoff는 epoch 초 단위입니다. (ms 값으로 보입니다)")
+
+    uri = os.environ.get("NEO4J_URI")
+    user = os.environ.get("NEO4J_USER")
+    password = os.environ.get("NEO4J_PASSWORD")
+    if not all([uri, user, password]):
+        raise SystemExit("NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD 환경 변수가 필요합니다.")
+
+    with GraphDatabase.driver(uri, auth=(user, password)) as driver:
+        if not args.verify:
+            apply_schema(driver)
+        with driver.session() as session:
+            user_ids = list_user_ids(session)
+            mismatched_users = 0
+            for user_id in user_ids:
+                if args.verify:
+                    mismatches = verify_user(session, user_id)
+                    if mismatches:
+                        mismatched_users += 1
+                        print(f"{user_id}: {len(mismatches)} mismatch(es), e.g. {mismatches[:5]}")
+                else:
+                    count = backfill_user(session, user_id, args.cutoff)
+                    print(f"{user_id}: {count} word stat(s) updated")
+
+    if args.verify:
+        print(f"Verified {len(user_ids)} user(s), {mismatched_users} with mismatches.")
+        if mismatched_users:
+            print("Note: the old query counts RELATED_TO edges created after a scenario was studied; "
+                  "UserWordStat counts the edges that existed at ingest time. "
+                  "Words whose RELATED_TO edges changed after ingest are expected to differ.")
+        if mismatched_users:
+            raise SystemExit(1)
+    else:
+        print(f"Backfilled {len(user_ids)} user(s).")
+
+
+if __name__ == "__main__":
+    main()
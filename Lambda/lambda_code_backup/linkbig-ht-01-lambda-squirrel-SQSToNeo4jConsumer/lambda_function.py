@@ -1,106 +1,318 @@
 import json
 import os
 import sys
-from neo4j import GraphDatabase, exceptions
+import boto3
+from boto3.dynamodb.types import TypeDeserializer
+from neo4j import exceptions
+from neo4j_access import get_driver, run_read, run_write, log_query_metrics
 from decimal import Decimal
+from neo4j_schema import ensure_schema
+from sqs_batch import batch_response
+from sqs_producer import send_entries
+from word_graph_cache import bump_versions
+from word_graph_snapshot import SNAPSHOT_BUCKET, build_snapshot, save_snapshot
 
 # --- 환경 변수 설정 ---
-URI = os.environ.get('NEO4J_URI')
-USER = os.environ.get('NEO4J_USER')
-PASSWORD = os.environ.get('NEO4J_PASSWORD')
+# 스트림 직접 모드에서 Neo4j가 내려가 있을 때 이벤트를 맡겨 둘 SQS 큐 (기존 적재 큐)
+# 설정하지 않으면 스트림 재시도에 맡깁니다.
+BUFFER_QUEUE_URL = os.environ.get('BUFFER_QUEUE_URL')
 
-# Global Driver (Lambda Warm Start 시 재사용)
-driver = None
+sqs = boto3.client('sqs')
+deserializer = TypeDeserializer()
 
-# Neo4j 연결 초기화 함수
+# 드라이버는 neo4j_access에서 첫 사용 때 생성합니다. (verify_connectivity 없음)
+# 스키마 보장만 컨테이너 당 1회 수행합니다.
 def init_driver():
-    global driver
-    if not driver:
-        if not all([URI, USER, PASSWORD]):
-            raise EnvironmentError("Neo4j connection environment variables are missing.")
-        try:
-            driver = GraphDatabase.driver(URI, auth=(USER, PASSWORD), max_connection_lifetime=300)
-            driver.verify_connectivity()
-            print("Neo4j driver initialized successfully.")
-        except Exception as e:
-            print(f"Failed to create Neo4j driver or verify connectivity: {e}")
-            raise
+    ensure_schema(get_driver())
 
-# --- 최종 Cypher 통합 쿼리 ---
+# --- 최종 Cypher 통합 쿼리 (배치 UNWIND) ---
+# SQS 배치 전체를 $rows 파라미터 하나로 받아 단일 트랜잭션으로 처리합니다.
+# 같은 기록이 다시 들어와도(SQS 재전송, 스트림 재처리로 인한 재전송) STUDIED.count가 두 번 오르지 않도록
+# PERFORMED.studiedAppliedAt으로 처음 적용되는 기록만 셉니다. (statsAppliedAt이 있으면 이 표시 이전에 적재된 기록)
 CYPHER_QUERY = """
-    MERGE (lang:Language {code: $targetLanguage})
-    MERGE (u:User {id: $userId})
+    UNWIND $rows AS row
+    MERGE (lang:Language {code: row.targetLanguage})
+    MERGE (u:User {id: row.userId})
     MERGE (u)-[:STUDYING]->(lang)
 
-    MERGE (s:Scenario {id: $scenarioId, language: $targetLanguage})
-    ON CREATE SET s.createdAtTs = $createdAtTs, s.createdAtIso = $createdAtIso
+    MERGE (s:Scenario {id: row.scenarioId, language: row.targetLanguage})
+    ON CREATE SET s.createdAtTs = row.createdAtTs, s.createdAtIso = row.createdAtIso
 
-    MERGE (w_ko_main:Word {name: $originalWord, lang: 'ko'})
+    MERGE (w_ko_main:Word {name: row.originalWord, lang: 'ko'})
     MERGE (w_ko_main)-[:BELONGS_TO_LANGUAGE]->(lang)
 
-    MERGE (u)-[r_main:STUDIED]->(w_ko_main)
-    ON CREATE SET r_main.count = 1, r_main.last_studied = $createdAtTs
-    ON MATCH SET r_main.count = r_main.count + 1, r_main.last_studied = $createdAtTs
-
-    MERGE (u)-[:PERFORMED]->(s)
+    MERGE (u)-[p:PERFORMED]->(s)
+    WITH row, lang, u, s, w_ko_main, p,
+         (p.studiedAppliedAt IS NULL AND p.statsAppliedAt IS NULL) AS firstApply
+    SET p.studiedAppliedAt = coalesce(p.studiedAppliedAt, row.createdAtTs)
     MERGE (s)-[:FOCUS_ON]->(w_ko_main)
 
-    WITH w_ko_main, lang, u, s, $relatedWords AS relatedWordsList, $createdAtTs AS ts
+    MERGE (u)-[r_main:STUDIED]->(w_ko_main)
+    ON CREATE SET r_main.count = 0, r_main.last_studied = row.createdAtTs
+    FOREACH (_ IN CASE WHEN firstApply THEN [1] ELSE [] END |
+        SET r_main.count = r_main.count + 1, r_main.last_studied = row.createdAtTs)
+
+    WITH w_ko_main, lang, u, s, row.relatedWords AS relatedWordsList, row.createdAtTs AS ts, firstApply
 
     UNWIND relatedWordsList AS related_word
     MERGE (w_rel:Word {name: related_word, lang: 'ko'})
     MERGE (w_rel)-[:BELONGS_TO_LANGUAGE]->(lang)
 
     MERGE (u)-[r_rel:STUDIED]->(w_rel)
-    ON CREATE SET r_rel.count = 1, r_rel.last_studied = ts
-    ON MATCH SET r_rel.count = r_rel.count + 1, r_rel.last_studied = ts
+    ON CREATE SET r_rel.count = 0, r_rel.last_studied = ts
+    FOREACH (_ IN CASE WHEN firstApply THEN [1] ELSE [] END |
+        SET r_rel.count = r_rel.count + 1, r_rel.last_studied = ts)
+
+    // timestamp()는 쿼리 하나 동안 같은 값이므로, 이 쿼리에서 새로 만든 RELATED_TO를 구분할 수 있습니다.
+    MERGE (w_ko_main)-[r_link:RELATED_TO {targetLang: lang.code}]->(w_rel)
+    ON CREATE SET r_link.createdAt = timestamp()
+
+    // 새 RELATED_TO는 양 끝 단어를 학습한 사용자들의 이웃(neighborCount 등)을 바꾸므로 그 (userId, lang)을 반환합니다.
+    WITH lang, CASE WHEN r_link.createdAt = timestamp() THEN [w_ko_main, w_rel] ELSE [] END AS changed_words
+    UNWIND changed_words AS w_changed
+    MATCH (st:UserWordStat {lang: lang.code})-[:FOR_WORD]->(w_changed)
+    RETURN collect(DISTINCT [st.userId, st.lang]) AS affectedUserLangs
+"""
+
+# --- 사용자별 단어 지표 증분 갱신 ---
+# word-history가 매 요청마다 OR 패턴 집계를 하지 않도록, 새 시나리오가 들어올 때
+# (user, word, lang) 단위 UserWordStat 노드의 count/lastStudied를 갱신합니다.
+# 시나리오가 집중한 단어와 그 단어의 RELATED_TO 단어(해당 언어 소속)가 대상이며,
+# PERFORMED.statsAppliedAt으로 같은 시나리오가 두 번 집계되지 않게 막습니다.
+WORD_STATS_QUERY = """
+    UNWIND $rows AS row
+    MATCH (u:User {id: row.userId})-[p:PERFORMED]->(s:Scenario {id: row.scenarioId, language: row.targetLanguage})
+    WHERE p.statsAppliedAt IS NULL
+    SET p.statsAppliedAt = row.createdAtTs
+
+    WITH u, s, row
+    MATCH (lang:Language {code: row.targetLanguage})
+    MATCH (s)-[:FOCUS_ON]->(focus:Word)
+    OPTIONAL MATCH (focus)-[:RELATED_TO]->(rel:Word)-[:BELONGS_TO_LANGUAGE]->(lang)
+    WITH u, row, lang, collect(DISTINCT focus) + collect(DISTINCT rel) AS words
+    UNWIND words AS w
+    WITH DISTINCT u, row, lang, w
+    WHERE (w)-[:BELONGS_TO_LANGUAGE]->(lang)
 
-    MERGE (w_ko_main)-[:RELATED_TO {targetLang: lang.code}]->(w_rel)
-    RETURN 'Data Ingestion Complete (Optimized).' AS Status
+    MERGE (st:UserWordStat {userId: row.userId, word: w.name, lang: row.targetLanguage})
+    ON CREATE SET st.count = 0, st.lastStudied = row.createdAtTs
+    SET st.count = st.count + 1,
+        st.lastStudied = CASE WHEN row.createdAtTs > st.lastStudied THEN row.createdAtTs ELSE st.lastStudied END
+    MERGE (u)-[:HAS_WORD_STAT]->(st)
+    MERGE (st)-[:FOR_WORD]->(w)
+    RETURN count(*) AS Status
 """
 
-def execute_cypher_transaction(tx, params):
-    tx.run(CYPHER_QUERY, params)
+def dedupe_rows(rows):
+    """
+    같은 (userId, scenarioId, targetLanguage) row는 하나만 남깁니다.
+    한 쿼리 안에서는 앞 row의 PERFORMED 표시가 뒤 row의 검사보다 먼저 적용된다는 보장이 없기 때문입니다.
+    """
+    unique = {}
+    for row in rows:
+        unique.setdefault((row['userId'], row['scenarioId'], row['targetLanguage']), row)
+    return list(unique.values())
+
+def execute_cypher_transaction(tx, rows):
+    """rows를 적재하고, 새 RELATED_TO 관계로 이웃이 바뀐 (userId, lang) 목록을 반환합니다."""
+    rows = dedupe_rows(rows)
+    record = tx.run(CYPHER_QUERY, rows=rows).single()
+    tx.run(WORD_STATS_QUERY, rows=rows).consume()
+    return [tuple(pair) for pair in record["affectedUserLangs"]] if record else []
+
+def build_params(data):
+    """그래프 이벤트 하나를 Cypher 파라미터(row)로 변환합니다."""
+    # Cypher 쿼리에 필요한 매개변수 준비
+    related_words_dict = data.get('relatedWords_KR', {})
+    related_words_list = list(related_words_dict.values())
+
+    return {
+        'userId': data['userId'],
+        'scenarioId': data['scenarioId'],
+        'createdAtTs': int(data['createdAtTs']),
+        'createdAtIso': data['createdAtIso'],
+        'targetLanguage': data['targetLanguage'],
+        'originalWord': data['originalWord'],
+        'relatedWords': related_words_list,
+    }
+
+def build_rows(record):
+    """
+    SQS 레코드를 row 목록으로 변환합니다.
+    Producer가 여러 이벤트를 묶어 보낸 경우 바디는 {"events": [...]} 형식입니다.
+    """
+    # SQS 메시지 바디 추출 및 JSON 디코딩
+    data = json.loads(record.get('body'))
+    events = data['events'] if 'events' in data else [data]
+    return [build_params(event) for event in events]
+
+def ingest_rows(rows):
+    """
+    (id, params) 목록을 한 트랜잭션으로 적재합니다.
+    실패하면 절반으로 나눠 재시도해 문제 레코드만 골라냅니다.
+    Neo4j 자체가 내려간 경우(ServiceUnavailable)는 나눠도 의미가 없으므로 남은 레코드 전체를 따로 모읍니다.
+    반환값: (실패한 id 목록, Neo4j 장애로 적재하지 못한 id 목록, 새 RELATED_TO로 이웃이 바뀐 (userId, lang) set)
+    """
+    if not rows:
+        return [], [], set()
+    try:
+        affected = run_write("ingest_rows", execute_cypher_transaction, [params for _, params in rows])
+        return [], [], set(affected)
+    except exceptions.ServiceUnavailable as e:
+        print(f"Neo4j Service Unavailable: {e}. {len(rows)} record(s) were not ingested.")
+        return [], [record_id for record_id, _ in rows], set()
+    except Exception as e:
+        if len(rows) == 1:
+            print(f"Failed to process record {rows[0][0]}. Error: {e}")
+            return [rows[0][0]], [], set()
+        mid = len(rows) // 2
+        print(f"Batch of {len(rows)} failed ({e}). Splitting into {mid} + {len(rows) - mid}.")
+        left_failed, left_unavailable, left_affected = ingest_rows(rows[:mid])
+        right_failed, right_unavailable, right_affected = ingest_rows(rows[mid:])
+        return left_failed + right_failed, left_unavailable + right_unavailable, left_affected | right_affected
+
+# --- 사용자별 그래프 스냅샷 ---
+# word-history 스냅샷 모드가 Neo4j 없이 읽을 수 있도록, 적재된 (user, lang)의 그래프를 다시 읽어 S3에 씁니다.
+SNAPSHOT_QUERY = """
+    MATCH (:User {id: $userId})-[:HAS_WORD_STAT]->(st:UserWordStat {lang: $targetLang})-[:FOR_WORD]->(w:Word)
+    OPTIONAL MATCH (w)-[:RELATED_TO {targetLang: $targetLang}]-(n:Word)
+    RETURN w.name AS word, st.count AS count, st.lastStudied AS lastStudied,
+           collect(DISTINCT n.name) AS neighbors
+"""
+
+def refresh_snapshots(user_langs):
+    """스냅샷 저장에 실패해도 적재 결과에는 영향을 주지 않습니다. (다음 적재 때 다시 만들어짐)"""
+    if not SNAPSHOT_BUCKET:
+        return
+    for user_id, lang in user_langs:
+        try:
+            records = run_read(
+                "snapshot", lambda tx: [r.data() for r in tx.run(SNAPSHOT_QUERY, userId=user_id, targetLang=lang)]
+            )
+            snapshot = build_snapshot(user_id, lang, records)
+            size = save_snapshot(snapshot)
+            print(f"[Snapshot] {user_id}/{lang}: {len(snapshot['words'])} words, {len(snapshot['edges'])} edges, {size} bytes")
+        except Exception as e:
+            print(f"[Snapshot] Failed to refresh {user_id}/{lang}: {e}")
+
+def after_ingest(rows, failed_ids, affected_user_langs):
+    """
+    적재된 사용자/언어와 새 RELATED_TO로 이웃이 바뀐 사용자/언어의 word-history 응답 캐시를 무효화(version 증가)하고
+    적재된 사용자의 스냅샷을 갱신합니다.
+    """
+    failed_set = set(failed_ids)
+    user_langs = {
+        (params['userId'], params['targetLanguage'])
+        for record_id, params in rows if record_id not in failed_set
+    }
+    bump_versions(user_langs | set(affected_user_langs))
+    refresh_snapshots(user_langs)
+
+# --- 스트림 직접 모드 ---
+# 학습 테이블 스트림을 이 함수에 바로 연결하면 Producer Lambda와 SQS를 거치지 않습니다.
+# 이벤트 소스 매핑 권장 설정:
+#   BatchSize/MaximumBatchingWindowInSeconds로 배치 크기 조절,
+#   FunctionResponseTypes=["ReportBatchItemFailures"], BisectBatchOnFunctionError=true,
+#   MaximumRetryAttempts 제한 + DestinationConfig.OnFailure(neo4j-ingestion-DLQ)로 독성 레코드 격리
+def build_stream_params(record):
+    """스트림 INSERT 레코드의 NewImage를 Cypher 파라미터(row)로 변환합니다. (Producer와 같은 필드)"""
+    new_image = record['dynamodb']['NewImage']
+    python_data = {k: deserializer.deserialize(v) for k, v in new_image.items()}
+    return build_params({
+        'userId': python_data.get('userId'),
+        'scenarioId': python_data.get('scenarioId'),
+        'createdAtTs': python_data.get('createdAtTs'),
+        'createdAtIso': python_data.get('createdAtIso'),
+        'targetLanguage': python_data.get('targetLanguage'),
+        'originalWord': python_data.get('originalWord'),
+        'relatedWords_KR': python_data.get('relatedWords_kr', {}),
+    })
+
+def buffer_to_sqs(rows):
+    """Neo4j 장애 시 row를 기존 SQS 적재 큐에 넘깁니다. 넘기지 못한 id 목록을 반환합니다."""
+    if not BUFFER_QUEUE_URL:
+        return [record_id for record_id, _ in rows]
+    entries = [
+        {
+            'Id': str(index),
+            'MessageBody': json.dumps({
+                'userId': params['userId'],
+                'scenarioId': params['scenarioId'],
+                'createdAtTs': params['createdAtTs'],
+                'createdAtIso': params['createdAtIso'],
+                'targetLanguage': params['targetLanguage'],
+                'originalWord': params['originalWord'],
+                'relatedWords_KR': {str(i): word for i, word in enumerate(params['relatedWords'])},
+            }, ensure_ascii=False)
+        }
+        for index, (_, params) in enumerate(rows)
+    ]
+    failed_indexes = set(send_entries(sqs, BUFFER_QUEUE_URL, entries))
+    print(f"Buffered {len(rows) - len(failed_indexes)}/{len(rows)} record(s) to SQS.")
+    return [rows[int(index)][0] for index in failed_indexes]
+
+def handle_stream_event(event):
+    rows = []
+    for record in event.get('Records', []):
+        if record.get('eventName') != 'INSERT':
+            continue
+        sequence_number = record['dynamodb']['SequenceNumber']
+        try:
+            rows.append((sequence_number, build_stream_params(record)))
+        except Exception as e:
+            # 재시도해도 같은 결과이므로 건너뜀
+            print(f"Skipping stream record {sequence_number}: Data processing error: {e}")
+
+    try:
+        init_driver()
+        failed_ids, unavailable_ids, affected_user_langs = ingest_rows(rows)
+    except Exception as e:
+        print(f"Driver initialization failed: {e}")
+        failed_ids, unavailable_ids, affected_user_langs = [], [record_id for record_id, _ in rows], set()
+
+    # Neo4j 장애로 못 넣은 레코드는 SQS 버퍼로 보내고, 버퍼도 실패한 것만 스트림 재시도 대상
+    if unavailable_ids:
+        unavailable_set = set(unavailable_ids)
+        failed_ids += buffer_to_sqs([row for row in rows if row[0] in unavailable_set])
+
+    after_ingest(rows, failed_ids + unavailable_ids, affected_user_langs)
+    print(f"Ingested {len(rows) - len(failed_ids) - len(unavailable_ids)}/{len(rows)} stream record(s).")
+    log_query_metrics()
+
+    # 스트림은 순서가 있으므로 가장 앞선 실패 레코드부터 다시 받습니다.
+    if not failed_ids:
+        return batch_response([])
+    return batch_response([min(failed_ids, key=int)])
 
 def lambda_handler(event, context):
+    records = event.get('Records', [])
+    if records and records[0].get('eventSource') == 'aws:dynamodb':
+        return handle_stream_event(event)
+
     try:
         init_driver()
     except Exception as e:
         print(f"Driver initialization failed: {e}")
         raise
 
-    for record in event.get('Records', []):
+    rows = []
+    failed_message_ids = []
+    for record in records:
         try:
-            # 1. SQS 메시지 바디 추출 및 JSON 디코딩
-            message_body_json_string = record.get('body')
-            data = json.loads(message_body_json_string)
-
-            # 💡 2. Cypher 쿼리에 필요한 매개변수 준비 (수정된 부분)
-            related_words_dict = data.get('relatedWords_KR', {}) # 
-            related_words_list = list(related_words_dict.values()) # 
-
-            params = {
-                'userId': data['userId'],
-                'scenarioId': data['scenarioId'],
-                'createdAtTs': int(data['createdAtTs']),
-                'createdAtIso': data['createdAtIso'],
-                'targetLanguage': data['targetLanguage'],
-                'originalWord': data['originalWord'],
-                'relatedWords': related_words_list, 
-            }
-
-            # 3. Neo4j 트랜잭션 실행
-            with driver.session() as session:
-                session.execute_write(execute_cypher_transaction, params)
-
-            print(f"Successfully processed message {record.get('messageId')} for user {params['userId']}")
-
-        except exceptions.ServiceUnavailable as e:
-            print(f"Neo4j Service Unavailable: {e}. Message will be retried.")
-            raise e
+            rows += [(record.get('messageId'), params) for params in build_rows(record)]
         except Exception as e:
-            print(f"Failed to process message {record.get('messageId')}. Error: {e}")
-            # 개발 중에는 상세 오류 확인을 위해 raise e 유지, 운영 시에는 필요에 따라 조절
-            raise e
+            print(f"Failed to parse message {record.get('messageId')}. Error: {e}")
+            failed_message_ids.append(record.get('messageId'))
+
+    # 3. Neo4j 배치 트랜잭션 실행
+    # 묶음 메시지는 row가 여러 개이므로 messageId 중복 제거
+    failed_ids, unavailable_ids, affected_user_langs = ingest_rows(rows)
+    failed_message_ids = list(dict.fromkeys(failed_message_ids + failed_ids + unavailable_ids))
+
+    after_ingest(rows, failed_message_ids, affected_user_langs)
+
+    print(f"Processed {len(records) - len(failed_message_ids)}/{len(records)} messages in batch.")
+    log_query_metrics()
 
-    return {'statusCode': 200}
\ No newline at end of file
+    # 4. 실패한 메시지만 재시도 (이미 반영된 메시지의 STUDIED.count 중복 증가 방지)
+    return batch_response(failed_message_ids)
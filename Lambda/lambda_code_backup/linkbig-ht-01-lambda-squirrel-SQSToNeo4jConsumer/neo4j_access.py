@@ -0,0 +1,142 @@
+import os
+import time
+from neo4j import GraphDatabase, READ_ACCESS, WRITE_ACCESS, exceptions
+
+# Neo4j 공통 접근 모듈 (word-history, SQSToNeo4jConsumer)
+# - 드라이버는 첫 쿼리 때 만들고 컨테이너가 살아 있는 동안 재사용합니다.
+# - cold start에서 verify_connectivity()로 왕복하지 않습니다. 연결 오류 재시도는 드라이버의 트랜잭션 함수
+#   (execute_read/execute_write)가 max_transaction_retry_time 안에서 새 연결로 처리합니다.
+# - Lambda는 호출 사이에 멈춰 있으므로 오래 쉰 연결은 liveness check로 걸러내고, 연결 수명은 길게 둡니다.
+URI = os.environ.get('NEO4J_URI')
+USER = os.environ.get('NEO4J_USER')
+PASSWORD = os.environ.get('NEO4J_PASSWORD')
+
+# 컨테이너 하나는 동시에 한 요청만 처리하므로 작은 풀로 충분합니다. (Consumer 병렬 쿼리 대비 여유분 포함)
+POOL_SIZE = int(os.environ.get('NEO4J_POOL_SIZE', '5'))
+MAX_CONNECTION_LIFETIME = int(os.environ.get('NEO4J_MAX_CONNECTION_LIFETIME', '3600'))
+LIVENESS_CHECK_TIMEOUT = int(os.environ.get('NEO4J_LIVENESS_CHECK_TIMEOUT', '30'))
+CONNECTION_TIMEOUT = float(os.environ.get('NEO4J_CONNECTION_TIMEOUT', '5'))
+# 트랜잭션 함수 재시도에 쓰는 최대 시간(초). 드라이버 기본값 30초는 API Gateway 제한(29초)보다 길어 줄여 둡니다.
+MAX_TRANSACTION_RETRY_TIME = float(os.environ.get('NEO4J_MAX_TRANSACTION_RETRY_TIME', '10'))
+
+_driver = None
+
+# 쿼리 이름별 누적 시간 (호출 단위로 log_query_metrics에서 출력 후 초기화)
+_query_metrics = {}
+
+
+def create_driver():
+    if not all([URI, USER, PASSWORD]):
+        raise EnvironmentError("Neo4j connection environment variables are missing.")
+    return GraphDatabase.driver(
+        URI,
+        auth=(USER, PASSWORD),
+        max_connection_pool_size=POOL_SIZE,
+        max_connection_lifetime=MAX_CONNECTION_LIFETIME,
+        liveness_check_timeout=LIVENESS_CHECK_TIMEOUT,
+        connection_timeout=CONNECTION_TIMEOUT,
+        max_transaction_retry_time=MAX_TRANSACTION_RETRY_TIME,
+        keep_alive=True,
+    )
+
+
+def get_driver():
+    """드라이버를 지연 생성합니다. 연결은 첫 쿼리 때 맺어집니다."""
+    global _driver
+    if _driver is None:
+        _driver = create_driver()
+        print("Neo4j driver created (lazy, no connectivity check).")
+    return _driver
+
+
+def reset_driver():
+    global _driver
+    if _driver is not None:
+        try:
+            _driver.close()
+        except Exception as e:
+            print(f"Failed to close Neo4j driver: {e}")
+    _driver = None
+
+
+def record_metric(name, elapsed_ms):
+    metric = _query_metrics.setdefault(name, {"count": 0, "totalMs": 0.0, "maxMs": 0.0})
+    metric["count"] += 1
+    metric["totalMs"] += elapsed_ms
+    metric["maxMs"] = max(metric["maxMs"], elapsed_ms)
+
+
+def log_query_metrics():
+    """누적된 쿼리 시간을 한 줄로 출력하고 초기화합니다. 핸들러 끝에서 호출합니다."""
+    if not _query_metrics:
+        return
+    summary = ", ".join(
+        f"{name}={m['count']}x/{m['totalMs']:.1f}ms(max {m['maxMs']:.1f}ms)"
+        for name, m in sorted(_query_metrics.items())
+    )
+    print(f"[Neo4j Metrics] {summary}")
+    _query_metrics.clear()
+
+
+def _run(access_mode, name, work, *args, **kwargs):
+    start = time.perf_counter()
+    try:
+        # 북마크 없이 세션을 열어 인과적 일관성 대기 없이 바로 실행합니다.
+        with get_driver().session(default_access_mode=access_mode) as session:
+            if access_mode == READ_ACCESS:
+                result = session.execute_read(work, *args, **kwargs)
+            else:
+                result = session.execute_write(work, *args, **kwargs)
+    except (exceptions.ServiceUnavailable, exceptions.SessionExpired):
+        record_metric(f"{name}.failed", (time.perf_counter() - start) * 1000)
+        raise
+    record_metric(name, (time.perf_counter() - start) * 1000)
+    return result
+
+
+def run_read(name, work, *args, **kwargs):
+    """읽기 트랜잭션 함수 work(tx, ...)를 실행하고 name으로 시간을 기록합니다."""
+    return _run(READ_ACCESS, name, work, *args, **kwargs)
+
+
+def run_write(name, work, *args, **kwargs):
+    """쓰기 트랜잭션 함수 work(tx, ...)를 실행하고 name으로 시간을 기록합니다."""
+    return _run(WRITE_ACCESS, name, work, *args, **kwargs)
+
+
+if __name__ == "__main__":
+    # cold start 벤치마크: 로컬 Neo4j 컨테이너에 대해 기존 방식(생성 + verify_connectivity + 쿼리)과
+    # 지연 생성 방식(생성 + 첫 쿼리)의 첫 응답까지 걸리는 시간을 비교합니다.
+    #   docker run --rm -p 7687:7687 -e NEO4J_AUTH=neo4j/password neo4j:5
+    #   NEO4J_URI=bolt://localhost:7687 NEO4J_USER=neo4j NEO4J_PASSWORD=password python neo4j_access.py
+    import argparse
+    import statistics
+
+    parser = argparse.ArgumentParser(description="Neo4j cold start 벤치마크")
+    parser.add_argument("--iterations", type=int, default=10)
+    args = parser.parse_args()
+
+    def first_query(tx):
+        return tx.run("RETURN 1 AS ok").single()["ok"]
+
+    def verify_then_query():
+        driver = GraphDatabase.driver(URI, auth=(USER, PASSWORD), max_connection_lifetime=300)
+        start = time.perf_counter()
+        driver.verify_connectivity()
+        with driver.session() as session:
+            session.execute_read(first_query)
+        elapsed = (time.perf_counter() - start) * 1000
+        driver.close()
+        return elapsed
+
+    def lazy_query():
+        reset_driver()
+        start = time.perf_counter()
+        run_read("first_query", first_query)
+        elapsed = (time.perf_counter() - start) * 1000
+        reset_driver()
+        return elapsed
+
+    for label, bench in (("verify_connectivity", verify_then_query), ("lazy", lazy_query)):
+        samples = [bench() for _ in range(args.iterations)]
+        print(f"{label:20s} median={statistics.median(samples):.1f}ms max={max(samples):.1f}ms")
@@ -0,0 +1,63 @@
+import os
+from neo4j import GraphDatabase, exceptions
+
+# 단어 그래프 스키마 (유니크 제약조건 + 인덱스)
+# 모든 구문은 IF NOT EXISTS로 작성되어 여러 번 실행해도 안전합니다.
+# 제약조건은 내부적으로 인덱스를 함께 만들기 때문에 MERGE가 레이블 전체 스캔을 하지 않게 됩니다.
+SCHEMA_STATEMENTS = [
+    # Consumer의 MERGE 키
+    "CREATE CONSTRAINT language_code_unique IF NOT EXISTS FOR (l:Language) REQUIRE l.code IS UNIQUE",
+    "CREATE CONSTRAINT user_id_unique IF NOT EXISTS FOR (u:User) REQUIRE u.id IS UNIQUE",
+    "CREATE CONSTRAINT scenario_id_language_unique IF NOT EXISTS FOR (s:Scenario) REQUIRE (s.id, s.language) IS UNIQUE",
+    "CREATE CONSTRAINT word_name_lang_unique IF NOT EXISTS FOR (w:Word) REQUIRE (w.name, w.lang) IS UNIQUE",
+    "CREATE CONSTRAINT user_word_stat_unique IF NOT EXISTS FOR (st:UserWordStat) REQUIRE (st.userId, st.word, st.lang) IS UNIQUE",
+    # word-history 조회 조건
+    "CREATE INDEX scenario_language IF NOT EXISTS FOR (s:Scenario) ON (s.language)",
+    "CREATE INDEX related_to_target_lang IF NOT EXISTS FOR ()-[r:RELATED_TO]-() ON (r.targetLang)",
+]
+
+# 컨테이너 당 한 번만 실행하기 위한 플래그
+_schema_applied = False
+
+
+def apply_schema(driver):
+    """스키마 구문을 순서대로 실행합니다. 실패한 구문은 로그만 남기고 계속 진행합니다."""
+    applied = 0
+    with driver.session() as session:
+        for statement in SCHEMA_STATEMENTS:
+            try:
+                session.run(statement).consume()
+                applied += 1
+            except exceptions.Neo4jError as e:
+                # 기존 데이터에 중복이 있으면 제약조건 생성이 실패할 수 있습니다.
+                print(f"[Neo4j Schema] Failed: {statement} -> {e.code}: {e.message}")
+    return applied
+
+
+def ensure_schema(driver):
+    """init_driver에서 호출: 컨테이너 당 한 번만 스키마를 적용합니다."""
+    global _schema_applied
+    if _schema_applied:
+        return
+    applied = apply_schema(driver)
+    _schema_applied = True
+    print(f"[Neo4j Schema] {applied}/{len(SCHEMA_STATEMENTS)} statements applied.")
+
+
+if __name__ == "__main__":
+    # CLI: NEO4J_URI / NEO4J_USER / NEO4J_PASSWORD 환경 변수로 접속해 스키마를 적용합니다.
+    uri = os.environ.get("NEO4J_URI")
+    user = os.environ.get("NEO4J_USER")
+    password = os.environ.get("NEO4J_PASSWORD")
+    if not all([uri, user, password]):
+        raise SystemExit("NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD 환경 변수가 필요합니다.")
+
+    with GraphDatabase.driver(uri, auth=(user, password)) as cli_driver:
+        applied = apply_schema(cli_driver)
+        with cli_driver.session() as session:
+            session.run("CALL db.awaitIndexes(300)").consume()
+            for record in session.run("SHOW CONSTRAINTS YIELD name, type RETURN name, type"):
+                print(f"constraint  {record['name']} ({record['type']})")
+            for record in session.run("SHOW INDEXES YIELD name, state RETURN name, state"):
+                print(f"index       {record['name']} ({record['state']})")
+    print(f"{applied}/{len(SCHEMA_STATEMENTS)} statements applied.")
@@ -0,0 +1,125 @@
+import json
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+# SQS SendMessageBatch 제한: 요청 당 최대 10건, 요청 전체 페이로드 256KB
+MAX_BATCH_ENTRIES = 10
+MAX_BATCH_BYTES = 256 * 1024
+
+# 실패한 엔트리만 재전송할 때의 재시도 설정 (지수 백오프 + 지터)
+MAX_ATTEMPTS = 4
+BACKOFF_BASE_SECONDS = 0.2
+
+# 동시에 보낼 배치 요청 수
+MAX_WORKERS = 4
+
+
+def body_size(body):
+    return len(body.encode("utf-8"))
+
+
+def pack_events(events, events_per_message):
+    """
+    (event_id, event_dict) 목록을 메시지 바디로 묶습니다.
+    events_per_message가 1이면 이벤트 하나가 메시지 하나이고(기존 형식),
+    2 이상이면 {"events": [...]} 형식으로 크기 제한 안에서 최대 events_per_message개까지 묶습니다.
+    반환값: [(message_id, [event_id, ...], body)]
+    """
+    if events_per_message <= 1:
+        return [
+            (event_id, [event_id], json.dumps(event, ensure_ascii=False))
+            for event_id, event in events
+        ]
+
+    messages = []
+    group_ids, group_events = [], []
+
+    def flush():
+        if group_events:
+            body = json.dumps({"events": group_events}, ensure_ascii=False)
+            messages.append((group_ids[0], list(group_ids), body))
+            group_ids.clear()
+            group_events.clear()
+
+    for event_id, event in events:
+        candidate = json.dumps({"events": group_events + [event]}, ensure_ascii=False)
+        if group_events and (len(group_events) >= events_per_message or body_size(candidate) > MAX_BATCH_BYTES):
+            flush()
+        group_ids.append(event_id)
+        group_events.append(event)
+    flush()
+    return messages
+
+
+def chunk_entries(entries):
+    """
+    SendMessageBatch 엔트리를 10건 / 256KB 이하 묶음으로 나눕니다.
+    반환값: (묶음 목록, 혼자서 제한을 넘어 보낼 수 없는 엔트리 Id 목록)
+    """
+    chunks, oversized_ids = [], []
+    current, current_bytes = [], 0
+    for entry in entries:
+        size = body_size(entry["MessageBody"])
+        if size > MAX_BATCH_BYTES:
+            print(f"SQS 전송 불가 {entry['Id']}: {size} bytes exceeds {MAX_BATCH_BYTES} bytes")
+            oversized_ids.append(entry["Id"])
+            continue
+        if current and (len(current) >= MAX_BATCH_ENTRIES or current_bytes + size > MAX_BATCH_BYTES):
+            chunks.append(current)
+            current, current_bytes = [], 0
+        current.append(entry)
+        current_bytes += size
+    if current:
+        chunks.append(current)
+    return chunks, oversized_ids
+
+
+def send_chunk(sqs, queue_url, entries):
+    """
+    한 묶음을 전송하고, 재시도 후에도 실패한 엔트리 Id 목록을 반환합니다.
+    Failed 중 SenderFault가 아닌 것(서버 측 일시 오류)만 골라 백오프 후 다시 보냅니다.
+    SenderFault는 다시 보내도 같은 결과라 바로 실패로 돌려줍니다. (호출 측에서 실패로 보고해 유실되지 않게 함)
+    """
+    pending = entries
+    rejected_ids = []
+    for attempt in range(MAX_ATTEMPTS):
+        if attempt:
+            time.sleep(BACKOFF_BASE_SECONDS * (2 ** (attempt - 1)) * (1 + random.random()))
+        try:
+            response = sqs.send_message_batch(QueueUrl=queue_url, Entries=pending)
+        except Exception as e:
+            # 요청 자체가 실패(스로틀링, 네트워크)하면 남은 묶음 전체를 다시 보냅니다.
+            print(f"SQS 배치 요청 실패 (시도 {attempt + 1}/{MAX_ATTEMPTS}): {e}")
+            continue
+
+        retry_ids = set()
+        for failure in response.get("Failed", []):
+            if failure.get("SenderFault"):
+                print(f"SQS 전송 영구 실패 {failure['Id']}: {failure.get('Code')} {failure.get('Message')}")
+                rejected_ids.append(failure["Id"])
+            else:
+                retry_ids.add(failure["Id"])
+
+        pending = [entry for entry in pending if entry["Id"] in retry_ids]
+        if not pending:
+            return rejected_ids
+        print(f"SQS 전송 중 {len(pending)}건 재시도 예정 (시도 {attempt + 1}/{MAX_ATTEMPTS})")
+
+    return rejected_ids + [entry["Id"] for entry in pending]
+
+
+def send_entries(sqs, queue_url, entries, max_workers=MAX_WORKERS):
+    """
+    엔트리를 10건 / 256KB 묶음으로 나눠 동시에 전송합니다.
+    성공한 엔트리는 다시 보내지 않으며, 최종적으로 실패한 엔트리 Id 목록만 반환합니다.
+    (일시 오류로 재시도가 끝난 것, SenderFault, 크기 제한 초과 모두 포함)
+    """
+    chunks, failed_ids = chunk_entries(entries)
+    if not chunks:
+        return failed_ids
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+        results = executor.map(lambda chunk: send_chunk(sqs, queue_url, chunk), chunks)
+        failed_ids += [entry_id for chunk_failed in results for entry_id in chunk_failed]
+    print(f"SQS 전송: {len(entries) - len(failed_ids)}/{len(entries)}건 성공 ({len(chunks)}개 배치 요청)")
+    return failed_ids
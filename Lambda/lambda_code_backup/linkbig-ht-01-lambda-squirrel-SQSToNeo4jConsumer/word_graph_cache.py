@@ -0,0 +1,87 @@
+import os
+import hashlib
+import boto3
+from botocore.exceptions import ClientError
+
+# 사용자/언어별 word-history 응답 캐시 (PK: cacheKey = "<userId>#<lang>")
+# - version: SQSToNeo4jConsumer가 해당 사용자의 적재가 성공할 때마다 1씩 올립니다.
+#   다른 사용자의 적재로 새 RELATED_TO가 생겨 이 사용자가 학습한 단어의 이웃(neighborCount 등)이 바뀐 경우에도 올립니다.
+# - cachedVersion/body/etag: word-history가 마지막으로 만든 응답과 그때의 version
+# cachedVersion == version이면 그래프가 바뀌지 않은 것이므로 Neo4j를 조회하지 않습니다.
+GRAPH_CACHE_TABLE = os.environ.get("GRAPH_CACHE_TABLE")
+
+# DynamoDB 아이템 최대 크기(400KB)보다 여유 있게 제한
+MAX_CACHED_BODY_BYTES = 350 * 1024
+
+dynamodb = boto3.resource("dynamodb")
+cache_table = dynamodb.Table(GRAPH_CACHE_TABLE) if GRAPH_CACHE_TABLE else None
+
+
+def cache_key(user_id, lang):
+    return f"{user_id}#{lang}"
+
+
+def make_etag(body):
+    return '"' + hashlib.sha256(body.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def bump_versions(user_langs):
+    """적재가 끝난 (userId, lang) 쌍의 version을 올려 기존 캐시를 무효화합니다."""
+    if not cache_table:
+        return 0
+    bumped = 0
+    for user_id, lang in set(user_langs):
+        try:
+            cache_table.update_item(
+                Key={"cacheKey": cache_key(user_id, lang)},
+                UpdateExpression="ADD version :one",
+                ExpressionAttributeValues={":one": 1}
+            )
+            bumped += 1
+        except ClientError as e:
+            # 실패하면 캐시가 잠시 오래된 응답을 줄 수 있지만, 다음 적재 때 다시 올라갑니다.
+            print(f"[Graph Cache] Failed to bump version for {user_id}/{lang}: {e}")
+    return bumped
+
+
+def get_cache_entry(user_id, lang):
+    """
+    캐시 아이템을 읽어 (version, body, etag)를 반환합니다.
+    캐시가 현재 version과 맞지 않으면 body/etag는 None입니다.
+    """
+    if not cache_table:
+        return 0, None, None
+    try:
+        item = cache_table.get_item(
+            Key={"cacheKey": cache_key(user_id, lang)},
+            ConsistentRead=True
+        ).get("Item") or {}
+    except ClientError as e:
+        print(f"[Graph Cache] Lookup failed: {e}")
+        return 0, None, None
+
+    version = int(item.get("version", 0))
+    if "body" in item and int(item.get("cachedVersion", -1)) == version:
+        return version, item["body"], item.get("etag")
+    return version, None, None
+
+
+def save_cache_entry(user_id, lang, version, body, etag):
+    """조회 시작 시점의 version이 그대로일 때만 응답을 저장합니다. (조회 중 적재된 경우 저장하지 않음)"""
+    if not cache_table:
+        return False
+    if len(body.encode("utf-8")) > MAX_CACHED_BODY_BYTES:
+        print(f"[Graph Cache] Body too large to cache for {user_id}/{lang}")
+        return False
+    try:
+        cache_table.update_item(
+            Key={"cacheKey": cache_key(user_id, lang)},
+            UpdateExpression="SET body = :body, etag = :etag, cachedVersion = :v",
+            ConditionExpression="attribute_not_exists(version) OR version = :v",
+            ExpressionAttributeValues={":body": body, ":etag": etag, ":v": version}
+        )
+        return True
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            print(f"[Graph Cache] Save failed: {e}")
+        return False
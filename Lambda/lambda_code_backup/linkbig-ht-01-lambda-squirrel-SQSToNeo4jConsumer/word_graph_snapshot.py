@@ -0,0 +1,97 @@
+import os
+import json
+import gzip
+import time
+import boto3
+from botocore.exceptions import BotoCoreError, ClientError
+
+# 사용자/언어별 단어 그래프 스냅샷 (S3)
+# SQSToNeo4jConsumer가 적재 후 Neo4j에서 읽어 만들고, word-history가 Neo4j 없이 바로 읽습니다.
+# 단어 이름은 words 배열에 한 번만 저장하고(인덱스로 참조), 지표는 같은 순서의 배열,
+# RELATED_TO 관계는 작은 인덱스가 앞에 오는 [i, j] 정수 쌍으로 저장합니다.
+#   {"format": 1, "userId": ..., "lang": ..., "builtAt": ms,
+#    "words": [...], "counts": [...], "lastStudied": [...], "edges": [[i, j], ...]}
+# counts가 0인 단어는 사용자가 직접 학습하지 않은 이웃 단어입니다.
+SNAPSHOT_BUCKET = os.environ.get("SNAPSHOT_BUCKET")
+SNAPSHOT_PREFIX = os.environ.get("SNAPSHOT_PREFIX", "word-graph-snapshots/")
+SNAPSHOT_FORMAT = 1
+
+s3_client = boto3.client("s3")
+
+
+def snapshot_key(user_id, lang):
+    return f"{SNAPSHOT_PREFIX}{user_id}/{lang}.json.gz"
+
+
+def build_snapshot(user_id, lang, records):
+    """
+    records: [{"word", "count", "lastStudied", "neighbors": [name, ...]}] (사용자가 학습한 단어 기준)
+    """
+    index = {}
+    words, counts, last_studied = [], [], []
+
+    def intern(name):
+        if name not in index:
+            index[name] = len(words)
+            words.append(name)
+            counts.append(0)
+            last_studied.append(0)
+        return index[name]
+
+    for record in records:
+        i = intern(record["word"])
+        counts[i] = int(record["count"])
+        last_studied[i] = int(record["lastStudied"])
+
+    edges = set()
+    for record in records:
+        i = index[record["word"]]
+        for neighbor in record["neighbors"]:
+            j = intern(neighbor)
+            if i != j:
+                edges.add((min(i, j), max(i, j)))
+
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "userId": user_id,
+        "lang": lang,
+        "builtAt": int(time.time() * 1000),
+        "words": words,
+        "counts": counts,
+        "lastStudied": last_studied,
+        "edges": sorted([i, j] for i, j in edges),
+    }
+
+
+def save_snapshot(snapshot):
+    body = gzip.compress(json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    s3_client.put_object(
+        Bucket=SNAPSHOT_BUCKET,
+        Key=snapshot_key(snapshot["userId"], snapshot["lang"]),
+        Body=body,
+        ContentType="application/json",
+        ContentEncoding="gzip"
+    )
+    return len(body)
+
+
+def load_snapshot(user_id, lang):
+    """
+    스냅샷을 읽습니다. 없거나, 읽을 수 없거나, 형식이 다르면 None (호출 측에서 Neo4j로 조회).
+    ListBucket 권한이 없으면 없는 키도 NoSuchKey가 아니라 AccessDenied로 오므로 오류 코드와 상관없이 None입니다.
+    """
+    if not SNAPSHOT_BUCKET:
+        return None
+    try:
+        obj = s3_client.get_object(Bucket=SNAPSHOT_BUCKET, Key=snapshot_key(user_id, lang))
+        snapshot = json.loads(gzip.decompress(obj["Body"].read()).decode("utf-8"))
+    except ClientError as e:
+        if e.response["Error"]["Code"] not in ("NoSuchKey", "404"):
+            print(f"[Snapshot] Failed to load {user_id}/{lang}: {e}")
+        return None
+    except (BotoCoreError, OSError, ValueError) as e:
+        print(f"[Snapshot] Failed to load {user_id}/{lang}: {e}")
+        return None
+    if snapshot.get("format") != SNAPSHOT_FORMAT:
+        return None
+    return snapshot
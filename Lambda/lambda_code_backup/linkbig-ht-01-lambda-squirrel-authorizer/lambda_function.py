@@ -1,17 +1,19 @@
-import json
 import os
-from db import get_connection
+from db import get_cursor
+from log_utils import get_logger
+
+logger = get_logger("Authorizer")
 
 def lambda_handler(event, context):
-    print("[Authorizer] Incoming event:")
-    print(json.dumps(event, ensure_ascii=False))
+    logger.start_request(context)
+    logger.debug("Incoming event", event=event)
 
     db_host_value = os.environ.get("DB_HOST", "NOT_FOUND")
     user_uuid = None
 
     # ✅ 1️⃣ REST API 요청 (TOKEN Authorizer 형식)
     if "authorizationToken" in event:
-        print("[Authorizer] Detected REST TOKEN type event")
+        logger.debug("Detected REST TOKEN type event")
         user_uuid = event["authorizationToken"]
 
     # ✅ 2️⃣ REST API 요청 (REQUEST Authorizer 형식)
@@ -19,7 +21,7 @@ def lambda_handler(event, context):
         headers = event.get("headers", {})
         user_uuid = headers.get("uuid") or headers.get("Authorization")
 
-    print(f"[Authorizer] Extracted user_uuid: {user_uuid}")
+    logger.debug("Extracted user_uuid: %s", user_uuid)
 
     # ✅ UUID가 없으면 Deny
     if not user_uuid:
@@ -30,17 +32,15 @@ def lambda_handler(event, context):
             reason="Missing user_uuid header"
         )
 
-    connection = None
     cursor = None
 
     try:
-        connection = get_connection()
-        cursor = connection.cursor(dictionary=True)
+        cursor = get_cursor(dictionary=True)
 
         # ✅ uuid로 gender, nickname 조회
         cursor.execute("SELECT gender, nickname FROM user WHERE uuid = %s", (user_uuid,))
         user = cursor.fetchone()
-        print(f"[Authorizer] DB Query Result: {user}")
+        logger.debug("DB Query Result", user=user)
 
         if not user:
             return generate_policy(
@@ -60,7 +60,7 @@ def lambda_handler(event, context):
             gender_for_context = 'female'
         else:
             gender_for_context = 'male'
-            print(f"[Authorizer] Warning: Unexpected gender value '{gender_from_db}' for user {user_uuid}. Defaulting to 'male'.")
+            logger.warning("Unexpected gender value '%s' for user %s. Defaulting to 'male'.", gender_from_db, user_uuid)
 
         # ✅ 최종 허용 정책 리턴
         return generate_policy(
@@ -76,7 +76,7 @@ def lambda_handler(event, context):
         )
 
     except Exception as e:
-        print(f"[Authorizer] Error: {e}")
+        logger.error("Error: %s", e)
         return generate_policy(
             principal_id="anonymous",
             effect="Deny",
@@ -85,10 +85,9 @@ def lambda_handler(event, context):
         )
 
     finally:
-        if connection and connection.is_connected():
-            if cursor:
-                cursor.close()
-            connection.close()
+        # 커넥션은 컨테이너 단위로 재사용하므로 커서만 닫습니다.
+        if cursor:
+            cursor.close()
 
 
 def generate_policy(principal_id, effect, resource, reason="", extra_context=None):
@@ -111,5 +110,5 @@ def generate_policy(principal_id, effect, resource, reason="", extra_context=Non
         "context": context
     }
 
-    print(f"[Authorizer] Generated policy: {json.dumps(policy, ensure_ascii=False)}")
+    logger.debug("Generated policy", policy=policy)
     return policy
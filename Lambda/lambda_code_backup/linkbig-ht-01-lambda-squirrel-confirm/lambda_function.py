@@ -17,9 +17,14 @@ polly = boto3.client("polly")
 BUCKET_NAME = os.environ.get("BUCKET_NAME")
 LEARNING_TABLE = os.environ.get("LEARNING_TABLE")
 MASTER_TABLE = os.environ.get("MASTER_TABLE")
+# 사용자 공통 단어 번역 캐시 (word_hash -> 번역 결과 + 음성 키)
+WORD_CACHE_TABLE = os.environ.get("WORD_CACHE_TABLE")
+# 프롬프트/출력 형식이 바뀌면 올려서 기존 캐시를 무효화합니다.
+TRANSLATION_PROMPT_VERSION = 1
 
 learning_table = dynamodb.Table(LEARNING_TABLE)
 master_table = dynamodb.Table(MASTER_TABLE)
+word_cache_table = dynamodb.Table(WORD_CACHE_TABLE) if WORD_CACHE_TABLE else None
 
 CORS_HEADERS = {
     "Access-Control-Allow-Origin": "*",
@@ -28,6 +33,211 @@ CORS_HEADERS = {
     "Content-Type": "application/json"
 }
 
+# 음성 생성(head_object 또는 Polly+put_object) 병렬 처리 개수
+AUDIO_MAX_WORKERS = int(os.environ.get("AUDIO_MAX_WORKERS", "5"))
+
+POLLY_VOICES = {
+    "ja": "Mizuki",
+    "zh": "Zhiyu",
+    "es_male": "Enrique",
+    "es_female": "Conchita",
+}
+POLLY_LANGUAGE_CODES = {"ja": "ja-JP", "zh": "cmn-CN", "es": "es-ES"}
+
+# 확정된 업로드 표시 (word-service가 붙이는 upload-status=pending을 대체)
+CONFIRMED_UPLOAD_TAG = {"Key": "upload-status", "Value": "confirmed"}
+
+
+def upsert_master_record(user_id, word_hash, original_word, ts, created_at_iso):
+    """
+    마스터 테이블을 한 번의 update_item으로 생성/갱신하고, 갱신 전 기록을 previousLearning 형태로 반환합니다.
+    같은 사용자가 동시에 confirm 해도 totalCount가 원자적으로 증가합니다.
+    """
+    response = master_table.update_item(
+        Key={"userId": user_id, "word_lang_gender": word_hash},
+        UpdateExpression=(
+            "SET originalWord = if_not_exists(originalWord, :ow), "
+            "lastLearnedAtTs = :ts, lastLearnedAtIso = :iso, "
+            "totalCount = if_not_exists(totalCount, :zero) + :inc"
+        ),
+        ExpressionAttributeValues={":ow": original_word, ":ts": ts, ":iso": created_at_iso, ":zero": 0, ":inc": 1},
+        ReturnValues="UPDATED_OLD",
+    )
+    existing = response.get("Attributes")
+    if not existing or "totalCount" not in existing:
+        return None
+
+    last_learned_at_iso_utc = existing.get("lastLearnedAtIso")
+    last_learned_at_kst_str = ""
+    if last_learned_at_iso_utc:
+        try:
+            utc_dt = datetime.fromisoformat(last_learned_at_iso_utc.replace('Z', '+00:00'))
+            kst_dt = utc_dt.astimezone(ZoneInfo("Asia/Seoul"))
+            last_learned_at_kst_str = kst_dt.strftime("%Y-%m-%d %H:%M:%S")
+        except (TypeError, ValueError):
+            last_learned_at_kst_str = str(last_learned_at_iso_utc)
+
+    return {
+        "originalWord": existing.get("originalWord"),
+        "lastLearnedAtIso": last_learned_at_kst_str,
+        "lastLearnedAtTs": int(existing.get("lastLearnedAtTs", 0)),
+        "totalCount": int(existing.get("totalCount", 0)),
+    }
+
+
+def translate_word(original_word, target_lang, gender):
+    """Bedrock으로 단어 번역 + 연관 단어 + 발음을 생성합니다."""
+    gender_instruction = f" Since the target language is Spanish, please ensure the translation and related words reflect the '{gender}' gender." if target_lang == "es" else ""
+    prompt = f"""
+    Translate the Korean word '{original_word}' into {target_lang}.
+    {gender_instruction}
+    Also generate 4 related Korean words with their translations in {target_lang}.
+    Additionally, provide the pronunciation for the main word and each related word in the target language.
+    For Japanese, use Hiragana. For Chinese, use Pinyin. For Spanish, use standard phonetic spelling.
+    Format response strictly as JSON:
+    {{
+        "main": "<translation>",
+        "related_kr": ["word1","word2","word3","word4"],
+        "related_translations": ["t1","t2","t3","t4"],
+        "pronunciation": {{
+            "main": "<pronunciation of main word>",
+            "related_1": "<pronunciation of word1>",
+            "related_2": "<pronunciation of word2>",
+            "related_3": "<pronunciation of word3>",
+            "related_4": "<pronunciation of word4>"
+        }}
+    }}
+    """
+
+    request_body = {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": 300,
+        "messages": [{"role": "user", "content": [{"type": "text", "text": prompt}]}],
+    }
+
+    response = bedrock.invoke_model(
+        body=json.dumps(request_body),
+        modelId="anthropic.claude-3-5-sonnet-20240620-v1:0",
+        contentType="application/json",
+        accept="application/json",
+    )
+
+    result = json.loads(response["body"].read())
+    return json.loads(result["content"][0]["text"])
+
+
+def get_cached_translation(word_hash):
+    """공통 캐시에서 번역 결과와 음성 키를 조회합니다. 버전이 다르거나 없으면 (None, {})."""
+    if not word_cache_table:
+        return None, {}
+    try:
+        cached = word_cache_table.get_item(Key={"word_hash": word_hash}).get("Item")
+    except ClientError as e:
+        print(f"[Word Cache] 조회 실패: {e}")
+        return None, {}
+    if not cached or int(cached.get("version", 0)) != TRANSLATION_PROMPT_VERSION:
+        return None, {}
+    return json.loads(cached["translationData"]), cached.get("audioFileKeys", {})
+
+
+def save_translation_cache(word_hash, original_word, target_lang, translation_data, audio_file_keys):
+    """번역 결과와 음성 키를 공통 캐시에 저장합니다. 실패해도 요청은 계속 진행합니다."""
+    if not word_cache_table:
+        return
+    item = {
+        "word_hash": word_hash,
+        "version": TRANSLATION_PROMPT_VERSION,
+        "originalWord": original_word,
+        "targetLanguage": target_lang,
+        "translationData": json.dumps(translation_data, ensure_ascii=False),
+        "updatedAtTs": int(time.time()),
+    }
+    if audio_file_keys:
+        item["audioFileKeys"] = audio_file_keys
+    try:
+        word_cache_table.put_item(Item=item)
+    except ClientError as e:
+        print(f"[Word Cache] 저장 실패: {e}")
+
+
+def get_translation(word_hash, original_word, target_lang, gender):
+    """캐시에 있으면 그대로 쓰고, 없을 때만 Bedrock을 호출합니다."""
+    translation_data, cached_audio_keys = get_cached_translation(word_hash)
+    if translation_data:
+        return translation_data, cached_audio_keys, True
+    return translate_word(original_word, target_lang, gender), {}, False
+
+
+def presign_audio(s3_key):
+    return s3.generate_presigned_url(
+        "get_object",
+        Params={"Bucket": BUCKET_NAME, "Key": s3_key},
+        ExpiresIn=3600
+    )
+
+
+def finalize_image(file_key, new_key):
+    """
+    업로드 이미지를 확정합니다. 확정된 이미지에는 upload-status=confirmed 태그를 붙여
+    수명 주기 규칙(pending만 삭제)에서 빠지고 word-service가 다시 인식하지 않게 합니다.
+    최종 경로로 바로 업로드된 경우 태그만 바꾸고,
+    이전 버전 앱의 temp-uploads 업로드는 기존처럼 사용자 경로로 이동합니다.
+    이전 요청이 이동까지 마쳤다면(원본 없음 + 대상 있음) 그대로 성공으로 처리해 클라이언트 재시도가 가능합니다.
+    """
+    if file_key == new_key:
+        s3.put_object_tagging(Bucket=BUCKET_NAME, Key=new_key, Tagging={"TagSet": [CONFIRMED_UPLOAD_TAG]})
+        return
+    try:
+        # 기본 COPY는 원본의 pending 태그까지 복사하므로 태그를 confirmed로 교체합니다.
+        s3.copy_object(
+            Bucket=BUCKET_NAME,
+            CopySource={"Bucket": BUCKET_NAME, "Key": file_key},
+            Key=new_key,
+            TaggingDirective="REPLACE",
+            Tagging=f"{CONFIRMED_UPLOAD_TAG['Key']}={CONFIRMED_UPLOAD_TAG['Value']}"
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] not in ("NoSuchKey", "404"):
+            raise
+        # 대상도 없으면 head_object가 ClientError를 올립니다.
+        s3.head_object(Bucket=BUCKET_NAME, Key=new_key)
+        print(f"이미 확정된 이미지입니다: {new_key}")
+        return
+    s3.delete_object(Bucket=BUCKET_NAME, Key=file_key)
+
+
+def synthesize_audio(text, word_key, voice_id, target_lang):
+    """이미 생성된 음성이 있으면 재활용하고, 없으면 Polly로 생성해 S3에 저장합니다."""
+    file_hash = hashlib.sha256(word_key.encode()).hexdigest()
+    s3_key = f"audios/{file_hash}.mp3"
+    reused = False
+    try:
+        s3.head_object(Bucket=BUCKET_NAME, Key=s3_key)
+        reused = True
+    except ClientError:
+        speech = polly.synthesize_speech(
+            Text=text,
+            OutputFormat="mp3",
+            VoiceId=voice_id,
+            LanguageCode=POLLY_LANGUAGE_CODES[target_lang],
+        )
+        audio_stream = speech["AudioStream"].read()
+        s3.put_object(
+            Bucket=BUCKET_NAME,
+            Key=s3_key,
+            Body=audio_stream,
+            ContentType="audio/mpeg"
+        )
+    return s3_key, presign_audio(s3_key), reused
+
+
+def timed(func, *args):
+    """func 실행 결과와 소요 시간(초)을 함께 반환합니다."""
+    start = time.time()
+    result = func(*args)
+    return result, time.time() - start
+
+
 def lambda_handler(event, context):
     try:
         # OPTIONS 요청 처리
@@ -77,173 +287,102 @@ def lambda_handler(event, context):
             key_base += f"#{gender}"
         word_hash = hashlib.sha256(key_base.encode()).hexdigest()
 
-        # 4. 마스터 테이블 기존 학습 기록 조회
-        existing = master_table.get_item(Key={"userId": user_id, "word_lang_gender": word_hash}).get("Item")
-        prev_record = None
-        if existing:
-            last_learned_at_iso_utc = existing.get("lastLearnedAtIso")
-            last_learned_at_kst_str = ""
-            if last_learned_at_iso_utc:
-                try:
-                    utc_dt = datetime.fromisoformat(last_learned_at_iso_utc.replace('Z', '+00:00'))
-                    kst_dt = utc_dt.astimezone(ZoneInfo("Asia/Seoul"))
-                    last_learned_at_kst_str = kst_dt.strftime("%Y-%m-%d %H:%M:%S")
-                except (TypeError, ValueError):
-                    last_learned_at_kst_str = str(last_learned_at_iso_utc)
-
-            prev_record = {
-                "originalWord": existing.get("originalWord"),
-                "lastLearnedAtIso": last_learned_at_kst_str,
-                "lastLearnedAtTs": int(existing.get("lastLearnedAtTs", 0)),
-                "totalCount": int(existing.get("totalCount", 0)),
-            }
-
-        # 5. Bedrock 프롬프트 (발음 포함)
-        gender_instruction = f" Since the target language is Spanish, please ensure the translation and related words reflect the '{gender}' gender." if target_lang == "es" else ""
-        prompt = f"""
-        Translate the Korean word '{original_word}' into {target_lang}.
-        {gender_instruction}
-        Also generate 4 related Korean words with their translations in {target_lang}.
-        Additionally, provide the pronunciation for the main word and each related word in the target language.
-        For Japanese, use Hiragana. For Chinese, use Pinyin. For Spanish, use standard phonetic spelling.
-        Format response strictly as JSON:
-        {{
-            "main": "<translation>",
-            "related_kr": ["word1","word2","word3","word4"],
-            "related_translations": ["t1","t2","t3","t4"],
-            "pronunciation": {{
-                "main": "<pronunciation of main word>",
-                "related_1": "<pronunciation of word1>",
-                "related_2": "<pronunciation of word2>",
-                "related_3": "<pronunciation of word3>",
-                "related_4": "<pronunciation of word4>"
-            }}
-        }}
-        """
+        file_ext = file_key.split(".")[-1]
+        new_key = f"user/{user_id}/uploads/{scenario_id}.{file_ext}"
 
-        request_body = {
-            "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": 300,
-            "messages": [{"role": "user", "content": [{"type": "text", "text": prompt}]}],
-        }
+        stage_times = {}
+        reused_count = 0
+        generated_count = 0
+        audio_urls = {}
+        audio_file_keys = {}
 
-        response = bedrock.invoke_model(
-            body=json.dumps(request_body),
-            modelId="anthropic.claude-3-5-sonnet-20240620-v1:0",
-            contentType="application/json",
-            accept="application/json",
+        # 4~6. 번역 (실패하면 이미지/DB를 건드리지 않으므로 클라이언트가 같은 fileKey로 재시도할 수 있음)
+        (translation_data, cached_audio_keys, cache_hit), stage_times["translation"] = timed(
+            get_translation, word_hash, original_word, target_lang, gender
         )
 
-        result = json.loads(response["body"].read())
-        translation_data = json.loads(result["content"][0]["text"])
+        ts = int(time.time())
+        created_at_iso = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
 
-        # 6. S3 이미지 이동
-        file_ext = file_key.split(".")[-1]
-        new_key = f"user/{user_id}/{scenario_id}.{file_ext}"
-        s3.copy_object(Bucket=BUCKET_NAME, CopySource={"Bucket": BUCKET_NAME, "Key": file_key}, Key=new_key)
-        s3.delete_object(Bucket=BUCKET_NAME, Key=file_key)
+        # 번역 이후 단계는 서로 독립적이므로 함께 실행합니다. (음성 작업 외에 이미지 확정/마스터 갱신 몫 2개 추가)
+        with ThreadPoolExecutor(max_workers=AUDIO_MAX_WORKERS + 2) as executor:
+            # 7. S3 이미지 확정 (finalize_image는 재시도해도 안전하므로 DB 저장을 기다리지 않음)
+            finalize_future = executor.submit(timed, finalize_image, file_key, new_key)
+            # 8. 마스터 테이블 생성/갱신 (갱신 전 기록을 previousLearning으로 사용)
+            master_future = executor.submit(upsert_master_record, user_id, word_hash, original_word, ts, created_at_iso)
 
-        # 7. Polly 음성 생성 (ja, zh, es)
-        audio_urls = {}
-        audio_file_keys = {}
-        if target_lang in ["ja", "zh", "es"]:
-            voices = {
-                "ja": "Mizuki",
-                "zh": "Zhiyu",
-                "es_male": "Enrique",
-                "es_female": "Conchita",
-            }
-            voice_id = (
-                voices["es_male"] if target_lang == "es" and gender == "male"
-                else voices["es_female"] if target_lang == "es" and gender == "female"
-                else voices[target_lang]
-            )
-
-            def synthesize_audio(text, word_key):
-                file_hash = hashlib.sha256(word_key.encode()).hexdigest()
-                s3_key = f"audios/{file_hash}.mp3"
-                reused = False
-                try:
-                    s3.head_object(Bucket=BUCKET_NAME, Key=s3_key)
-                    reused = True
-                except ClientError:
-                    speech = polly.synthesize_speech(
-                        Text=text,
-                        OutputFormat="mp3",
-                        VoiceId=voice_id,
-                        LanguageCode={"ja": "ja-JP", "zh": "cmn-CN", "es": "es-ES"}[target_lang],
-                    )
-                    audio_stream = speech["AudioStream"].read()
-                    s3.put_object(
-                        Bucket=BUCKET_NAME,
-                        Key=s3_key,
-                        Body=audio_stream,
-                        ContentType="audio/mpeg"
-                    )
-                presigned_url = s3.generate_presigned_url(
-                    "get_object",
-                    Params={"Bucket": BUCKET_NAME, "Key": s3_key},
-                    ExpiresIn=3600
+            # 9. Polly 음성 생성 (ja, zh, es) - main + related 단어 병렬 처리
+            if target_lang in POLLY_LANGUAGE_CODES:
+                voice_id = (
+                    POLLY_VOICES["es_male"] if target_lang == "es" and gender == "male"
+                    else POLLY_VOICES["es_female"] if target_lang == "es" and gender == "female"
+                    else POLLY_VOICES[target_lang]
                 )
-                print(f"[Polly Stats] reused={1 if reused else 0}, generated={0 if reused else 1}, key={word_key}")
-                return s3_key, presigned_url
-
-            # main + related 단어 순차 처리
-            tasks = [("main", translation_data["main"], f"{original_word}#{target_lang}" + (f"#{gender}" if target_lang=="es" else ""))]
-            for i, text in enumerate(translation_data["related_translations"]):
-                related_key_str = f"{translation_data['related_kr'][i]}#{target_lang}" + (f"#{gender}" if target_lang=="es" else "")
-                tasks.append((f"related_{i+1}", text, related_key_str))
-
-            # 순차 실행 (재활용 + 순차 방식)
-            start = time.time()
-            for name, text, key_str in tasks:
-                s3_key, url = synthesize_audio(text, key_str)
-                audio_urls[name] = url
-                audio_file_keys[name] = s3_key
-            end = time.time()
-            print(f"[Polly Stats] total_duration={end - start:.3f}s (재활용+순차)")
-
-
-        # 8. DynamoDB 저장
-        ts = int(time.time())
-        created_at_iso = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-        related_words_kr_dict = {f"related_{i+1}": w for i, w in enumerate(translation_data["related_kr"])}
-        translation_details_dict = {"main": translation_data["main"]}
-        translation_details_dict.update({f"related_{i+1}": t for i, t in enumerate(translation_data["related_translations"])})
-        pronunciation_dict = translation_data.get("pronunciation", {})
-        item = {
-            "userId": user_id,
-            "createdAtTs": ts,
-            "createdAtIso": created_at_iso,
-            "scenarioId": scenario_id,
-            "originalWord": original_word,
-            "relatedWords_kr": related_words_kr_dict,
-            "translationDetails": translation_details_dict,
-            "fileKey": new_key,
-            "targetLanguage": target_lang,
-            "pronunciation": translation_data.get("pronunciation", {})
-        }
-        if audio_file_keys:
-            item["audioFileKeys"] = audio_file_keys
 
-        learning_table.put_item(Item=item)
+                tasks = [("main", translation_data["main"], f"{original_word}#{target_lang}" + (f"#{gender}" if target_lang=="es" else ""))]
+                for i, text in enumerate(translation_data["related_translations"]):
+                    related_key_str = f"{translation_data['related_kr'][i]}#{target_lang}" + (f"#{gender}" if target_lang=="es" else "")
+                    tasks.append((f"related_{i+1}", text, related_key_str))
+
+                start = time.time()
+                # 캐시에 음성 키가 있으면 head_object/Polly 없이 presigned URL만 생성
+                for name, _, _ in tasks:
+                    if name in cached_audio_keys:
+                        audio_file_keys[name] = cached_audio_keys[name]
+                        audio_urls[name] = presign_audio(cached_audio_keys[name])
+                        reused_count += 1
+
+                futures = {
+                    executor.submit(synthesize_audio, text, key_str, voice_id, target_lang): name
+                    for name, text, key_str in tasks
+                    if name not in cached_audio_keys
+                }
+                for future in as_completed(futures):
+                    name = futures[future]
+                    s3_key, url, reused = future.result()
+                    audio_urls[name] = url
+                    audio_file_keys[name] = s3_key
+                    if reused:
+                        reused_count += 1
+                    else:
+                        generated_count += 1
+                stage_times["polly"] = time.time() - start
+
+            # 캐시 미스였거나 새로 생성된 음성이 있으면 공통 캐시 갱신
+            if not cache_hit or audio_file_keys != cached_audio_keys:
+                save_translation_cache(word_hash, original_word, target_lang, translation_data, audio_file_keys)
+
+            # 10. 학습 기록 저장 (음성 키가 필요해 Polly 이후에 저장하며, 마스터 갱신과는 동시에 진행)
+            related_words_kr_dict = {f"related_{i+1}": w for i, w in enumerate(translation_data["related_kr"])}
+            translation_details_dict = {"main": translation_data["main"]}
+            translation_details_dict.update({f"related_{i+1}": t for i, t in enumerate(translation_data["related_translations"])})
+            item = {
+                "userId": user_id,
+                "createdAtTs": ts,
+                "createdAtIso": created_at_iso,
+                "scenarioId": scenario_id,
+                "originalWord": original_word,
+                "relatedWords_kr": related_words_kr_dict,
+                "translationDetails": translation_details_dict,
+                "fileKey": new_key,
+                "targetLanguage": target_lang,
+                "pronunciation": translation_data.get("pronunciation", {})
+            }
+            if audio_file_keys:
+                item["audioFileKeys"] = audio_file_keys
+
+            learning_table.put_item(Item=item)
+
+            prev_record = master_future.result()
+            _, stage_times["s3_finalize"] = finalize_future.result()
+
+        stage_stats = ", ".join(f"{stage}={duration:.3f}s" for stage, duration in stage_times.items())
+        print(f"[Polly Stats] reused={reused_count}, generated={generated_count}, cache_hit={1 if cache_hit else 0}, {stage_stats} (재활용+병렬)")
 
-        # 9. 이미지 presigned URL
+        # 11. 이미지 presigned URL
         image_url = s3.generate_presigned_url("get_object", Params={"Bucket": BUCKET_NAME, "Key": new_key}, ExpiresIn=3600)
 
-        # 10. 마스터 테이블 업데이트
-        if existing:
-            master_table.update_item(
-                Key={"userId": user_id, "word_lang_gender": word_hash},
-                UpdateExpression="SET lastLearnedAtTs = :ts, lastLearnedAtIso = :iso, totalCount = totalCount + :inc",
-                ExpressionAttributeValues={":ts": ts, ":iso": created_at_iso, ":inc": 1}
-            )
-        else:
-            master_table.put_item(
-                Item={"userId": user_id, "word_lang_gender": word_hash, "originalWord": original_word, "lastLearnedAtTs": ts, "lastLearnedAtIso": created_at_iso, "totalCount": 1}
-            )
-
-        # 11. 응답 반환
+        # 12. 응답 반환
         response_body = {
             "imageUrl": image_url,
             "originalWord": original_word,
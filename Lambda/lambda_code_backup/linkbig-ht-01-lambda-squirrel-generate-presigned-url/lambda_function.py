@@ -36,8 +36,11 @@ def lambda_handler(event, context):
             }
 
         # 3️. UUID로 파일 이름 생성
+        # confirm 단계의 복사/삭제를 없애기 위해 처음부터 최종 경로(user/{user_id}/uploads/{scenarioId})로 업로드합니다.
+        # user/{user_id}/ 아래의 다른 파일(단문 학습 음성 등)과 섞이지 않도록 사진은 uploads/ 아래에만 둡니다.
+        # 확정되지 않은 업로드는 word-service가 붙이는 upload-status=pending 태그 기준으로 S3 수명 주기 규칙이 정리합니다.
         file_uuid = str(uuid.uuid4())
-        file_name = f"temp-uploads/{file_uuid}.{file_ext}"
+        file_name = f"user/{user_id}/uploads/{file_uuid}.{file_ext}"
 
         # 4️. Presigned URL 생성 (S3 PUT)
         presigned_url = s3_client.generate_presigned_url(
@@ -5,6 +5,8 @@ from decimal import Decimal
 from urllib.parse import unquote_plus
 import re
 import random
+from structured_output import generate_structured, LEARNING_ACTIVITIES_SCHEMA
+from polly_batch import synthesize_batch, upload_all
 
 # DynamoDB 특수 포맷 변환을 위한 Deserializer (권장)
 from boto3.dynamodb.types import TypeDeserializer
@@ -13,6 +15,8 @@ BUCKET_NAME = os.environ.get("BUCKET_NAME")
 VIDEO_TABLE = os.environ.get("VIDEO_TABLE")
 DEFAULT_REGION = os.environ.get("AWS_REGION", "ap-northeast-1")
 polly = boto3.client("polly")
+# 일괄 합성 모드: 스크립트와 추천 답변을 Polly 한 번(SSML <mark> + speech mark)에 합성해 문장별로 자릅니다.
+TTS_BATCH_MODE = os.environ.get("TTS_BATCH_MODE", "false").lower() == "true"
 
 # 클라이언트 초기화
 s3_client = boto3.client("s3")
@@ -126,31 +130,20 @@ def call_bedrock_for_quiz_generation(lang_script, ko_script):
       ]
     }}
 
-    The response MUST ONLY contain this JSON object.
+    Return this JSON object by calling the 'save_learning_activities' tool.
     """
     try:
-        # Claude 3 Sonnet 호출 (Bedrock)
-        response = bedrock_client.invoke_model(
-            modelId='anthropic.claude-3-sonnet-20240229-v1:0', 
-            contentType='application/json',
-            accept='application/json',
-            body=json.dumps({
-                "messages": [{"role": "user", "content": user_query}],
-                "max_tokens": 4096,
-                "system": system_prompt,
-                "anthropic_version": "bedrock-2023-05-31"
-            })
+        # Claude 3 Sonnet 호출 (Bedrock Converse, 도구 입력으로 JSON 수신 + 스키마 검증)
+        return generate_structured(
+            bedrock_client,
+            'anthropic.claude-3-sonnet-20240229-v1:0',
+            system_prompt,
+            user_query,
+            schema=LEARNING_ACTIVITIES_SCHEMA,
+            tool_name='save_learning_activities',
+            tool_description="Save the generated learning_activities list for the given script.",
+            max_tokens=4096
         )
-        
-        response_body = json.loads(response['body'].read())
-        json_string = response_body['content'][0]['text'].strip()
-        
-        # Bedrock이 생성한 JSON 문자열 파싱
-        start_index = json_string.find('{')
-        if start_index != -1:
-            json_string = json_string[start_index:]
-            
-        return json.loads(json_string)
 
     except Exception as e:
         print(f"Bedrock 호출 실패: {e}")
@@ -258,6 +251,42 @@ def generate_audio_response(activity, sk):
     return activity
 
 
+# 스크립트 + 추천 답변 음성파일 일괄 생성
+def generate_batched_audio(lang_script, activity, sk):
+    """
+    스크립트와 추천 답변을 Polly 한 번에 합성하고 문장별로 잘라 S3에 동시에 업로드합니다.
+    activity(RECOMMENDED_RESPONSES 또는 None)에는 'audio_key'를 추가하고, 스크립트 S3 Key를 반환합니다.
+    일괄 합성이 실패하면 기존 문장별 합성으로 대체합니다.
+    """
+    responses = activity.get('recommended_responses', []) if activity else []
+    answers = [item.get('recommended_answer') for item in responses]
+
+    try:
+        if not all(answers):
+            raise ValueError("recommended_answer가 비어 있는 항목이 있습니다.")
+        pieces = synthesize_batch(polly, [lang_script] + answers, 'Mizuki', "ja-JP")
+    except Exception as e:
+        print(f"일괄 합성 실패, 문장별 합성으로 대체합니다 (SK: {sk}): {e}")
+        if activity:
+            generate_audio_response(activity, sk)
+        return generate_script_audio(lang_script, sk)
+
+    script_key = f"contents/jp/test/audio/script_audio/{sk}_script_audio.mp3"
+    response_keys = [f"contents/jp/test/audio/recommended_answer/{sk}_recommend_0{i+1}.mp3" for i in range(len(responses))]
+    failed = upload_all(s3_client, BUCKET_NAME, [(script_key, pieces[0])] + list(zip(response_keys, pieces[1:])))
+
+    if script_key in failed:
+        raise RuntimeError(f"스크립트 오디오 생성 실패: {failed[script_key]}")
+
+    for i, (item, key) in enumerate(zip(responses, response_keys)):
+        if key in failed:
+            # 기존과 같이 실패한 항목은 audio_key 없이 포함합니다.
+            print(f"오디오 처리 중 오류 발생 (Index {i}): {failed[key]}")
+        else:
+            item['audio_key'] = key
+    return script_key
+
+
 # --- 메인 Lambda 핸들러 ---
 
 def lambda_handler(event, context):
@@ -312,15 +341,23 @@ def lambda_handler(event, context):
                     final_activities.append(activity)
                 
                 elif activity['activity_type'] == 'RECOMMENDED_RESPONSES': 
-                    processed_activity = generate_audio_response(activity, sk)
-                    final_activities.append(processed_activity) # 결과 반영
+                    if TTS_BATCH_MODE:
+                        # 일괄 모드: 아래에서 스크립트와 함께 한 번에 합성
+                        final_activities.append(activity)
+                    else:
+                        processed_activity = generate_audio_response(activity, sk)
+                        final_activities.append(processed_activity) # 결과 반영
 
                 # 모든 활동이 위에 정의되지 않은 경우도 대비하여 추가
                 else:
                     final_activities.append(activity) 
             
             # --- 1. 스크립트 오디오 생성 및 활동 리스트에 추가 ---
-            script_audio_key = generate_script_audio(lang_script, sk)
+            if TTS_BATCH_MODE:
+                responses_activity = next((a for a in final_activities if a['activity_type'] == 'RECOMMENDED_RESPONSES'), None)
+                script_audio_key = generate_batched_audio(lang_script, responses_activity, sk)
+            else:
+                script_audio_key = generate_script_audio(lang_script, sk)
             
             # FOLLOW_THE_SCRIPT 활동 객체 생성
             follow_activity = {
@@ -1,4 +1,4 @@
-from db import get_connection
+from db import get_cursor
 from datetime import datetime, timedelta #
 import boto3
 import os
@@ -91,12 +91,11 @@ def lambda_handler(event, context):
         print(f"Selected Message: {selected_message}")
 
         # 3️⃣ MySQL에서 FCM 토큰 조회 (변경 없음)
-        conn = get_connection()
-        with conn.cursor() as cursor:
+        # 커넥션은 컨테이너 단위로 재사용하므로 close 하지 않습니다.
+        with get_cursor() as cursor:
             # 닉네임은 전송에 필요 없으므로 토큰만 가져옵니다.
             cursor.execute("SELECT fcm_token FROM user WHERE fcm_token IS NOT NULL")
             user_tokens_raw = cursor.fetchall()
-        conn.close()
         print(f'user_tokens_raw : {user_tokens_raw}')
         # 토큰 리스트 추출
         fcm_tokens = [token[0] for token in user_tokens_raw]
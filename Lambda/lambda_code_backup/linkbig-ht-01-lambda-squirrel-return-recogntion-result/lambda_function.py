@@ -1,12 +1,17 @@
 import json
 import boto3
 import os
+import time
 
 # DynamoDB 테이블 설정
 dynamodb = boto3.resource("dynamodb")
 TABLE_NAME = os.environ.get("TABLE_NAME")
 table = dynamodb.Table(TABLE_NAME)
 
+# 롱 폴링: ?wait=N 이면 인식이 끝날 때까지 최대 N초 대기 (API Gateway 29초 제한 고려)
+LONG_POLL_MAX_SECONDS = 20
+LONG_POLL_INTERVAL_SECONDS = 0.5
+
 # 공통 CORS 헤더 정의
 CORS_HEADERS = {
     "Access-Control-Allow-Origin": "*",
@@ -43,9 +48,18 @@ def lambda_handler(event, context):
                 "body": json.dumps({"error": "scenarioId is required"})
             }
 
-        # 2. DynamoDB 조회
-        response = table.get_item(Key={"scenarioId": scenario_id})
-        item = response.get("Item")
+        query_params = event.get("queryStringParameters") or {}
+        try:
+            wait_seconds = min(max(float(query_params.get("wait", 0)), 0), LONG_POLL_MAX_SECONDS)
+        except ValueError:
+            wait_seconds = 0
+
+        # 2. DynamoDB 조회 (wait가 있으면 PENDING이 끝날 때까지 대기)
+        deadline = time.time() + wait_seconds
+        item = table.get_item(Key={"scenarioId": scenario_id}, ConsistentRead=True).get("Item")
+        while item and item.get("status") == "PENDING" and time.time() + LONG_POLL_INTERVAL_SECONDS <= deadline:
+            time.sleep(LONG_POLL_INTERVAL_SECONDS)
+            item = table.get_item(Key={"scenarioId": scenario_id}, ConsistentRead=True).get("Item")
 
         if not item:
             return {
@@ -64,6 +78,7 @@ def lambda_handler(event, context):
             "headers": CORS_HEADERS,
             "body": json.dumps({
                 "scenarioId": scenario_id,
+                "status": item.get("status"),
                 "recognizedWord": recognized_word,
                 "fileKey": file_key
             }, ensure_ascii=False)
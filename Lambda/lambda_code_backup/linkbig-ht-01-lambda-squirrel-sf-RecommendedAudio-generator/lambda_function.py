@@ -1,13 +1,27 @@
 import json
 import boto3
 import os
+from polly_batch import synthesize_batch, synthesize_each, upload_all
 
 BUCKET_NAME = os.environ.get("BUCKET_NAME") 
 DEFAULT_REGION = os.environ.get("AWS_REGION", "ap-northeast-1")
+# 일괄 합성 모드: RecommendedAudio-generator가 스크립트와 추천 답변을 Polly 한 번에 합성합니다.
+# 이 함수 안에서만 쓰는 값이며, 켜고 끄는 것과 상관없이 출력에는 항상 script_audio_key가 들어갑니다.
+TTS_BATCH_MODE = os.environ.get("TTS_BATCH_MODE", "false").lower() == "true"
+VOICE_ID = 'Mizuki'
+LANGUAGE_CODE = "ja-JP"
 polly = boto3.client("polly")
 s3_client = boto3.client("s3")
 
 
+def script_audio_key(sk):
+    return f"contents/jp/test/audio/script_audio/{sk}_script_audio.mp3"
+
+
+def recommended_audio_key(sk, index):
+    return f"contents/jp/test/audio/recommended_answer/{sk}_recommend_0{index+1}.mp3"
+
+
 # --- 헬퍼 함수 (기존 코드 재사용) ---
 
 #따라 말하기 음성파일 생성, 저장
@@ -16,15 +30,15 @@ def generate_script_audio(lang_script, sk):
     원본 스크립트(lang_script)에 대해 Polly TTS를 호출하여 음성 파일을 생성하고 S3에 저장한 후, 
     S3 Key를 반환합니다.
     """
-    s3_key = f"contents/jp/test/audio/script_audio/{sk}_script_audio.mp3"
+    s3_key = script_audio_key(sk)
     
     try:
         # 추천답변 음성파일 생성
         speech = polly.synthesize_speech(
             Text=lang_script,
             OutputFormat="mp3",
-            VoiceId='Mizuki',
-            LanguageCode="ja-JP",
+            VoiceId=VOICE_ID,
+            LanguageCode=LANGUAGE_CODE,
         )
         # 스트림에서 오디오 데이터 읽기
         audio_stream = speech["AudioStream"].read()
@@ -44,52 +58,70 @@ def generate_script_audio(lang_script, sk):
         raise RuntimeError(f"스크립트 오디오 생성 실패: {e}")
 
 
-def generate_recommended_responses_audio(activities, sk):
+def find_recommended_responses(activities):
+    """RECOMMENDED_RESPONSES 활동과 그 추천 답변 목록을 반환합니다. 활동이 없으면 (None, [])."""
+    activity = next((act for act in activities if act['activity_type'] == 'RECOMMENDED_RESPONSES'), None)
+    return activity, (activity.get('recommended_responses', []) if activity else [])
+
+
+def store_audio(pieces, activity, responses, sk):
     """
-    RECOMMENDED_RESPONSES 활동 타입에 대해 Polly TTS를 호출하여 음성 파일을 생성하고 S3에 저장하며, 
-    활동 데이터에 'audio_key' 필드를 추가합니다.
+    pieces: [스크립트, 추천 답변...] 순서의 MP3 바이트(합성에 실패한 문장은 예외)를 S3에 동시에 업로드하고,
+    추천 답변 활동에 'audio_key'를 붙여 script_audio_key와 함께 반환합니다.
     """
-    # RECOMMENDED_RESPONSES 활동 찾기
-    activity = next((act for act in activities if act['activity_type'] == 'RECOMMENDED_RESPONSES'), None)
-    
+    # 스크립트 오디오는 FOLLOW_THE_SCRIPT 활동에 꼭 필요하므로 실패는 치명적 오류입니다.
+    if isinstance(pieces[0], Exception):
+        raise RuntimeError(f"스크립트 오디오 생성 실패: {pieces[0]}")
+
+    keys = [script_audio_key(sk)] + [recommended_audio_key(sk, i) for i in range(len(responses))]
+    failed = {key: piece for key, piece in zip(keys, pieces) if isinstance(piece, Exception)}
+    failed.update(upload_all(s3_client, BUCKET_NAME, [(key, piece) for key, piece in zip(keys, pieces) if key not in failed]))
+    if script_audio_key(sk) in failed:
+        raise RuntimeError(f"스크립트 오디오 생성 실패: {failed[script_audio_key(sk)]}")
+
     if not activity:
-        return {'RECOMMENDED_RESPONSES': []} # 활동이 없으면 빈 값 반환
+        return {'RECOMMENDED_RESPONSES': [], 'script_audio_key': script_audio_key(sk)}
 
-    recommended_responses = activity.get('recommended_responses', [])
-    final_responses = []
-    
-    for i, item in enumerate(recommended_responses):
-        try:
-            recommended_answer = item['recommended_answer']
-            s3_key = f"contents/jp/test/audio/recommended_answer/{sk}_recommend_0{i+1}.mp3" 
-            
-            # Polly 호출 및 S3 저장 (기존 generate_audio_response 로직과 동일)
-            speech = polly.synthesize_speech(
-                 Text=recommended_answer,
-                 OutputFormat="mp3",
-                 VoiceId='Mizuki',
-                 LanguageCode="ja-JP",
-            )
-            audio_stream = speech["AudioStream"].read()
-            s3_client.put_object(
-                 Bucket=BUCKET_NAME,
-                 Key=s3_key,
-                 Body=audio_stream,
-                 ContentType="audio/mpeg"
-            )
-            item['audio_key'] = s3_key 
-            final_responses.append(item)
-            
-        except Exception as e:
-            print(f"오디오 처리 중 오류 발생 (Index {i}): {e}")
-            final_responses.append(item) # 오류가 난 항목도 일단 포함
-            continue
-            
-    # 처리 완료된 리스트를 활동 객체에 다시 할당
-    activity['recommended_responses'] = final_responses
-    
-    # 스크립트 오디오와 분리하기 위해 활동 객체를 그대로 반환
-    return activity 
+    for i, item in enumerate(responses):
+        key = recommended_audio_key(sk, i)
+        if key in failed:
+            # 기존과 같이 실패한 항목은 audio_key 없이 포함합니다.
+            print(f"오디오 처리 중 오류 발생 (Index {i}): {failed[key]}")
+        else:
+            item['audio_key'] = key
+    activity['recommended_responses'] = responses
+    return {**activity, 'script_audio_key': script_audio_key(sk)}
+
+
+def generate_batched_audio(lang_script, activities, sk):
+    """
+    스크립트와 추천 답변을 Polly 한 번에 합성(SSML <mark> + speech mark)하고,
+    문장별로 잘라 S3에 동시에 업로드합니다. 반환 형식은 generate_all_audio와 같습니다.
+    일괄 합성이 실패하면 기존 문장별 합성으로 대체합니다.
+    """
+    activity, responses = find_recommended_responses(activities)
+    answers = [item.get('recommended_answer') for item in responses]
+
+    try:
+        if not all(answers):
+            raise ValueError("recommended_answer가 비어 있는 항목이 있습니다.")
+        pieces = synthesize_batch(polly, [lang_script] + answers, VOICE_ID, LANGUAGE_CODE)
+    except Exception as e:
+        print(f"일괄 합성 실패, 문장별 합성으로 대체합니다 (SK: {sk}): {e}")
+        return generate_all_audio(lang_script, activities, sk)
+
+    return store_audio(pieces, activity, responses, sk)
+
+
+def generate_all_audio(lang_script, activities, sk):
+    """
+    스크립트와 추천 답변 음성을 문장별로 동시에 합성하고 동시에 업로드합니다.
+    반환: 추천 답변 활동(각 항목에 audio_key 추가)에 script_audio_key를 더한 dict
+    """
+    activity, responses = find_recommended_responses(activities)
+    answers = [item.get('recommended_answer') for item in responses]
+    pieces = synthesize_each(polly, [lang_script] + answers, VOICE_ID, LANGUAGE_CODE)
+    return store_audio(pieces, activity, responses, sk)
 
 
 def lambda_handler(event, context):
@@ -100,19 +132,22 @@ def lambda_handler(event, context):
     lang_script = event.get('lang_script')
     validated_activities = event.get('validated_activities', [])
     
-    # Step Functions Parallel State의 분기 역할에 따라 다르게 처리
+    # 배포된 함수 이름에 따라 다르게 처리
     if context.function_name.endswith('ScriptAudio-generator'):
-        # 스크립트 오디오 생성 분기
+        # 스크립트 오디오 생성 (이전 Parallel 정의의 스크립트 분기)
         audio_result = generate_script_audio(lang_script, sk)
         audio_result['iteration_count'] = iteration_count
         return audio_result
         
     elif context.function_name.endswith('RecommendedAudio-generator'):
-        # 추천 답변 오디오 생성 분기
-        audio_result = generate_recommended_responses_audio(validated_activities, sk)
+        # 스크립트 + 추천 답변 오디오 생성 ('음성 생성' Task, 출력에 script_audio_key 포함)
+        if TTS_BATCH_MODE:
+            audio_result = generate_batched_audio(lang_script, validated_activities, sk)
+        else:
+            audio_result = generate_all_audio(lang_script, validated_activities, sk)
         audio_result['iteration_count'] = iteration_count
         return audio_result
 
     else:
-        # 이 Lambda는 병렬 분기로만 호출되어야 함
-        raise RuntimeError("잘못된 호출: 이 Lambda는 병렬 분기로만 실행되어야 합니다.")
\ No newline at end of file
+        # 이 Lambda는 Step Functions 음성 생성 단계로만 호출되어야 함
+        raise RuntimeError("잘못된 호출: 이 Lambda는 Step Functions 음성 생성 단계로만 실행되어야 합니다.")
\ No newline at end of file
@@ -0,0 +1,186 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import escape
+
+# Polly 일괄 합성 공통 모듈 (sf-RecommendedAudio-generator, sf-ScriptAudio-generator, learning-data-generator)
+# 한 영상의 문장들(스크립트 + 추천 답변)을 <mark>가 들어간 SSML 하나로 합성하고,
+# 같은 SSML의 speech mark로 문장 경계 시간을 얻어 MP3를 프레임 단위로 잘라 문장별 파일을 만듭니다.
+# 오디오 요청과 speech mark 요청은 동시에 보내므로 문장 수와 상관없이 Polly 왕복은 한 번입니다.
+
+# 문장 사이에 넣는 무음. 자르는 지점은 무음 한가운데라 MP3 비트 저장소(bit reservoir) 때문에 생기는 잡음이 들리지 않습니다.
+BREAK_MS = 600
+# 동시에 올릴 S3 업로드 수
+MAX_UPLOAD_WORKERS = 4
+# 문장별 합성(일괄 합성을 쓰지 않을 때) 동시에 보낼 Polly 요청 수
+MAX_SYNTHESIZE_WORKERS = 4
+
+# MPEG 오디오 프레임 헤더 표
+_BITRATES_KBPS = {
+    # (MPEG-1, Layer III)
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    # (MPEG-2/2.5, Layer III)
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],   # MPEG-2.5
+}
+
+
+def mark_name(index):
+    return f"s{index}"
+
+
+def build_ssml(sentences):
+    """문장마다 <mark name="s{i}"/>를 붙이고 문장 사이에 무음을 넣은 SSML을 만듭니다."""
+    parts = []
+    for i, sentence in enumerate(sentences):
+        if i:
+            parts.append(f'<break time="{BREAK_MS}ms"/>')
+        parts.append(f'<mark name="{mark_name(i)}"/>{escape(sentence)}')
+    return f"<speak>{''.join(parts)}</speak>"
+
+
+def _skip_id3(data):
+    """ID3v2 태그가 있으면 그 다음 위치를 반환합니다."""
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        return 10 + size
+    return 0
+
+
+def parse_mp3_frames(data):
+    """
+    MP3 바이트를 프레임 목록 [(offset, length, duration_ms)]으로 나눕니다. (Layer III만)
+    첫 프레임이 Xing/Info 헤더 프레임이면 전체 길이 정보가 잘린 파일과 맞지 않으므로 제외합니다.
+    """
+    frames = []
+    pos = _skip_id3(data)
+    while pos + 4 <= len(data):
+        header = int.from_bytes(data[pos:pos + 4], "big")
+        version_bits = (header >> 19) & 0x3
+        layer_bits = (header >> 17) & 0x3
+        bitrate_index = (header >> 12) & 0xF
+        rate_index = (header >> 10) & 0x3
+        if ((header >> 21) & 0x7FF) != 0x7FF or version_bits == 1 or layer_bits != 1 \
+                or bitrate_index in (0, 15) or rate_index == 3:
+            # 싱크가 맞지 않으면 한 바이트씩 밀며 다음 프레임 헤더를 찾습니다.
+            pos += 1
+            continue
+
+        padding = (header >> 9) & 0x1
+        sample_rate = _SAMPLE_RATES[version_bits][rate_index]
+        bitrate = _BITRATES_KBPS[1 if version_bits == 3 else 2][bitrate_index] * 1000
+        samples = 1152 if version_bits == 3 else 576
+        length = samples // 8 * bitrate // sample_rate + padding
+        frames.append((pos, length, samples * 1000 / sample_rate))
+        pos += length
+
+    if frames:
+        offset, length, _ = frames[0]
+        if b"Xing" in data[offset:offset + 64] or b"Info" in data[offset:offset + 64]:
+            frames = frames[1:]
+    return frames
+
+
+def split_mp3(data, cut_times_ms):
+    """
+    MP3를 cut_times_ms(오름차순, ms)에 가장 가까운 프레임 경계에서 잘라 len(cut_times_ms) + 1개 조각을 반환합니다.
+    """
+    frames = parse_mp3_frames(data)
+    pieces = []
+    elapsed = 0.0
+    current = bytearray()
+    cuts = list(cut_times_ms)
+    for offset, length, duration in frames:
+        # 프레임의 중앙이 자르는 지점을 지났으면 여기서 새 조각을 시작합니다.
+        while cuts and elapsed + duration / 2 > cuts[0]:
+            pieces.append(bytes(current))
+            current = bytearray()
+            cuts.pop(0)
+        current += data[offset:offset + length]
+        elapsed += duration
+    pieces.append(bytes(current))
+    # 오디오가 자르는 지점보다 짧게 끝난 경우 빈 조각으로 채웁니다.
+    pieces.extend(b"" for _ in cuts)
+    return pieces
+
+
+def synthesize_batch(polly, sentences, voice_id, language_code):
+    """
+    sentences를 SSML 한 번으로 합성해 문장별 MP3 바이트 목록을 반환합니다.
+    speech mark가 문장 수와 맞지 않거나 빈 조각이 생기면 ValueError (호출 측에서 문장별 합성으로 대체).
+    """
+    ssml = build_ssml(sentences)
+    request = {"Text": ssml, "TextType": "ssml", "VoiceId": voice_id, "LanguageCode": language_code}
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        audio_future = executor.submit(polly.synthesize_speech, OutputFormat="mp3", **request)
+        marks_future = executor.submit(polly.synthesize_speech, OutputFormat="json", SpeechMarkTypes=["ssml"], **request)
+        audio = audio_future.result()["AudioStream"].read()
+        marks_body = marks_future.result()["AudioStream"].read().decode("utf-8")
+
+    # speech mark는 줄마다 JSON 하나: {"time": ms, "type": "ssml", "value": "s0", ...}
+    mark_times = {}
+    for line in marks_body.splitlines():
+        if line.strip():
+            mark = json.loads(line)
+            mark_times[mark["value"]] = mark["time"]
+
+    try:
+        starts = [mark_times[mark_name(i)] for i in range(len(sentences))]
+    except KeyError as e:
+        raise ValueError(f"Speech mark {e} not found ({len(mark_times)}/{len(sentences)} marks).")
+
+    # 각 문장 시작 직전 무음의 가운데에서 자릅니다.
+    cut_times = [max(start - BREAK_MS / 2, 0) for start in starts[1:]]
+    pieces = split_mp3(audio, cut_times)
+    if len(pieces) != len(sentences) or not all(pieces):
+        raise ValueError(f"MP3 split produced {len(pieces)} pieces (empty: {sum(1 for p in pieces if not p)}) "
+                         f"for {len(sentences)} sentences.")
+    print(f"Polly 일괄 합성: {len(sentences)}개 문장, {len(audio)} bytes, 경계 {cut_times}")
+    return pieces
+
+
+def synthesize_each(polly, sentences, voice_id, language_code, max_workers=MAX_SYNTHESIZE_WORKERS):
+    """
+    문장마다 synthesize_speech를 동시에 호출합니다. (일괄 합성을 쓰지 않을 때)
+    반환: sentences 순서대로 MP3 바이트, 실패한 문장은 예외 객체
+    """
+    def synthesize(text):
+        try:
+            speech = polly.synthesize_speech(
+                Text=text,
+                OutputFormat="mp3",
+                VoiceId=voice_id,
+                LanguageCode=language_code,
+            )
+            return speech["AudioStream"].read()
+        except Exception as e:
+            return e
+
+    if not sentences:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(sentences))) as executor:
+        return list(executor.map(synthesize, sentences))
+
+
+def upload_all(s3_client, bucket, objects, max_workers=MAX_UPLOAD_WORKERS):
+    """
+    objects: [(s3_key, mp3_bytes)]를 동시에 업로드합니다.
+    반환: {s3_key: 예외} (실패한 것만, 모두 성공이면 빈 dict)
+    """
+    def upload(obj):
+        key, body = obj
+        try:
+            s3_client.put_object(Bucket=bucket, Key=key, Body=body, ContentType="audio/mpeg")
+            return key, None
+        except Exception as e:
+            return key, e
+
+    if not objects:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(objects))) as executor:
+        results = list(executor.map(upload, objects))
+    return {key: error for key, error in results if error is not None}
@@ -12,30 +12,36 @@ else:
     table = None
 
 def lambda_handler(event, context):
-    # Step Functions Parallel State의 출력은 항상 리스트입니다: [Branch1_Output, Branch2_Output]
+    # '음성 생성' Task 출력: 추천 답변 활동 + script_audio_key + iteration_count
+    audio_output = event.get('AudioOutput')
+    # 이전 정의의 Parallel State 출력은 리스트입니다: [스크립트 분기 출력, 추천 답변 분기 출력]
     parallel_outputs = event.get('ParallelOutputs', [])
     
     # 이전 단계에서 넘어온 메타데이터
     PK = event.get('PK')
     SK = event.get('SK')
     validated_activities = event.get('validated_activities', [])
+    # sf-content-validator가 재생성 대신 고친 항목 기록 (없으면 빈 리스트)
+    content_repairs = event.get('content_repairs', [])
     
+    if audio_output is not None:
+        responses_audio_output = audio_output
+        script_audio_key = audio_output.get('script_audio_key')
+    else:
+        if len(parallel_outputs) != 2:
+            # 이 오류는 Finalize_Data의 Catch로 잡힙니다.
+            raise ValueError(f"병렬 출력 결과가 2개가 아닙니다. 실제 개수: {len(parallel_outputs)}")
+
+        # 병렬 결과 추출 및 취합
+        responses_audio_output = parallel_outputs[1] # 추천 답변 오디오 분기
+        script_audio_key = parallel_outputs[0].get('script_audio_key') # 스크립트 오디오 분기
+
     # iteration_count추출합니다. 
-    iteration_count = parallel_outputs[0].get('iteration_count', 0) if parallel_outputs and len(parallel_outputs) > 0 else 0
-    
-    if len(parallel_outputs) != 2:
-        # 이 오류는 Finalize_Data의 Catch로 잡힙니다.
-        raise ValueError(f"병렬 출력 결과가 2개가 아닙니다. 실제 개수: {len(parallel_outputs)}")
-        
-    # 병렬 결과 추출 및 취합
-    script_audio_output = parallel_outputs[0] # 스크립트 오디오 분기
-    responses_audio_output = parallel_outputs[1] # 추천 답변 오디오 분기
-    
-    script_audio_key = script_audio_output.get('script_audio_key')
+    iteration_count = responses_audio_output.get('iteration_count', 0)
     
     # 1. FOLLOW_THE_SCRIPT 활동 객체 생성 및 리스트에 추가
     if not script_audio_key:
-        raise ValueError("스크립트 오디오 Key가 병렬 출력에서 누락되었습니다.")
+        raise ValueError("스크립트 오디오 Key가 음성 생성 출력에서 누락되었습니다.")
 
     follow_activity = {
         "activity_id": 3,
@@ -50,9 +56,10 @@ def lambda_handler(event, context):
         if activity['activity_type'] == 'RECOMMENDED_RESPONSES':
             # 오디오 생성된 RECOMMENDED_RESPONSES 활동으로 대체 (병렬 분기 결과)
             
-            # responses_audio_output에서 iteration_count를 제거합니다.
+            # responses_audio_output에서 iteration_count와 script_audio_key를 제거합니다.
             clean_response_activity = responses_audio_output.copy()
             clean_response_activity.pop('iteration_count', None)
+            clean_response_activity.pop('script_audio_key', None)
             
             final_activities.append(clean_response_activity)
         else:
@@ -68,10 +75,11 @@ def lambda_handler(event, context):
     try:
         table.update_item(
              Key={'lang': PK, 'SK': SK},
-             UpdateExpression="SET learning_activities = :activities, #st = :new_status",
+             UpdateExpression="SET learning_activities = :activities, content_repairs = :repairs, #st = :new_status",
              ExpressionAttributeNames={'#st': 'status'},
              ExpressionAttributeValues={
                  ':activities': final_activities, 
+                 ':repairs': content_repairs,
                  ':new_status': 'READY'
              }
         )
@@ -1,70 +1,205 @@
 import json
 import boto3
 import os
+import re
+from qa_metrics import emit_counts
 
 DEFAULT_REGION = os.environ.get("AWS_REGION", "ap-northeast-1")
 # Bedrock 클라이언트 초기화 (외부 API 호출용)
 bedrock_client = boto3.client("bedrock-runtime", region_name=DEFAULT_REGION)
 
-def call_bedrock_for_full_qa(lang_script: str, activities_to_qa: dict) -> str:
+# QA 결과의 ACTIVITY_TYPE -> 재생성할 활동 타입
+QA_ACTIVITY_TYPES = {
+    'TIP': 'COMPREHENSION_QUIZ',
+    'RESPONSES': 'RECOMMENDED_RESPONSES',
+}
+
+def validation_error(activity_type, rule, message):
+    """
+    구조화된 검증 실패를 만듭니다. (sf-content-validator와 같은 형식)
+    sf-content-generator가 $.error.Cause에서 읽어 실패한 활동만 다시 생성합니다.
+    """
+    return ValueError(json.dumps(
+        {"activity_type": activity_type, "rule": rule, "message": message},
+        ensure_ascii=False
+    ))
+
+# 로컬 pre-QA 판정의 확신도가 이 값 이상이어야 확정(decisive)으로 봅니다.
+# 모든 규칙이 확정 PASS면 Bedrock QA를 건너뛰고, 확정 FAIL이 있으면 Bedrock 없이 바로 실패시킵니다.
+PRE_QA_MIN_CONFIDENCE = float(os.environ.get("PRE_QA_MIN_CONFIDENCE", "0.9"))
+# 번역 정확도는 코드로 판단할 수 없어 형태만 봅니다. 기본값에서는 형태가 자연스러워도 불확실로 두어 항상 Bedrock에 묻습니다.
+# SKIP_TRANSLATION_QA=true로 명시적으로 켠 경우에만 형태 검사 통과를 확정 PASS로 보아,
+# 다른 규칙이 모두 확정 PASS이고 번역만 남았을 때 Bedrock QA를 건너뜁니다.
+SKIP_TRANSLATION_QA = os.environ.get("SKIP_TRANSLATION_QA", "false").lower() == "true"
+TRANSLATION_SHAPE_PASS_CONFIDENCE = 1.0 if SKIP_TRANSLATION_QA else 0.5
+
+# 발음 표기에 들어가면 안 되는 한국어 의미 단어 -> 그 단어로 읽힐 수 있는 일본어 가나
+# 예) 'ね'는 '네'로 표기되므로, 답변에 ね/ネ가 있으면 '네'는 발음 표기로 인정합니다.
+KOREAN_MEANING_WORDS = {
+    '네': 'ねネ',
+    '예': '',
+    '아니요': '',
+    '아니오': '',
+    '좋아요': '',
+    '괜찮아요': '',
+    '감사합니다': '',
+    '고마워요': '',
+    '맞아요': '',
+}
+
+PRONUNCIATION_ALLOWED = re.compile(r'^[\s\.\,!\?가-힣]*$')
+HANGUL = re.compile(r'[가-힣]')
+KANA = re.compile(r'[\u3040-\u30ff]')
+# 비교 시 무시할 공백/구두점
+IGNORED_CHARS = re.compile(r'[\s\.\,!\?。、！？「」『』"\'~…]')
+
+
+def rule_result(rule, qa_type, verdict, confidence, message=''):
+    return {'rule': rule, 'qa_type': qa_type, 'verdict': verdict, 'confidence': confidence, 'message': message}
+
+
+def normalize_text(text):
+    return IGNORED_CHARS.sub('', text or '')
+
+
+def quiz_correct_answer(quiz):
+    """검증 단계에서 섞인 퀴즈(options/answer_index)의 정답 텍스트를 꺼냅니다."""
+    options = quiz.get('options') or []
+    answer_index = quiz.get('answer_index')
+    if isinstance(answer_index, int) and 0 <= answer_index < len(options):
+        return options[answer_index]
+    return quiz.get('correct_option', '')
+
+
+def check_tip_leak(quiz, ko_script):
+    """Rule A: 팁이 정답(또는 번역) 전체를 그대로 담고 있으면 실패. 그 외 힌트는 모두 허용합니다."""
+    tip = normalize_text(quiz.get('tip', ''))
+    for label, answer in (('정답', quiz_correct_answer(quiz)), ('번역', ko_script)):
+        answer = normalize_text(answer)
+        if answer and answer in tip:
+            return rule_result('tip_leaks_answer', 'TIP', 'FAIL', 1.0, f"팁에 {label} 전체가 포함되어 있습니다.")
+    return rule_result('tip_leaks_answer', 'TIP', 'PASS', 1.0)
+
+
+def check_pronunciation(responses):
+    """Rule B-1: 발음 표기는 한글(공백, 기본 구두점 포함)만, 일본어 발음으로 설명되지 않는 한국어 의미 단어는 금지."""
+    results = []
+    for response in responses:
+        pronunciation = response.get('pronunciation', '')
+        answer = response.get('recommended_answer', '')
+        if not pronunciation.strip() or not PRONUNCIATION_ALLOWED.match(pronunciation):
+            return results + [rule_result('pronunciation_hangul_only', 'RESPONSES', 'FAIL', 1.0,
+                                f"발음 표기에 한글 외 문자가 있거나 비어 있습니다. ({pronunciation})")]
+        results.append(rule_result('pronunciation_hangul_only', 'RESPONSES', 'PASS', 1.0))
+
+        for token in re.split(r'[\s\.\,!\?]+', pronunciation):
+            if token in KOREAN_MEANING_WORDS and not any(kana in answer for kana in KOREAN_MEANING_WORDS[token]):
+                return results + [rule_result('pronunciation_meaning_word', 'RESPONSES', 'FAIL', 0.9,
+                                    f"발음 표기에 한국어 의미 단어 '{token}'가 있습니다. ({pronunciation})")]
+        results.append(rule_result('pronunciation_meaning_word', 'RESPONSES', 'PASS', 1.0))
+    return results
+
+
+def check_translation_shape(responses):
     """
-    Bedrock LLM을 호출하여 퀴즈 팁의 품질과 추천 답변의 논리적 정확성을 검증합니다.
-    (반환: 'PASS' 또는 'FAILED: [이유_TYPE]')
+    Rule B-2: 번역 정확도 자체는 LLM만 판단할 수 있어, 여기서는 형태만 봅니다.
+    비었거나 일본어가 남아 있으면 확정 실패, 한글 비율이나 길이가 어색하면 불확실(LLM에 질문)합니다.
     """
-    print("Bedrock 호출: 포괄적 의미/논리 QA 요청...")
+    results = []
+    for response in responses:
+        translation = response.get('korean_translation', '')
+        answer = response.get('recommended_answer', '')
+        chars = normalize_text(translation)
+        if not chars:
+            return results + [rule_result('translation_shape', 'RESPONSES', 'FAIL', 1.0, "korean_translation이 비어 있습니다.")]
+        if KANA.search(translation):
+            return results + [rule_result('translation_shape', 'RESPONSES', 'FAIL', 0.9,
+                                f"korean_translation에 일본어 가나가 남아 있습니다. ({translation})")]
+        hangul_ratio = len(HANGUL.findall(chars)) / len(chars)
+        length_ratio = len(chars) / max(len(normalize_text(answer)), 1)
+        if hangul_ratio < 0.5 or not 0.3 <= length_ratio <= 4:
+            results.append(rule_result('translation_shape', 'RESPONSES', 'UNSURE', 0.5,
+                                       f"한글 비율 {hangul_ratio:.2f}, 길이 비율 {length_ratio:.2f}"))
+        else:
+            results.append(rule_result('translation_shape', 'RESPONSES', 'PASS', TRANSLATION_SHAPE_PASS_CONFIDENCE))
+    return results
+
+
+def run_pre_qa(activities_to_qa, ko_script):
+    """
+    로컬 규칙을 모두 평가합니다.
+    반환: (결과 목록, 'PASS' | 'FAIL' | 'ASK_LLM', 실패 결과 또는 None)
+    """
+    quiz = activities_to_qa.get('COMPREHENSION_QUIZ') or {}
+    responses = (activities_to_qa.get('RECOMMENDED_RESPONSES') or {}).get('recommended_responses', [])
+
+    results = [check_tip_leak(quiz, ko_script)]
+    results.extend(check_pronunciation(responses))
+    results.extend(check_translation_shape(responses))
+
+    decisive = [r for r in results if r['confidence'] >= PRE_QA_MIN_CONFIDENCE]
+    failed = next((r for r in decisive if r['verdict'] == 'FAIL'), None)
+    if failed:
+        return results, 'FAIL', failed
+    if len(decisive) == len(results) and all(r['verdict'] == 'PASS' for r in results):
+        return results, 'PASS', None
+    return results, 'ASK_LLM', None
+
+
+def emit_pre_qa_metrics(results, decision):
+    """규칙별 통과/실패/불확실 카운터와 Bedrock 호출 여부를 지표로 출력합니다."""
+    per_rule = {}
+    for r in results:
+        counts = per_rule.setdefault(r['rule'], {'Pass': 0, 'Fail': 0, 'Unsure': 0})
+        if r['confidence'] < PRE_QA_MIN_CONFIDENCE:
+            counts['Unsure'] += 1
+        elif r['verdict'] == 'FAIL':
+            counts['Fail'] += 1
+        else:
+            counts['Pass'] += 1
+    for rule, counts in per_rule.items():
+        emit_counts('Rule', rule, counts)
+    emit_counts('Stage', 'BedrockQA', {
+        'BedrockQASkipped': int(decision != 'ASK_LLM'),
+        'BedrockQACalled': int(decision == 'ASK_LLM'),
+    })
+
+
+def call_bedrock_for_translation_qa(lang_script: str, responses: list) -> str:
+    """
+    Bedrock LLM을 호출하여 추천 답변 번역의 정확성만 검증합니다. (팁/발음은 로컬 규칙이 판정)
+    (반환: 'PASS' 또는 'FAILED:RESPONSES:<이유>')
+    """
+    print("Bedrock 호출: 추천 답변 번역 정확도 QA 요청...")
     
     system_prompt = (
         "You are an expert AI quality assurance specialist for Japanese language learning content. "
-        "Your task is to perform a quality check on the provided learning activities (quiz tip and responses). "
+        "Your task is to check the Korean translations of the provided recommended responses. "
         "Follow the output format strictly."
     )
 
-    # USER QUERY: QA 지침 및 템플릿
-    quiz_data = activities_to_qa.get('COMPREHENSION_QUIZ')
-    responses_data = activities_to_qa.get('RECOMMENDED_RESPONSES')
-
     user_query = f"""
-    Perform a Quality Assurance (QA) check on the following content against the rules.
+    Perform a Quality Assurance (QA) check on the following content against the rule.
     The primary script being taught is: "{lang_script}"
 
     --- Content to QA ---
-    # 1. Comprehension Quiz Tip
-    - Correct Answer (Translation): "{quiz_data.get('correct_option', 'N/A')}"
-    - Tip Text: "{quiz_data.get('tip', 'N/A')}"
-
-    # 2. Recommended Responses (for speaking practice)
-    {json.dumps(responses_data.get('recommended_responses', []), indent=2, ensure_ascii=False)}
-
-    --- Evaluation Rules ---
-
-    ## Rule Set A: Quiz Tip Quality (RELAXED, 의미 힌트 허용)
-    1. TIP VALIDITY:
-    - The tip is considered PASS unless it **literally contains the full correct answer text** (exact match).
-    - Minor hints, grammar markers, sentence endings, 조사, punctuation are ALLOWED.
-    - Small meaning cues or usage intent (e.g., 정중한 제안, 요청, 부탁 등) are also ALLOWED.
-    - Korean text in tips is fully allowed.
-    - Do NOT fail tips for any indirect hint, structural clue, or polite/meaning nuance.
-
-    ## Rule Set B: Recommended Responses Accuracy (STRICT)
-    1. Pronunciation Integrity:
-    - Only the Korean phonetic transcription of Japanese is allowed.
-    - Korean meaning words (네, 좋아요, 예, 아니요) must NOT be included.
-    - Any spacing or minor transcription variation is OK.
-    - Do NOT fail if pronunciation uses Korean syllables to represent Japanese sounds, even if some syllables look like Korean words.
-
-    2. Translation Accuracy:
+    # Recommended Responses (for speaking practice)
+    {json.dumps([{'recommended_answer': r.get('recommended_answer'), 'korean_translation': r.get('korean_translation')} for r in responses], indent=2, ensure_ascii=False)}
+
+    --- Evaluation Rule ---
+    Translation Accuracy:
     - korean_translation must be an accurate and natural meaning of the recommended_answer.
+    - Minor wording differences are OK.
 
     --- Output Format (CRITICAL) ---
-    If ALL rules are satisfied, output: PASS
-    If ANY rule is violated, output: FAILED:<ACTIVITY_TYPE>:<REASON>
-    - ACTIVITY_TYPE must be TIP or RESPONSES
+    If the rule is satisfied, output: PASS
+    If the rule is violated, output: FAILED:RESPONSES:<REASON>
     - REASON must be a concise failure cause.
 
     The response MUST ONLY contain:
     PASS
     OR
-    FAILED:<ACTIVITY_TYPE>:<REASON>
+    FAILED:RESPONSES:<REASON>
     """
 
 
@@ -76,7 +211,7 @@ def call_bedrock_for_full_qa(lang_script: str, activities_to_qa: dict) -> str:
             accept='application/json',
             body=json.dumps({
                 "messages": [{"role": "user", "content": user_query}],
-                "max_tokens": 512,
+                "max_tokens": 256,
                 "system": system_prompt,
                 "anthropic_version": "bedrock-2023-05-31"
             })
@@ -95,7 +230,7 @@ def call_bedrock_for_full_qa(lang_script: str, activities_to_qa: dict) -> str:
 
 def lambda_handler(event, context):
     """
-    Validates Activities를 Bedrock에 전달하여 포괄적인 의미적 QA를 수행합니다.
+    Validates Activities를 로컬 규칙으로 먼저 검사하고, 확정할 수 없는 번역 정확도만 Bedrock으로 QA합니다.
     """
     # iteration_count 추출 (Check_Iteration_Count에서 사용됨)
     iteration_count = event.get('iteration_count', 0)
@@ -120,18 +255,38 @@ def lambda_handler(event, context):
         elif activity_type == 'RECOMMENDED_RESPONSES':
             activities_to_qa['RECOMMENDED_RESPONSES'] = activity
 
-    # 2. Bedrock 호출 (모든 QA 대상 활동을 한 번에 검증)
-    qa_result = call_bedrock_for_full_qa(lang_script, activities_to_qa)
-    
-    if qa_result.startswith('FAILED'):
-        # Bedrock 검증 실패 시, 치명적 오류 발생 -> Step Functions Catch로 이동
-        raise ValueError(f"교육적 오류 (Bedrock QA): 콘텐츠 품질 검증 실패. 결과: {qa_result}")
-    
-    if qa_result != 'PASS':
-        # PASS, FAILED 외 다른 이상한 결과가 나왔을 때 (LLM 출력 형식 오류)
-        raise ValueError(f"Bedrock QA 응답 형식 오류: 'PASS' 또는 'FAILED:'로 시작하지 않습니다. 응답: {qa_result}")
+    # 2. 로컬 pre-QA (팁 정답 노출, 발음 표기, 번역 형태)
+    results, decision, failed = run_pre_qa(activities_to_qa, ko_script)
+    emit_pre_qa_metrics(results, decision)
+    summary = ', '.join(f"{r['rule']}={r['verdict']}" for r in results)
+    print(f"Pre-QA 결과: {decision} ({summary})")
+
+    if decision == 'FAIL':
+        raise validation_error(QA_ACTIVITY_TYPES[failed['qa_type']], f"pre_qa_{failed['rule']}",
+                               f"교육적 오류 (Pre-QA): {failed['message']}")
+
+    # 3. 확정 PASS가 아니면 로컬에서 판단할 수 없는 번역 정확도만 Bedrock에 묻습니다.
+    if decision == 'ASK_LLM':
+        responses = (activities_to_qa.get('RECOMMENDED_RESPONSES') or {}).get('recommended_responses', [])
+        qa_result = call_bedrock_for_translation_qa(lang_script, responses)
+
+        if qa_result.startswith('FAILED'):
+            # Bedrock 검증 실패 시, 치명적 오류 발생 -> Step Functions Catch로 이동
+            # 형식: FAILED:<TIP|RESPONSES>:<REASON>
+            parts = qa_result.split(':', 2)
+            qa_type = parts[1].strip().upper() if len(parts) > 1 else ''
+            activity_type = QA_ACTIVITY_TYPES.get(qa_type)
+            rule = f"bedrock_qa_{qa_type.lower()}" if activity_type else "bedrock_qa"
+            raise validation_error(activity_type, rule, f"교육적 오류 (Bedrock QA): 콘텐츠 품질 검증 실패. 결과: {qa_result}")
+
+        if qa_result != 'PASS':
+            # PASS, FAILED 외 다른 이상한 결과가 나왔을 때 (LLM 출력 형식 오류)
+            # 콘텐츠 문제가 아니므로 activity_type 없이 보고 (재생성 시 전체 생성)
+            raise validation_error(None, 'bedrock_qa_format', f"Bedrock QA 응답 형식 오류: 'PASS' 또는 'FAILED:'로 시작하지 않습니다. 응답: {qa_result}")
+    else:
+        print("모든 로컬 규칙이 확정 PASS라 Bedrock QA를 건너뜁니다.")
 
-    # 3. 검증 완료된 데이터 반환
+    # 4. 검증 완료된 데이터 반환
     # 이 Lambda는 데이터를 변경하지 않고 다음 단계로 전달합니다.
     return {
         'PK': PK,
@@ -139,6 +294,7 @@ def lambda_handler(event, context):
         'lang_script': lang_script,
         'ko_script': ko_script,
         'validated_activities': validated_activities, 
+        'content_repairs': event.get('content_repairs', []), # sf-content-validator의 수리 기록 (최종 단계에서 저장)
         
         # iteration_count를 출력에 포함하여 다음 단계로 전달합니다.
         'iteration_count': iteration_count
@@ -0,0 +1,26 @@
+import os
+import json
+import time
+
+# 검증 규칙 카운터를 CloudWatch Embedded Metric Format(EMF)으로 출력합니다.
+# Lambda 로그에 찍힌 JSON 한 줄을 CloudWatch가 지표로 추출하므로 PutMetricData 호출(지연/권한)이 필요 없습니다.
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "Whik/ContentQA")
+
+
+def emit_counts(dimension_name, dimension_value, counts):
+    """
+    counts({지표 이름: 값})를 dimension_name=dimension_value 차원으로 출력합니다.
+    예) emit_counts("Rule", "tip_leaks_answer", {"Pass": 1, "Fail": 0})
+    """
+    print(json.dumps({
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": METRICS_NAMESPACE,
+                "Dimensions": [[dimension_name]],
+                "Metrics": [{"Name": name, "Unit": "Count"} for name in counts],
+            }],
+        },
+        dimension_name: dimension_value,
+        **counts,
+    }, ensure_ascii=False))
@@ -1,45 +1,33 @@
 import json
 import boto3
 import os
+from structured_output import generate_structured, LEARNING_ACTIVITIES_SCHEMA
 
 DEFAULT_REGION = os.environ.get("AWS_REGION", "ap-northeast-1")
 bedrock_client = boto3.client("bedrock-runtime", region_name=DEFAULT_REGION)
 
-def call_bedrock_for_quiz_generation(lang_script, ko_script):
-  """
-  Bedrock LLM을 호출하여 learning_activities 리스트를 엄격한 포맷으로 생성합니다.
-  """
-  print("Bedrock 호출: learning_activities 데이터 생성 요청 (최소 토큰 사용)...")
-  
-  system_prompt = (
-    "You are an expert AI tutor generating Japanese learning content for BEGINNER LEVEL students. "
-    "Your output MUST be a valid JSON object strictly following the required schema. "
-    "All tips MUST follow the TIP RULES described in the user instructions. "
-    "Tips must be structural, simple, and beginner-friendly, and must never reveal or hint at the sentence's meaning. "
-    "Pronunciation MUST always be the Korean reading of the Japanese text (never the Korean translation)."
-  )
-
-
-  # user_query 
-  system_prompt = (
-    "You are an expert AI tutor generating Japanese learning content for BEGINNER LEVEL students. "
-    "Your output MUST be a valid JSON object strictly following the required schema. "
-    "Tips MUST be structural, simple, and beginner-friendly. "
-    "Tips must NEVER reveal, hint, or reference the sentence's meaning or Korean translation. "
-    "Korean text in tips is allowed. "
-    "Pronunciation MUST always be the Korean reading of the Japanese text (never the Korean translation)."
-  )
+MODEL_ID = 'anthropic.claude-3-sonnet-20240229-v1:0'
+# 실패한 활동 하나만 다시 생성할 때는 출력이 작으므로 토큰 한도를 낮춥니다.
+FULL_MAX_TOKENS = 4096
+REPAIR_MAX_TOKENS = 1024
+# 출력은 이 도구의 입력(JSON 스키마)으로만 받습니다. (structured_output.py)
+TOOL_NAME = 'save_learning_activities'
 
-  # user_query
-  user_query = f"""
-  Generate a JSON object containing the 'learning_activities' list.
-  - Original Japanese Script: "{lang_script}"
-  - Correct Korean Translation: "{ko_script}"
+GENERATION_SYSTEM_PROMPT = (
+  "You are an expert AI tutor generating Japanese learning content for BEGINNER LEVEL students. "
+  "Your output MUST be a valid JSON object strictly following the required schema. "
+  "Tips MUST be structural, simple, and beginner-friendly. "
+  "Tips must NEVER reveal, hint, or reference the sentence's meaning or Korean translation. "
+  "Korean text in tips is allowed. "
+  "Pronunciation MUST always be the Korean reading of the Japanese text (never the Korean translation)."
+)
+
+REQUIRED_ACTIVITY_TYPES = ['COMPREHENSION_QUIZ', 'SENTENCE_RECONSTRUCTION', 'RECOMMENDED_RESPONSES']
 
-  ---------------------------------------------------------
-  ## Activity Generation Rules
-  ---------------------------------------------------------
 
+def activity_rules(lang_script):
+  """활동별 생성 규칙 (전체 생성/부분 재생성 프롬프트 공용)"""
+  return f"""
   ### 1) COMPREHENSION_QUIZ (activity_id: 1)
   - correct_option MUST exactly match the Korean translation.
   - Provide 3 incorrect_options (total 4 choices).
@@ -82,6 +70,83 @@ def call_bedrock_for_quiz_generation(lang_script, ko_script):
       * MUST NOT contain Korean translation words (“네”, “좋아요”, etc.).
       * MUST use readable spacing (예: “하이, 다이죠부 데스.”).
 
+  """
+
+
+def activity_template(activity_type, lang_script):
+  """부분 재생성 시 출력 형식으로 보여줄 활동 하나의 JSON 템플릿"""
+  templates = {
+    'COMPREHENSION_QUIZ': {
+      "activity_id": 1,
+      "activity_type": "COMPREHENSION_QUIZ",
+      "correct_option": "<Correct_Translation_String>",
+      "incorrect_options": ["<Incorrect_Option_1>", "<Incorrect_Option_2>", "<Incorrect_Option_3>"],
+      "question": "영상을 보고 알맞은 의미를 찾아봐요!",
+      "tip": "<Tip text>"
+    },
+    'SENTENCE_RECONSTRUCTION': {
+      "activity_id": 2,
+      "activity_type": "SENTENCE_RECONSTRUCTION",
+      "chunks": ["<chunk_1>", "<chunk_2>", "<chunk_n>"],
+      "question": "음성을 듣고, 단어 블록을 드래그하여 문장을 완성하세요.",
+      "target_sentence": lang_script,
+      "tip": "<Tip text>"
+    },
+    'RECOMMENDED_RESPONSES': {
+      "activity_id": 4,
+      "activity_type": "RECOMMENDED_RESPONSES",
+      "recommended_responses": [
+        {
+          "recommended_answer": "<Japanese_Response_1>",
+          "pronunciation": "<Korean_Reading_1>",
+          "korean_translation": "<Korean_Translation_1>"
+        },
+        {
+          "recommended_answer": "<Japanese_Response_2>",
+          "pronunciation": "<Korean_Reading_2>",
+          "korean_translation": "<Korean_Translation_2>"
+        }
+      ]
+    },
+  }
+  return json.dumps({"learning_activities": [templates[activity_type]]}, indent=2, ensure_ascii=False)
+
+
+def invoke_claude(system_prompt, user_query, max_tokens):
+  """Claude가 learning_activities 도구를 호출하게 해 스키마 검증된 JSON 객체를 받습니다."""
+  try:
+    return generate_structured(
+      bedrock_client,
+      MODEL_ID,
+      system_prompt,
+      user_query,
+      schema=LEARNING_ACTIVITIES_SCHEMA,
+      tool_name=TOOL_NAME,
+      tool_description="Save the generated learning_activities list for the given script.",
+      max_tokens=max_tokens
+    )
+
+  except Exception as e:
+    print(f"Bedrock 호출 실패: {e}")
+    raise RuntimeError(f"Bedrock API/JSON 파싱 실패: {e}")
+
+def call_bedrock_for_quiz_generation(lang_script, ko_script):
+  """
+  Bedrock LLM을 호출하여 learning_activities 리스트를 엄격한 포맷으로 생성합니다.
+  """
+  print("Bedrock 호출: learning_activities 데이터 생성 요청 (최소 토큰 사용)...")
+  
+  # user_query
+  user_query = f"""
+  Generate a JSON object containing the 'learning_activities' list.
+  - Original Japanese Script: "{lang_script}"
+  - Correct Korean Translation: "{ko_script}"
+
+  ---------------------------------------------------------
+  ## Activity Generation Rules
+  ---------------------------------------------------------
+
+{activity_rules(lang_script)}
   ---------------------------------------------------------
   ## Output JSON (MUST FOLLOW EXACTLY)
   ---------------------------------------------------------
@@ -123,37 +188,70 @@ def call_bedrock_for_quiz_generation(lang_script, ko_script):
     ]
   }}
 
-  The response MUST ONLY contain the JSON object above — no explanations.
+  Return the JSON object above by calling the '{TOOL_NAME}' tool — no explanations.
+  """
+
+
+
+  return invoke_claude(GENERATION_SYSTEM_PROMPT, user_query, FULL_MAX_TOKENS)
+
+
+def call_bedrock_for_activity_repair(lang_script, ko_script, activity_type, failure, previous_activity):
   """
+  검증에 실패한 활동 하나만 다시 생성합니다. 실패 규칙과 이전 결과를 알려 같은 실수를 피하게 합니다.
+  """
+  print(f"Bedrock 호출: {activity_type} 활동만 재생성 요청 (실패 규칙: {failure.get('rule')})...")
 
+  user_query = f"""
+  Regenerate ONLY the '{activity_type}' activity of the 'learning_activities' list.
+  - Original Japanese Script: "{lang_script}"
+  - Correct Korean Translation: "{ko_script}"
 
+  The previous version of this activity was rejected by validation.
+  - Failed rule: {failure.get('rule')}
+  - Reason: {failure.get('message')}
+  - Rejected activity: {json.dumps(previous_activity, ensure_ascii=False) if previous_activity else "N/A"}
 
+  ---------------------------------------------------------
+  ## Activity Generation Rules
+  ---------------------------------------------------------
+{activity_rules(lang_script)}
+  ---------------------------------------------------------
+  ## Output JSON (MUST FOLLOW EXACTLY)
+  ---------------------------------------------------------
+
+{activity_template(activity_type, lang_script)}
+
+  Return the JSON object above with exactly one '{activity_type}' activity by calling the '{TOOL_NAME}' tool — no explanations.
+  """
+
+  result = invoke_claude(GENERATION_SYSTEM_PROMPT, user_query, REPAIR_MAX_TOKENS)
+  for activity in result.get('learning_activities', []):
+    if activity.get('activity_type') == activity_type:
+      return activity
+  return None
+
+
+def parse_validation_failure(error):
+  """
+  Step Functions Catch가 넣어 준 $.error에서 검증기의 구조화된 실패({activity_type, rule, message})를 꺼냅니다.
+  구조화되지 않은 오류(Bedrock 장애 등)면 None.
+  """
+  if not error:
+    return None
   try:
-    response = bedrock_client.invoke_model(
-      modelId='anthropic.claude-3-sonnet-20240229-v1:0', 
-      contentType='application/json',
-      accept='application/json',
-      body=json.dumps({
-        "messages": [{"role": "user", "content": user_query}],
-        "max_tokens": 4096,
-        "system": system_prompt,
-        "anthropic_version": "bedrock-2023-05-31"
-      })
-    )
-      
-    response_body = json.loads(response['body'].read())
-    json_string = response_body['content'][0]['text'].strip()
-    
-    # JSON 시작점 찾기 (Claude가 "" 밖 텍스트 넣는 경우 방어)
-    start_index = json_string.find('{')
-    if start_index != -1:
-      json_string = json_string[start_index:]
-        
-    return json.loads(json_string)
+    cause = json.loads(error.get('Cause', '{}'))
+    failure = json.loads(cause.get('errorMessage', ''))
+    return failure if isinstance(failure, dict) else None
+  except (ValueError, TypeError, AttributeError):
+    return None
 
-  except Exception as e:
-    print(f"Bedrock 호출 실패: {e}")
-    raise RuntimeError(f"Bedrock API/JSON 파싱 실패: {e}")
+
+def merge_activity(activities, repaired):
+  """이전 활동 목록에서 같은 타입의 활동을 교체(없으면 추가)하고 activity_id 순으로 정렬합니다."""
+  merged = [a for a in activities if a.get('activity_type') != repaired.get('activity_type')]
+  merged.append(repaired)
+  return sorted(merged, key=lambda a: a.get('activity_id', 0))
 
 
 def lambda_handler(event, context):
@@ -170,10 +268,27 @@ def lambda_handler(event, context):
 
     print(f"Bedrock 호출 시작. SK: {SK}, 스크립트: {lang_script}")
 
-    # 1. Bedrock 호출
-    bedrock_result = call_bedrock_for_quiz_generation(lang_script, ko_script)
-    
-    raw_activities = bedrock_result.get('learning_activities', [])
+    # 1. 이전 시도의 검증 실패 확인 (재시도 횟수 증가 상태가 previous에 실패 당시 입력을 담아 줌)
+    previous = event.get('previous') or {}
+    failure = parse_validation_failure(previous.get('error'))
+    previous_activities = previous.get('raw_activities') or []
+    raw_activities = []
+
+    # 2-1. 수리 모드: 실패한 활동만 다시 생성해 나머지 활동과 병합
+    if failure and failure.get('activity_type') in REQUIRED_ACTIVITY_TYPES and previous_activities:
+      activity_type = failure['activity_type']
+      previous_activity = next((a for a in previous_activities if a.get('activity_type') == activity_type), None)
+      repaired = call_bedrock_for_activity_repair(lang_script, ko_script, activity_type, failure, previous_activity)
+      if repaired:
+        raw_activities = merge_activity(previous_activities, repaired)
+        print(f"{activity_type} 활동만 재생성하여 병합했습니다.")
+      else:
+        print(f"{activity_type} 재생성 결과가 없어 전체 생성으로 전환합니다.")
+
+    # 2-2. 전체 생성 (첫 실행, 형식 오류 등 활동을 특정할 수 없는 실패)
+    if not raw_activities:
+      bedrock_result = call_bedrock_for_quiz_generation(lang_script, ko_script)
+      raw_activities = bedrock_result.get('learning_activities', [])
 
     if not raw_activities:
       raise ValueError("Bedrock이 유효한 learning_activities를 생성하지 못했습니다.")
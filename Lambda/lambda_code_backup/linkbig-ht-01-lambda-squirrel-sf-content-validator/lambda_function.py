@@ -1,7 +1,26 @@
 import json
 import os
+import copy
 import random
 import re
+import unicodedata
+from qa_metrics import emit_counts
+
+# 발음 표기에 허용되는 문자 (한글, 공백, 기본 구두점) - 엄격 검사와 같은 기준
+PRONUNCIATION_DISALLOWED = re.compile(r'[^\s\.\,!\?\가-힣]')
+# 발음 표기의 전각/일본어 구두점은 같은 뜻의 허용 구두점으로 바꿉니다.
+PUNCTUATION_MAP = str.maketrans({'。': '.', '、': ',', '！': '!', '？': '?', '，': ',', '．': '.'})
+
+def validation_error(activity_type, rule, message):
+    """
+    구조화된 검증 실패를 만듭니다. Step Functions Catch의 $.error.Cause에 그대로 실리며,
+    sf-content-generator가 이를 읽어 실패한 활동(activity_type)만 다시 생성합니다.
+    activity_type이 None이면 전체 재생성이 필요한 형식 오류입니다.
+    """
+    return ValueError(json.dumps(
+        {"activity_type": activity_type, "rule": rule, "message": message},
+        ensure_ascii=False
+    ))
 
 def randomize_quiz_options(quiz_data):
     """
@@ -22,7 +41,7 @@ def randomize_quiz_options(quiz_data):
         answer_index = all_options.index(correct_option)
     except ValueError:
         # LLM이 정답을 제대로 포함하지 못했을 경우 (매우 드물지만 안전장치)
-        raise ValueError("LLM 응답에 정답 텍스트가 포함되지 않았습니다.")
+        raise validation_error('COMPREHENSION_QUIZ', 'quiz_correct_option_missing', "LLM 응답에 정답 텍스트가 포함되지 않았습니다.")
     
     # 3. 최종 구조에 반영
     quiz_data['options'] = all_options
@@ -30,6 +49,145 @@ def randomize_quiz_options(quiz_data):
 
     return quiz_data
 
+def normalize_text(text):
+    """NFC 정규화 + 앞뒤 공백 제거"""
+    return unicodedata.normalize('NFC', text).strip() if isinstance(text, str) else text
+
+def is_ignorable(char):
+    """청크 비교에서 무시하는 문자 (공백, 구두점)"""
+    return unicodedata.category(char)[0] in ('Z', 'P') or char.isspace()
+
+def comparison_key(text):
+    """공백/구두점 차이를 무시하고 비교하기 위한 키"""
+    return "".join(c for c in unicodedata.normalize('NFKC', text) if not is_ignorable(c))
+
+def realign_chunks(chunks, lang_script):
+    """
+    비교 키가 원본과 같은 청크를 원본 스크립트의 실제 구간으로 다시 자릅니다.
+    (공백/구두점 차이만 있는 청크를 원본 문자 그대로 맞춰 "".join(chunks) == lang_script가 되게 함)
+    구두점만 있는 청크는 앞 청크에 붙입니다. 키가 다르면 None.
+    """
+    if comparison_key("".join(chunks)) != comparison_key(lang_script):
+        return None
+
+    realigned = []
+    pos = 0
+    for chunk in chunks:
+        remaining = len(comparison_key(chunk))
+        if remaining == 0:
+            continue
+        start = pos
+        while remaining > 0 and pos < len(lang_script):
+            if not is_ignorable(lang_script[pos]):
+                # NFKC로 한 글자가 여러 글자가 되는 경우까지 맞춰 셉니다.
+                remaining -= len(comparison_key(lang_script[pos]))
+            pos += 1
+        # 청크 뒤에 붙은 공백/구두점은 이 청크에 포함합니다.
+        while pos < len(lang_script) and is_ignorable(lang_script[pos]):
+            pos += 1
+        realigned.append(lang_script[start:pos])
+
+    if realigned:
+        # 스크립트 앞쪽의 공백/구두점은 이미 첫 청크에 포함되어 있고, 끝까지 소비되었는지만 보장합니다.
+        realigned[-1] += lang_script[pos:]
+    return realigned
+
+def repair_bedrock_output(raw_activities, lang_script):
+    """
+    엄격한 검증 전에 LLM 출력의 사소한 형식 차이를 고칩니다. (재생성 한 번을 아끼기 위함)
+    반환: (수리된 activities 복사본, 수리 기록 목록 [{activity_type, repair, detail}])
+    """
+    if not isinstance(raw_activities, list):
+        return raw_activities, []
+
+    repairs = []
+    activities = copy.deepcopy(raw_activities)
+    # 엄격 검사는 입력 스크립트 그대로와 비교하므로 스크립트 자체는 바꾸지 않습니다.
+    lang_script = lang_script or ''
+
+    def record(activity_type, repair, detail):
+        repairs.append({"activity_type": activity_type, "repair": repair, "detail": detail})
+
+    for activity in activities:
+        if not isinstance(activity, dict):
+            continue
+        activity_type = activity.get('activity_type')
+
+        if activity_type == 'COMPREHENSION_QUIZ':
+            correct = normalize_text(activity.get('correct_option', ''))
+            if correct != activity.get('correct_option'):
+                record(activity_type, 'normalize_text', 'correct_option')
+                activity['correct_option'] = correct
+
+            incorrect = activity.get('incorrect_options')
+            if isinstance(incorrect, list):
+                normalized = [normalize_text(o) for o in incorrect]
+                if normalized != incorrect:
+                    record(activity_type, 'normalize_text', 'incorrect_options')
+                # 빈 값, 중복, 정답과 같은 오답 제거 (순서 유지)
+                cleaned = []
+                for option in normalized:
+                    if option and option != correct and option not in cleaned:
+                        cleaned.append(option)
+                if len(cleaned) != len(incorrect):
+                    record(activity_type, 'dedupe_options', f"{len(incorrect)} -> {len(cleaned)}")
+                if len(cleaned) > 3:
+                    record(activity_type, 'truncate_options', f"{len(cleaned)} -> 3")
+                    cleaned = cleaned[:3]
+                activity['incorrect_options'] = cleaned
+
+        elif activity_type == 'SENTENCE_RECONSTRUCTION':
+            chunks = activity.get('chunks')
+            if isinstance(chunks, list) and all(isinstance(c, str) for c in chunks):
+                normalized = [normalize_text(c) for c in chunks]
+                if "".join(chunks) != lang_script:
+                    realigned = realign_chunks(normalized, lang_script)
+                    if realigned is not None:
+                        record(activity_type, 'realign_chunks', f"{chunks} -> {realigned}")
+                        activity['chunks'] = realigned
+            if activity.get('target_sentence') != lang_script and comparison_key(activity.get('target_sentence') or '') == comparison_key(lang_script):
+                record(activity_type, 'normalize_text', 'target_sentence')
+                activity['target_sentence'] = lang_script
+
+        elif activity_type == 'RECOMMENDED_RESPONSES':
+            for response in activity.get('recommended_responses') or []:
+                if not isinstance(response, dict):
+                    continue
+                for field in ('recommended_answer', 'korean_translation'):
+                    value = normalize_text(response.get(field, ''))
+                    if value != response.get(field):
+                        record(activity_type, 'normalize_text', field)
+                        response[field] = value
+
+                pronunciation = response.get('pronunciation')
+                if not isinstance(pronunciation, str):
+                    continue
+                fixed = normalize_text(pronunciation).translate(PUNCTUATION_MAP)
+                # 허용되지 않은 문자 중 구두점/기호만 지웁니다. (글자가 섞인 경우는 엄격 검사에서 실패)
+                fixed = "".join(
+                    c for c in fixed
+                    if not (PRONUNCIATION_DISALLOWED.match(c) and unicodedata.category(c)[0] in ('P', 'S'))
+                )
+                fixed = re.sub(r'\s+', ' ', fixed).strip()
+                if fixed != pronunciation:
+                    record(activity_type, 'strip_pronunciation_punctuation', f"{pronunciation} -> {fixed}")
+                    response['pronunciation'] = fixed
+
+    return activities, repairs
+
+def emit_repair_metrics(repairs, retry_avoided, passed):
+    """수리 종류별 횟수와, 수리 덕분에 재생성을 피했는지(RetriesAvoided)를 지표로 출력합니다."""
+    per_repair = {}
+    for repair in repairs:
+        per_repair[repair['repair']] = per_repair.get(repair['repair'], 0) + 1
+    for name, count in per_repair.items():
+        emit_counts('Repair', name, {'Repaired': count})
+    emit_counts('Stage', 'ContentValidator', {
+        'RepairedItems': int(bool(repairs)),
+        'RetriesAvoided': int(retry_avoided),
+        'ValidationFailed': int(not passed),
+    })
+
 def validate_bedrock_output(raw_activities, lang_script, ko_script):
     """Bedrock의 raw 출력을 검증하고 무작위화된 activities 리스트를 반환합니다."""
     
@@ -37,15 +195,16 @@ def validate_bedrock_output(raw_activities, lang_script, ko_script):
     found_types = set()
     
     if not isinstance(raw_activities, list) or not raw_activities:
-        raise ValueError("형식 오류: 'learning_activities'가 유효한 리스트가 아니거나 비어 있습니다.")
+        raise validation_error(None, 'activities_not_list', "형식 오류: 'learning_activities'가 유효한 리스트가 아니거나 비어 있습니다.")
 
-    for activity in raw_activities:
+    # 무작위화가 원본 dict를 수정하므로 복사본으로 검증 (raw_activities는 재생성 시 병합용으로 그대로 전달)
+    for activity in copy.deepcopy(raw_activities):
         activity_type = activity.get('activity_type')
         found_types.add(activity_type)
         
         # 1. 형식적 검증 (필수 키)
         if not activity_type or 'activity_id' not in activity:
-            raise ValueError(f"형식 오류: 활동에 필수 키(type/id)가 누락되었습니다. ({activity})")
+            raise validation_error(None, 'activity_missing_keys', f"형식 오류: 활동에 필수 키(type/id)가 누락되었습니다. ({activity})")
 
         if activity_type == 'COMPREHENSION_QUIZ':
             correct = activity.get('correct_option', '')
@@ -54,15 +213,15 @@ def validate_bedrock_output(raw_activities, lang_script, ko_script):
             
             # 1. 형식적 검증 (퀴즈 옵션 개수)
             if len(incorrect) != 3:
-                 raise ValueError(f"형식 오류: 퀴즈 오답이 3개가 아닙니다. 실제 개수: {len(incorrect)}")
+                 raise validation_error(activity_type, 'quiz_incorrect_option_count', f"형식 오류: 퀴즈 오답이 3개가 아닙니다. 실제 개수: {len(incorrect)}")
 
             # 2. 논리적 검증 (정답/오답 중복)
             if correct in incorrect:
-                 raise ValueError("논리적 오류: 퀴즈 정답과 오답이 중복됩니다.")
+                 raise validation_error(activity_type, 'quiz_duplicate_option', "논리적 오류: 퀴즈 정답과 오답이 중복됩니다.")
                  
             # 3. 학습 효과 검증 (Tip에 정답 포함 금지)
             if correct in tip or ko_script in tip:
-                 raise ValueError("교육적 오류: 퀴즈 Tip에 정답 또는 번역이 포함되어 있습니다.")
+                 raise validation_error(activity_type, 'quiz_tip_leaks_answer', "교육적 오류: 퀴즈 Tip에 정답 또는 번역이 포함되어 있습니다.")
                  
             # 검증 통과 후, 무작위화 수행 및 최종 리스트에 추가
             final_activities.append(randomize_quiz_options(activity))
@@ -73,7 +232,7 @@ def validate_bedrock_output(raw_activities, lang_script, ko_script):
             # 2. 논리적 검증 (청크 재구성 일치)
             reconstructed = "".join(chunks)
             if reconstructed != lang_script:
-                 raise ValueError(f"논리적 오류: 청크 재구성 결과가 원본 스크립트와 일치하지 않습니다. ({reconstructed} != {lang_script})")
+                 raise validation_error(activity_type, 'reconstruction_chunks_mismatch', f"논리적 오류: 청크 재구성 결과가 원본 스크립트와 일치하지 않습니다. ({reconstructed} != {lang_script})")
                  
             final_activities.append(activity)
 
@@ -90,7 +249,7 @@ def validate_bedrock_output(raw_activities, lang_script, ko_script):
                 # 2. 논리적 검증 (발음 필드 한글 외 문자 검사 - 정규식)
                 # 한글, 공백, 기본 구두점(. , ! ? ,) 외 문자 포함 시 오류
                 if re.search(r'[^\s\.\,!\?\가-힣]', pronunciation): 
-                    raise ValueError(f"논리적 오류: 발음 필드에 허용되지 않은 문자(한글 외)가 포함되어 있습니다. ({pronunciation})")
+                    raise validation_error(activity_type, 'pronunciation_non_hangul', f"논리적 오류: 발음 필드에 허용되지 않은 문자(한글 외)가 포함되어 있습니다. ({pronunciation})")
             
             final_activities.append(activity)
         
@@ -101,7 +260,10 @@ def validate_bedrock_output(raw_activities, lang_script, ko_script):
     # 1. 형식적 검증 (최종 필수 활동 포함 여부)
     required_types = {'COMPREHENSION_QUIZ', 'SENTENCE_RECONSTRUCTION', 'RECOMMENDED_RESPONSES'}
     if not required_types.issubset(found_types):
-        raise ValueError(f"형식 오류: 필수 활동이 누락되었습니다. 누락된 활동: {required_types - found_types}")
+        missing_types = required_types - found_types
+        # 하나만 빠졌으면 그 활동만 생성하면 되므로 activity_type으로 지정
+        missing_type = next(iter(missing_types)) if len(missing_types) == 1 else None
+        raise validation_error(missing_type, 'activity_missing', f"형식 오류: 필수 활동이 누락되었습니다. 누락된 활동: {missing_types}")
 
     return final_activities
 
@@ -118,9 +280,27 @@ def lambda_handler(event, context):
     
     print(f"Validation 시작. SK: {SK}")
 
-    # 1. 검증 및 무작위화 수행
-    # 실패 시 ValueError 발생하여 Step Functions Catch로 이동
-    validated_activities = validate_bedrock_output(raw_activities, lang_script, ko_script)
+    # 1. 사소한 형식 차이 수리 (공백/NFC, 중복/초과 오답, 청크 구두점, 발음 구두점)
+    repaired_activities, repairs = repair_bedrock_output(raw_activities, lang_script)
+    for repair in repairs:
+        print(f"수리: {repair['activity_type']} {repair['repair']} ({repair['detail']})")
+
+    # 2. 검증 및 무작위화 수행
+    # 실패 시 구조화된 ValueError(activity_type, rule) 발생하여 Step Functions Catch로 이동
+    try:
+        validated_activities = validate_bedrock_output(repaired_activities, lang_script, ko_script)
+    except ValueError:
+        emit_repair_metrics(repairs, retry_avoided=False, passed=False)
+        raise
+
+    # 수리 전 원본도 통과했는지 확인해, 수리가 실제로 재생성을 막았는지 기록합니다.
+    retry_avoided = False
+    if repairs:
+        try:
+            validate_bedrock_output(raw_activities, lang_script, ko_script)
+        except ValueError:
+            retry_avoided = True
+    emit_repair_metrics(repairs, retry_avoided, passed=True)
     
     # 다음 단계(TTS 생성)에 필요한 데이터 반환
     return {
@@ -129,5 +309,7 @@ def lambda_handler(event, context):
         'lang_script': lang_script,
         'ko_script': ko_script,
         'validated_activities': validated_activities, # 검증이 완료된 최종 리스트
+        'raw_activities': repaired_activities, # 다음 검증 실패 시 실패한 활동만 재생성하기 위한 원본 (수리 반영)
+        'content_repairs': repairs, # 수리 기록 (최종 단계에서 아이템에 저장)
         'iteration_count': iteration_count
     }
\ No newline at end of file
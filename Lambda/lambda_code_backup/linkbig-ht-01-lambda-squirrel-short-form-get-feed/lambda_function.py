@@ -6,6 +6,7 @@ from decimal import Decimal
 from botocore.exceptions import ClientError
 from boto3.dynamodb.conditions import Key
 import traceback # 상세 에러 로깅을 위해 추가
+from log_utils import get_logger
 
 # --- (상수, 헬퍼 클래스, S3/DynamoDB 클라이언트 초기화 등은 기존과 동일) ---
 # --- AWS 클라이언트 및 DynamoDB 테이블 객체 초기화 ---
@@ -18,6 +19,8 @@ LEARNED_TABLE_NAME = os.environ.get("LEARNED_TABLE_NAME", "linkbig-ht-01-shortfo
 AUDIO_BUCKET_NAME = os.environ.get("AUDIO_BUCKET_NAME")
 CLOUD_FRONT_URL = os.environ['CLOUD_FRONT']
 
+logger = get_logger("get-feed")
+
 # --- DynamoDB 테이블 ---
 videos_table = dynamodb.Table(VIDEOS_TABLE_NAME)
 
@@ -50,7 +53,7 @@ def generate_cloudFront_url(s3_key):
         url = f"https://{CLOUD_FRONT_URL}/{clean_key}"
         return url
     except Exception as e:
-        print(f"Pre-signed URL 생성 실패 (Key: {s3_key}): {e}")
+        logger.error("Pre-signed URL 생성 실패 (Key: %s): %s", s3_key, e)
         return None
 
 def safe_get(data, keys, default=""):
@@ -102,7 +105,8 @@ def process_activities_for_audio_url(activities):
 # --- 메인 Lambda 핸들러 ---
 
 def lambda_handler(event, context):
-    print(f"get-feed received event: {json.dumps(event, ensure_ascii=False)}")
+    logger.start_request(context)
+    logger.debug("get-feed received event", event=event)
 
     cors_headers = {
         'Access-Control-Allow-Origin': '*',
@@ -141,7 +145,7 @@ def lambda_handler(event, context):
             )
             all_challenge_items = response.get('Items', [])
         except Exception as e:
-            print(f"Videos 테이블 조회 실패: {e}")
+            logger.error("Videos 테이블 조회 실패: %s", e)
             all_challenge_items = []
 
         # 3. 학습 완료 여부 확인 (생략)
@@ -158,7 +162,7 @@ def lambda_handler(event, context):
                     learned_items = learned_response.get('Responses', {}).get(LEARNED_TABLE_NAME, [])
                     learned_set = {item.get('videoId') for item in learned_items if item.get('videoId')}
                 except Exception as e:
-                    print(f"LearnedStatus 테이블 조회 실패: {e}")
+                    logger.error("LearnedStatus 테이블 조회 실패: %s", e)
 
         # 4. 학습 안 한 영상 필터링 및 랜덤 셔플 (생략)
         unlearned_challenges = [item for item in all_challenge_items
@@ -168,7 +172,7 @@ def lambda_handler(event, context):
         random.shuffle(unlearned_challenges)
 
         if not unlearned_challenges:
-            print(f"사용자 {user_uuid}가 {lang_code}의 모든 영상을 학습했습니다. 학습한 영상 랜덤 피드 제공.")
+            logger.info("사용자 %s가 %s의 모든 영상을 학습했습니다. 학습한 영상 랜덤 피드 제공.", user_uuid, lang_code)
             random.shuffle(all_challenge_items)
             final_challenges = all_challenge_items
         else:
@@ -240,8 +244,7 @@ def lambda_handler(event, context):
         }
 
     except Exception as e:
-        print(f"!!! Error in get-feed handler: {e}")
-        traceback.print_exc()
+        logger.error("Error in get-feed handler: %s", e, traceback=traceback.format_exc)
         return {
             'statusCode': 500,
             'headers': cors_headers,
@@ -0,0 +1,93 @@
+import json
+import os
+import random
+import re
+import time
+
+# 공통 로깅 모듈. authorizer, ws-authorizer, short-form-socket-onConnect, short-form-getVideoList,
+# short-form-get-feed, short-form-start-korean에 같은 파일이 복사되어 있으므로 수정 시 모두 함께 바꿉니다.
+
+# 로그 레벨 (환경 변수 LOG_LEVEL로 조정)
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARN": 30, "ERROR": 40}
+LOG_LEVEL = LEVELS.get(os.environ.get("LOG_LEVEL", "INFO").upper(), LEVELS["INFO"])
+
+# 요청 단위 샘플링 비율: 샘플링된 요청만 DEBUG 로그(전체 event 등)를 남깁니다.
+SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "0.01"))
+
+# 값 전체를 가릴 키 (소문자 비교)
+REDACT_KEYS = {
+    "authorization", "authorizationtoken", "uuid", "user_uuid", "principalid",
+    "fcm_token", "x-amz-security-token", "x-api-key",
+}
+UUID_PATTERN = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
+REDACTED = "***"
+
+
+def redact(value):
+    """dict/list/str를 재귀적으로 순회하며 토큰과 uuid를 가립니다."""
+    if isinstance(value, dict):
+        return {
+            k: (REDACTED if str(k).lower() in REDACT_KEYS and v else redact(v))
+            for k, v in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    if isinstance(value, str):
+        return UUID_PATTERN.sub(REDACTED, value)
+    return value
+
+
+class Logger:
+    """
+    JSON 한 줄 형식의 구조화 로거.
+    - 레벨 미달이거나 샘플링되지 않은 레코드는 메시지 포맷/직렬화를 전혀 하지 않습니다.
+    - 필드 값으로 callable을 넘기면 실제로 출력될 때만 호출됩니다.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.level = LOG_LEVEL
+        self.request_id = None
+        self.sampled = False
+
+    def start_request(self, context=None):
+        """핸들러 진입 시 호출해 요청 ID와 샘플링 여부를 정합니다."""
+        self.request_id = getattr(context, "aws_request_id", None)
+        self.sampled = random.random() < SAMPLE_RATE
+
+    def is_enabled(self, level):
+        threshold = LEVELS["DEBUG"] if self.sampled else self.level
+        return LEVELS[level] >= threshold
+
+    def debug(self, msg, *args, **fields):
+        if self.is_enabled("DEBUG"):
+            self._emit("DEBUG", msg, args, fields)
+
+    def info(self, msg, *args, **fields):
+        if self.is_enabled("INFO"):
+            self._emit("INFO", msg, args, fields)
+
+    def warning(self, msg, *args, **fields):
+        if self.is_enabled("WARN"):
+            self._emit("WARN", msg, args, fields)
+
+    def error(self, msg, *args, **fields):
+        if self.is_enabled("ERROR"):
+            self._emit("ERROR", msg, args, fields)
+
+    def _emit(self, level, msg, args, fields):
+        record = {
+            "ts": round(time.time(), 3),
+            "level": level,
+            "logger": self.name,
+            "msg": redact(msg % args if args else msg),
+        }
+        if self.request_id:
+            record["requestId"] = self.request_id
+        for key, value in fields.items():
+            record[key] = redact(value() if callable(value) else value)
+        print(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def get_logger(name):
+    return Logger(name)
@@ -2,6 +2,7 @@ import json
 import os
 import boto3
 from decimal import Decimal
+from log_utils import get_logger
 
 # S3 클라이언트 초기화 (Presigned URL 생성용)
 s3_client = boto3.client('s3')
@@ -15,6 +16,7 @@ VIDEOS_BUCKET_NAME = os.environ['VIDEOS_BUCKET_NAME']
 
 CLOUD_FRONT_URL = os.environ['CLOUD_FRONT']
 table = dynamodb.Table(VIDEOS_TABLE_NAME)
+logger = get_logger("getVideoList")
 
 # 언어 코드 매핑
 LANG_CODE_MAP = {
@@ -39,7 +41,8 @@ def lambda_handler(event, context):
     - S3 경로는 모두 Presigned URL로 변환하여 보안을 강화합니다.
     - REST API의 GET /videos/{lang}/{themeId} 와 연결됩니다.
     """
-    print(f"getVideoList received event: {json.dumps(event, ensure_ascii=False)}")
+    logger.start_request(context)
+    logger.debug("getVideoList received event", event=event)
     
     try:
         # 1. Authorizer와 URL 경로에서 파라미터 추출
@@ -75,7 +78,7 @@ def lambda_handler(event, context):
         items = response.get('Items', [])
         
     except Exception as e:
-        print(f"DynamoDB Query Error: {e}")
+        logger.error("DynamoDB Query Error: %s", e)
         return {
             "statusCode": 500,
             "headers": {"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"},
@@ -107,7 +110,7 @@ def lambda_handler(event, context):
         #cloud front로 대체함 - 25.11.22
         clean_key = item.get('s3Url').replace("contents/jp/", "", 1)
         item['s3Url'] = "https://" + CLOUD_FRONT_URL + "/" + clean_key
-        print("영상 주소 : ",item['s3Url'])
+        logger.debug("영상 주소 : %s", item['s3Url'])
 
         filename_without_ext = clean_key.rsplit("/", 1)[-1].rsplit(".", 1)[0]
 
@@ -118,7 +121,7 @@ def lambda_handler(event, context):
         thumbnail_key = thumbnail_key.rsplit("/", 1)[0] + f"/{filename_without_ext}.png"
 
         item['thumbnailUrl'] = f"https://{CLOUD_FRONT_URL}/{thumbnail_key}"
-        print("썸네일 주소 : ",item['thumbnailUrl'])
+        logger.debug("썸네일 주소 : %s", item['thumbnailUrl'])
 
 
         # recommend 안의 s3Url도 Presigned URL로 변환
@@ -1,18 +1,20 @@
-import json
 import boto3
 import os
 import time
+from log_utils import get_logger
 
 # DynamoDB 리소스 초기화
 dynamodb = boto3.resource('dynamodb')
 connections_table = dynamodb.Table(os.environ['CONNECTIONS_TABLE_NAME'])
+logger = get_logger("onConnect")
 
 def lambda_handler(event, context):
     """
     WebSocket $connect 라우트를 처리합니다.
     Authorizer로부터 받은 사용자 정보를 ConnectionsTable에 저장합니다.
     """
-    print(f"onConnect received event: {json.dumps(event, ensure_ascii=False)}")
+    logger.start_request(context)
+    logger.debug("onConnect received event", event=event)
     
     connection_id = event['requestContext']['connectionId']
 
@@ -25,7 +27,7 @@ def lambda_handler(event, context):
 
         # Authorizer를 통과했으므로 user_uuid는 항상 존재해야 합니다.
         if not user_uuid:
-            print("Critical Error: user_uuid is missing from authorizer context.")
+            logger.error("Critical Error: user_uuid is missing from authorizer context.")
             return {"statusCode": 403, "body": "Unauthorized"}
 
         # 2. TTL(Time-To-Live) 타임스탬프 생성 (1시간 후 자동 만료)
@@ -44,12 +46,12 @@ def lambda_handler(event, context):
 
         # 4. DynamoDB에 연결 정보 저장
         connections_table.put_item(Item=item)
-        print(f"Connection stored successfully for user: {user_uuid}")
+        logger.info("Connection stored successfully for user: %s", user_uuid)
 
         # 5. 연결 성공 응답 반환
         return {"statusCode": 200, "body": "Connected."}
 
     except Exception as e:
         # 6. 오류 발생 시 연결 실패 응답 반환
-        print(f"Error on connect: {e}")
+        logger.error("Error on connect: %s", e)
         return {"statusCode": 500, "body": "Failed to connect."}
\ No newline at end of file
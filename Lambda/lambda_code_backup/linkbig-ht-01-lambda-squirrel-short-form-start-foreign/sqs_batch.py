@@ -0,0 +1,30 @@
+# SQS 트리거 Lambda 공통 배치 처리 헬퍼
+# 이벤트 소스 매핑에 FunctionResponseTypes=["ReportBatchItemFailures"]가 설정되어 있어야 합니다.
+# 실패한 messageId만 batchItemFailures로 돌려주면, SQS는 그 메시지만 다시 보이게 하고
+# 이미 성공한 메시지는 삭제합니다. (배치 전체 재처리로 인한 중복 쓰기 방지)
+
+
+def batch_response(failed_message_ids):
+    """실패한 messageId 목록을 Lambda 부분 배치 응답 형식으로 변환합니다."""
+    return {
+        "batchItemFailures": [
+            {"itemIdentifier": message_id} for message_id in failed_message_ids
+        ]
+    }
+
+
+def process_batch(records, process_record):
+    """
+    레코드마다 process_record(record)를 실행하고, 예외가 난 레코드만 실패로 보고합니다.
+    재시도가 필요 없는 메시지는 process_record 안에서 예외 없이 반환하면 됩니다.
+    """
+    failed_message_ids = []
+    for record in records:
+        try:
+            process_record(record)
+        except Exception as e:
+            print(f"Failed to process message {record.get('messageId')}: {e}")
+            failed_message_ids.append(record.get("messageId"))
+
+    print(f"Processed {len(records) - len(failed_message_ids)}/{len(records)} messages, {len(failed_message_ids)} failed.")
+    return batch_response(failed_message_ids)
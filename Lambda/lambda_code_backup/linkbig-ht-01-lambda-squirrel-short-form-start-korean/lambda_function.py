@@ -1,9 +1,11 @@
 import json
 import os
 import boto3
-import uuid
 import base64
 from datetime import datetime, timezone
+from botocore.exceptions import ClientError
+from sqs_batch import process_batch
+from log_utils import get_logger
 
 # AWS 서비스 클라이언트 초기화
 transcribe = boto3.client('transcribe')
@@ -15,6 +17,7 @@ HISTORY_TABLE_NAME = os.environ['HISTORY_TABLE_NAME']
 VIDEOS_TABLE_NAME = os.environ['VIDEOS_TABLE_NAME']
 history_table = dynamodb.Table(HISTORY_TABLE_NAME)
 videos_table = dynamodb.Table(VIDEOS_TABLE_NAME)
+logger = get_logger("start-korean")
 
 # 언어 코드 매핑
 LANG_CODE_MAP = {
@@ -23,83 +26,107 @@ LANG_CODE_MAP = {
     "es": "SPANISH"
 }
 
-def lambda_handler(event, context):
+def process_record(record):
     """
-    SQS(korean-process-queue)로부터 트리거됩니다.
-    videoId로 원본 대본을 조회하고, 사용자의 한국어 음성에 대한 Transcribe 작업을 시작합니다.
+    SQS 메시지 하나를 처리합니다. 예외가 나면 해당 메시지만 재시도됩니다.
+    재시도해도 같은 결과인 메시지(필수 값 누락, 미지원 언어, 원본 대본 없음)는 로그만 남기고 반환합니다.
+    학습 기록 SK와 Transcribe 작업 이름은 messageId로 정해지므로 재시도해도 중복 생성되지 않습니다.
     """
-    print(f"start-korean received event: {json.dumps(event, ensure_ascii=False)}")
+    # 1. SQS 페이로드 파싱
+    message_id = record['messageId']
+    payload = json.loads(record['body'])
+    connection_id = payload.get('connectionId')
+    user_uuid = payload.get('uuid')
+    nickname = payload.get('nickname')
+    gender = payload.get('gender')
+    learning_lang = payload.get('learningLang')
+    msg_body = payload.get('messageBody', {})
+    
+    video_id = msg_body.get('videoId')
+    theme_id = msg_body.get('themeId')
+    user_audio_s3_key = msg_body.get('s3Key')
+
+    if not all([connection_id, user_uuid, nickname, learning_lang, user_audio_s3_key, video_id]):
+        logger.error("Missing required data in SQS message for Korean processing.", messageId=message_id)
+        return  # 재시도해도 같은 결과이므로 실패로 보고하지 않음
+
+    full_lang = LANG_CODE_MAP.get(learning_lang.lower())
+    if not full_lang:
+        logger.error("Unsupported learning language: %s", learning_lang, messageId=message_id)
+        return
 
-    for record in event.get('Records', []):
-        try:
-            # 1. SQS 페이로드 파싱
-            payload = json.loads(record['body'])
-            connection_id = payload.get('connectionId')
-            user_uuid = payload.get('uuid')
-            nickname = payload.get('nickname')
-            gender = payload.get('gender')
-            learning_lang = payload.get('learningLang')
-            msg_body = payload.get('messageBody', {})
-            
-            video_id = msg_body.get('videoId')
-            theme_id = msg_body.get('themeId')
-            user_audio_s3_key = msg_body.get('s3Key')
+    # 2. VideosTable에서 originalScript 조회
+    video_item = videos_table.get_item(Key={'lang': full_lang, 'SK': video_id}).get('Item')
+    if not video_item or 'scene' not in video_item or 'lang-script' not in video_item['scene']:
+        logger.error("Could not find originalScript for videoId: %s", video_id, messageId=message_id)
+        return
+    original_script = video_item['scene']['lang-script']
 
-            if not all([connection_id, user_uuid, nickname, user_audio_s3_key, video_id]):
-                raise ValueError("Missing required data in SQS message for Korean processing.")
+    # 3. DynamoDB와 Transcribe Job 이름에 사용할 안전한 시간 문자열 생성
+    # 재시도에도 같은 값이 나오도록 현재 시각 대신 메시지 전송 시각(SentTimestamp)을 사용합니다.
+    sent_at = datetime.fromtimestamp(int(record['attributes']['SentTimestamp']) / 1000, timezone.utc)
+    safe_timestamp = sent_at.strftime("%Y-%m-%dT%H-%M-%S-%f")
 
-            # 2. VideosTable에서 originalScript 조회
-            full_lang = LANG_CODE_MAP.get(learning_lang.lower())
-            video_item = videos_table.get_item(Key={'lang': full_lang, 'SK': video_id}).get('Item')
-            if not video_item or 'scene' not in video_item or 'lang-script' not in video_item['scene']:
-                 raise ValueError(f"Could not find originalScript for videoId: {video_id}")
-            original_script = video_item['scene']['lang-script']
+    # 4. DynamoDB에 '처리 중' 상태의 임시 학습 기록 저장 (재시도면 이미 만든 기록을 그대로 사용)
+    pk = f"{nickname}#{user_uuid}"
+    sk = f"kr#{safe_timestamp}#{message_id.replace('-', '')[:7]}"
 
-            # 3. DynamoDB와 Transcribe Job 이름에 사용할 안전한 시간 문자열 생성
-            safe_timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H-%M-%S-%f")
+    initial_item = {
+        "PK": pk, "SK": sk, "videoId": video_id, "themeId": theme_id,
+        "lang": learning_lang.upper(), "connectionId": connection_id,
+        "status": "PROCESSING_KO", "originalScript": original_script,
+        "gender": gender, "createdAt": datetime.now(timezone.utc).isoformat(),
+        "userInput": {
+            "voiceS3Key": user_audio_s3_key
+        }
+    }
+    try:
+        history_table.put_item(Item=initial_item, ConditionExpression="attribute_not_exists(SK)")
+        logger.debug("Initial Korean history item created. PK: %s, SK: %s", pk, sk)
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        logger.info("Korean history item already exists (retry). SK: %s", sk)
 
-            # 4. DynamoDB에 '처리 중' 상태의 임시 학습 기록 저장
-            pk = f"{nickname}#{user_uuid}"
-            sk = f"kr#{safe_timestamp}#{uuid.uuid4().hex[:7]}"
+    # 5. Transcribe 작업 시작
+    s3_uri = f"s3://{AUDIO_BUCKET_NAME}/{user_audio_s3_key}"
+    
+    nickname_b64_padded = base64.urlsafe_b64encode(nickname.encode('utf-8')).decode('utf-8')
+    nickname_b64 = nickname_b64_padded.rstrip('=')
+    safe_pk_for_job = f"{nickname_b64}--{user_uuid}"
+    
+    job_name = f"korean--{safe_pk_for_job}___{sk.replace('#','--')}"
+    output_key = f"transcripts/{job_name}.json"
 
-            initial_item = {
-                "PK": pk, "SK": sk, "videoId": video_id, "themeId": theme_id,
-                "lang": learning_lang.upper(), "connectionId": connection_id,
-                "status": "PROCESSING_KO", "originalScript": original_script,
-                "gender": gender, "createdAt": datetime.now(timezone.utc).isoformat(),
-                "userInput": {
-                    "voiceS3Key": user_audio_s3_key
-                }
-            }
-            history_table.put_item(Item=initial_item)
-            print(f"Initial Korean history item created. PK: {pk}, SK: {sk}")
+    try:
+        transcribe.start_transcription_job(
+            TranscriptionJobName=job_name,
+            Media={'MediaFileUri': s3_uri},
+            LanguageCode='ko-KR',
+            OutputBucketName=AUDIO_BUCKET_NAME,
+            OutputKey=output_key
+        )
+    except ClientError as e:
+        # 이전 시도에서 이미 시작된 작업이면 그대로 진행합니다.
+        if e.response['Error']['Code'] != 'ConflictException':
+            raise
+        logger.info("Korean Transcribe job already exists (retry): %s", job_name)
+    
+    # 6. 생성된 임시 기록에 transcribeJobName 업데이트
+    history_table.update_item(
+        Key={'PK': pk, 'SK': sk},
+        UpdateExpression="SET transcribeJobName = :tj",
+        ExpressionAttributeValues={':tj': job_name}
+    )
+    logger.info("Started Korean Transcribe job: %s", job_name)
 
-            # 5. Transcribe 작업 시작
-            s3_uri = f"s3://{AUDIO_BUCKET_NAME}/{user_audio_s3_key}"
-            
-            nickname_b64_padded = base64.urlsafe_b64encode(nickname.encode('utf-8')).decode('utf-8')
-            nickname_b64 = nickname_b64_padded.rstrip('=')
-            safe_pk_for_job = f"{nickname_b64}--{user_uuid}"
-            
-            job_name = f"korean--{safe_pk_for_job}___{sk.replace('#','--')}"
-            output_key = f"transcripts/{job_name}.json"
 
-            transcribe.start_transcription_job(
-                TranscriptionJobName=job_name,
-                Media={'MediaFileUri': s3_uri},
-                LanguageCode='ko-KR',
-                OutputBucketName=AUDIO_BUCKET_NAME,
-                OutputKey=output_key
-            )
-            
-            # 6. 생성된 임시 기록에 transcribeJobName 업데이트
-            history_table.update_item(
-                Key={'PK': pk, 'SK': sk},
-                UpdateExpression="SET transcribeJobName = :tj",
-                ExpressionAttributeValues={':tj': job_name}
-            )
-            print(f"Started Korean Transcribe job: {job_name}")
+def lambda_handler(event, context):
+    """
+    SQS(korean-process-queue)로부터 트리거됩니다.
+    videoId로 원본 대본을 조회하고, 사용자의 한국어 음성에 대한 Transcribe 작업을 시작합니다.
+    """
+    logger.start_request(context)
+    logger.debug("start-korean received event", event=event)
 
-        except Exception as e:
-            print(f"Error in start-korean: {e}")
-            continue
\ No newline at end of file
+    return process_batch(event.get('Records', []), process_record)
@@ -1,22 +1,77 @@
 import os
+import time
 import mysql.connector
-from mysql.connector import pooling
+from mysql.connector import errors
+
+# Lambda 컨테이너는 한 번에 하나의 요청만 처리하므로 풀 대신 단일 커넥션을 재사용합니다.
+DB_CONFIG = {
+    "host": os.environ.get('DB_HOST'),
+    "user": os.environ.get('DB_USER'),
+    "password": os.environ.get('DB_PASSWORD'),
+    "database": os.environ.get('DB_NAME'),
+    "connection_timeout": int(os.environ.get('DB_CONNECT_TIMEOUT', '5')),
+    # 커넥션을 호출 사이에 재사용하므로 autocommit을 켭니다.
+    # 꺼 두면 commit/rollback 하지 않는 읽기 전용 호출(authorizer 등)이 REPEATABLE READ에서
+    # 첫 조회의 스냅샷을 계속 읽어, 새로 가입한 사용자나 새 FCM 토큰이 보이지 않습니다.
+    "autocommit": True,
+}
+
+MAX_RETRIES = int(os.environ.get('DB_MAX_RETRIES', '3'))
+BACKOFF_BASE_SECONDS = 0.2
+
+connection = None
+
+
+def _connect():
+    """백오프를 적용해 새 커넥션을 엽니다."""
+    last_error = None
+    for attempt in range(MAX_RETRIES):
+        try:
+            return mysql.connector.connect(**DB_CONFIG)
+        except errors.Error as e:
+            last_error = e
+            delay = BACKOFF_BASE_SECONDS * (2 ** attempt)
+            print(f"DB 연결 실패 (시도 {attempt + 1}/{MAX_RETRIES}): {e}. {delay:.1f}초 후 재시도")
+            time.sleep(delay)
+    raise last_error
 
-db_pool = None
 
 def get_connection():
-    global db_pool
-    if db_pool is None:
-        print("DB 커넥션 풀을 새로 생성합니다...")
-        pool_config = {
-            "host": os.environ.get('DB_HOST'),
-            "user": os.environ.get('DB_USER'),
-            "password": os.environ.get('DB_PASSWORD'),
-            "database": os.environ.get('DB_NAME'),
-            "pool_name": "lambda_pool",
-            "pool_size": 5,
-        }
-        db_pool = pooling.MySQLConnectionPool(**pool_config)
-    
-    print("풀에서 커넥션을 빌려옵니다.")
-    return db_pool.get_connection()
\ No newline at end of file
+    """
+    컨테이너 단위로 유지되는 커넥션을 반환합니다.
+    사용 전에 가벼운 ping으로 확인하고, idle timeout 등으로 끊겼으면 다시 연결합니다.
+    반환된 커넥션은 close() 하지 말고 커서만 닫아주세요.
+    """
+    global connection
+    if connection is not None:
+        try:
+            connection.ping(reconnect=False)
+            return connection
+        except errors.Error as e:
+            print(f"기존 DB 커넥션이 유효하지 않아 재연결합니다: {e}")
+            try:
+                connection.close()
+            except errors.Error:
+                pass
+            connection = None
+
+    print("DB 커넥션을 새로 생성합니다...")
+    connection = _connect()
+    return connection
+
+
+def get_cursor(dictionary=False, connection=None):
+    """
+    고정 쿼리용 prepared statement 커서를 반환합니다.
+    이미 get_connection()으로 받은 커넥션이 있으면 넘겨서 ping을 한 번만 하게 합니다.
+    """
+    return (connection or get_connection()).cursor(prepared=True, dictionary=dictionary)
+
+
+# 콜드 스타트(init) 단계에서 미리 연결해 첫 요청의 지연을 줄입니다.
+if DB_CONFIG["host"]:
+    try:
+        connection = _connect()
+    except errors.Error as e:
+        print(f"init 단계 DB 연결 실패, 첫 요청에서 다시 시도합니다: {e}")
+        connection = None
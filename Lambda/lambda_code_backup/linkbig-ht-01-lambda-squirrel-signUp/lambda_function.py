@@ -1,6 +1,6 @@
 import json
 import uuid
-from db import get_connection
+from db import get_connection, get_cursor
 import datetime
 
 CORS_HEADERS = {
@@ -47,15 +47,15 @@ def lambda_handler(event, context):
         now = datetime.datetime.now()
 
         connection = get_connection()
-        cursor = connection.cursor()
+        cursor = get_cursor(connection=connection)
 
         # --- DB 작업 수행 ---
         new_uuid = str(uuid.uuid4())
 
         query = "INSERT INTO user (nickname, uuid, gender, created_at, fcm_token) VALUES (%s, %s, %s, %s, %s)"
         
+        # autocommit 커넥션이므로 단일 INSERT는 바로 커밋됩니다.
         cursor.execute(query, (nickname, new_uuid, gender, now, fcm_token))
-        connection.commit()
 
         return {
             "statusCode": 201,
@@ -68,8 +68,6 @@ def lambda_handler(event, context):
         }
 
     except Exception as e:
-        if connection:
-            connection.rollback()
         print(f"An error occurred: {e}")
         return {
             "statusCode": 500, 
@@ -77,8 +75,6 @@ def lambda_handler(event, context):
             "body": json.dumps({"error": str(e)})
         }
     finally:
-        # 사용이 끝나면 커넥션을 풀에 '반납'
-        if connection and connection.is_connected():
-            if cursor:
-                cursor.close()
-            connection.close()
\ No newline at end of file
+        # 커넥션은 다음 요청에서 재사용하므로 커서만 닫습니다.
+        if cursor:
+            cursor.close()
\ No newline at end of file
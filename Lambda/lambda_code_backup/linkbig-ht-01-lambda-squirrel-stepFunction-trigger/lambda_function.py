@@ -1,23 +1,144 @@
 import json
+import re
+import time
+import hashlib
 import boto3
 import os
 from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
 
 # 환경 변수: 생성한 Step Functions State Machine ARN
 STATE_MACHINE_ARN = os.environ.get("STATE_MACHINE_ARN")
 DEFAULT_REGION = os.environ.get("AWS_REGION", "ap-northeast-1")
+# 실행 시작 전 PENDING -> GENERATING 전환에 사용하는 영상 테이블 (PK: lang, SK: SK)
+VIDEO_TABLE = os.environ.get("VIDEO_TABLE")
+
 stepfunctions = boto3.client("stepfunctions", region_name=DEFAULT_REGION)
+dynamodb = boto3.resource("dynamodb", region_name=DEFAULT_REGION)
+table = dynamodb.Table(VIDEO_TABLE) if VIDEO_TABLE else None
 deserializer = TypeDeserializer()
 
+EXECUTION_NAME_PREFIX = "ContentGen-"
+EXECUTION_NAME_MAX_LEN = 80
+
 def deserialize_dynamodb_record(dynamo_image):
     """DynamoDB Stream 포맷을 일반 Python 딕셔너리로 변환합니다."""
     if not dynamo_image:
         return {}
     return {k: deserializer.deserialize(v) for k, v in dynamo_image.items()}
 
+def get_scripts(data):
+    scene = data.get('scene') or {}
+    return scene.get('lang-script'), scene.get('ko-script')
+
+def script_hash(data):
+    """lang-script/ko-script 내용 해시 (같은 스크립트면 같은 값)"""
+    raw = json.dumps(get_scripts(data), ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+def build_execution_name(sk, content_hash, attempt):
+    """
+    SK + 스크립트 해시 + 시도 번호로 실행 이름을 만듭니다.
+    같은 입력이면 항상 같은 이름이므로 Step Functions가 중복 실행을 거부합니다. (ExecutionAlreadyExists)
+    """
+    # Step Functions 실행 이름에 허용되지 않는 문자('#' 등)는 '-'로 대체합니다.
+    safe_sk = re.sub(r'[^A-Za-z0-9_-]', '-', sk)
+    suffix = f"-{content_hash}-a{attempt}"
+    max_sk_len = EXECUTION_NAME_MAX_LEN - len(EXECUTION_NAME_PREFIX) - len(suffix)
+    # SK가 매우 길면 뒤쪽(고유한 부분)만 사용
+    return f"{EXECUTION_NAME_PREFIX}{safe_sk[-max_sk_len:]}{suffix}"
+
+def claim_generation(pk, sk, content_hash):
+    """
+    PENDING -> GENERATING 조건부 전환으로 실행 권한을 얻습니다. 시도 번호를 반환하고, 이미 처리된 경우 None.
+    전환 후 실행 시작 전에 실패했던 경우(같은 해시로 GENERATING, 실행 이름 미기록)에는 같은 시도 번호로 이어서 실행합니다.
+    """
+    try:
+        item = table.update_item(
+            Key={'lang': pk, 'SK': sk},
+            UpdateExpression=(
+                "SET #st = :generating, generation_script_hash = :h, generation_started_at = :now, "
+                "generation_attempt = if_not_exists(generation_attempt, :zero) + :one "
+                "REMOVE generation_execution_name"
+            ),
+            ConditionExpression="#st = :pending",
+            ExpressionAttributeNames={'#st': 'status'},
+            ExpressionAttributeValues={
+                ':generating': 'GENERATING',
+                ':pending': 'PENDING',
+                ':h': content_hash,
+                ':now': int(time.time()),
+                ':zero': 0,
+                ':one': 1,
+            },
+            ReturnValues="ALL_NEW"
+        )['Attributes']
+        return int(item['generation_attempt'])
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+
+    item = table.get_item(Key={'lang': pk, 'SK': sk}, ConsistentRead=True).get('Item') or {}
+    if (item.get('status') == 'GENERATING'
+            and item.get('generation_script_hash') == content_hash
+            and 'generation_execution_name' not in item):
+        print(f"SK: {sk} - 이전 시도에서 실행 시작 전 중단됨. 같은 이름으로 재시도합니다.")
+        return int(item['generation_attempt'])
+    return None
+
+def launch(data):
+    sk = data.get('SK', 'UNKNOWN_SK')
+    if sk == 'UNKNOWN_SK':
+        print("경고: SK가 데이터에서 누락되었습니다. 실행을 건너뜁니다.")
+        return
+
+    pk = data.get('lang', 'JAPANESE')
+    content_hash = script_hash(data)
+
+    # 1. 조건부 상태 전환 (스트림 재시도/중복 레코드는 여기서 걸러짐)
+    attempt = claim_generation(pk, sk, content_hash)
+    if attempt is None:
+        print(f"SK: {sk} - 이미 생성이 시작된 항목이므로 스킵합니다.")
+        return
+
+    # 2. 결정적 실행 이름 생성
+    execution_name = build_execution_name(sk, content_hash, attempt)
+
+    # 3. Step Functions에 전달할 입력 데이터 준비
+    lang_script, ko_script = get_scripts(data)
+    execution_input = {
+        'PK': pk,
+        'SK': sk,
+        'lang_script': lang_script,
+        'ko_script': ko_script,
+    }
+
+    print(f"SK: {sk} - Step Functions 실행 시작.")
+    try:
+        stepfunctions.start_execution(
+            stateMachineArn=STATE_MACHINE_ARN,
+            name=execution_name,
+            input=json.dumps(execution_input)
+        )
+        print(f"Step Functions 실행 요청 완료. 이름: {execution_name}")
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ExecutionAlreadyExists':
+            raise
+        print(f"Step Functions 실행이 이미 존재합니다. 이름: {execution_name}")
+
+    # 4. 실행 이름 기록 (이후 재시도는 claim_generation에서 스킵)
+    table.update_item(
+        Key={'lang': pk, 'SK': sk},
+        UpdateExpression="SET generation_execution_name = :name",
+        ConditionExpression="generation_attempt = :attempt",
+        ExpressionAttributeValues={':name': execution_name, ':attempt': attempt}
+    )
+
 def lambda_handler(event, context):
     print("--- Step Functions 트리거 시작 (DynamoDB Stream 수신) ---")
-    
+    if not table:
+        raise EnvironmentError("VIDEO_TABLE is missing. Cannot guard Step Functions launches.")
+
     for record in event.get('Records', []):
         if record['eventName'] not in ['INSERT', 'MODIFY']:
             continue
@@ -33,51 +154,20 @@ def lambda_handler(event, context):
             print(f"SK: {data.get('SK')} - 상태가 PENDING이 아니므로 스킵합니다.")
             continue
 
-        # Step Functions 실행 시작
-        try:
-            sk = data.get('SK', 'UNKNOWN_SK') 
-            
-            if sk == 'UNKNOWN_SK':
-                print("경고: SK가 데이터에서 누락되었습니다. 실행을 건너뜁니다.")
+        # 스크립트가 바뀌지 않은 MODIFY는 무시 (다른 속성 변경으로 인한 중복 실행 방지)
+        if record['eventName'] == 'MODIFY':
+            old_data = deserialize_dynamodb_record(record['dynamodb'].get('OldImage'))
+            if old_data.get('status') == 'PENDING' and get_scripts(old_data) == get_scripts(data):
+                print(f"SK: {data.get('SK')} - 스크립트 변경이 없는 MODIFY이므로 스킵합니다.")
                 continue
 
-            print(f"SK: {sk} - Step Functions 실행 시작.")
-            
-            # 1. 고유성 확보를 위해 Request ID의 마지막 8자만 사용
-            short_request_id = context.aws_request_id[-8:] 
-            
-            # 2. 실행 이름 생성 및 유효성 검사 
-            # SK에 포함된 '#' 문자를 Step Functions에서 허용되는 '-' 문자로 대체합니다.
-            safe_sk = sk.replace('#', '-')
-            
-            # Step Functions 실행 이름 생성
-            execution_name = f"ContentGen-{safe_sk}-{short_request_id}"
-            
-            
-            # 3. 최대 길이 80자 초과 방지 (추가 안전장치)
-            if len(execution_name) > 80:
-                # SK가 매우 길 경우, 실행 이름을 80자 미만으로 맞추기 위해 SK를 잘라냅니다.
-                # 80 - (len("ContentGen-") + len(short_request_id) + 1) = 60
-                max_sk_len = 80 - (len("ContentGen-") + len(short_request_id) + 1) 
-                trimmed_sk = safe_sk[-max_sk_len:] # SK의 마지막 60자 사용
-                execution_name = f"ContentGen-{trimmed_sk}-{short_request_id}"
-
-            # Step 1: Step Functions에 전달할 입력 데이터 준비
-            execution_input = {
-                'PK': data.get('lang', 'JAPANESE'),
-                'SK': sk,
-                'lang_script': data.get('scene', {}).get('lang-script'),
-                'ko_script': data.get('scene', {}).get('ko-script'),
-            }
-            
-            stepfunctions.start_execution(
-                stateMachineArn=STATE_MACHINE_ARN,
-                name=execution_name, 
-                input=json.dumps(execution_input)
-            )
-            print(f"Step Functions 실행 요청 완료. 이름: {execution_name}")
-
+        # Step Functions 실행 시작
+        try:
+            launch(data)
         except Exception as e:
+            # 스트림 순서를 지키기 위해 이 레코드부터 다시 받습니다. (이미 시작된 항목은 재시도 시 스킵)
+            # 이벤트 소스 매핑에 ReportBatchItemFailures 필요
             print(f"Step Functions 실행 시작 중 오류 발생: {e}")
+            return {'batchItemFailures': [{'itemIdentifier': record['dynamodb']['SequenceNumber']}]}
             
-    return {'statusCode': 200, 'body': json.dumps('Stream records processed.')}
\ No newline at end of file
+    return {'statusCode': 200, 'body': json.dumps('Stream records processed.'), 'batchItemFailures': []}
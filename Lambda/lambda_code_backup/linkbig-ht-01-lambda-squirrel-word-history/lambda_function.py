@@ -1,133 +1,301 @@
 import json
 import os
-from neo4j import GraphDatabase, exceptions
+import base64
+from urllib.parse import unquote
+from neo4j import exceptions
+from neo4j_access import run_read, log_query_metrics
+from word_graph_cache import get_cache_entry, save_cache_entry, make_etag
+from word_graph_snapshot import SNAPSHOT_BUCKET, load_snapshot
 
 # --- 환경 변수 설정 ---
-URI = os.environ.get('NEO4J_URI') 
-USER = os.environ.get('NEO4J_USER')
-PASSWORD = os.environ.get('NEO4J_PASSWORD')
+# 그래프 조회 경로: "neo4j"(기본) 또는 "snapshot"
+# snapshot이면 SQSToNeo4jConsumer가 S3에 써 둔 사용자별 스냅샷으로 응답하고,
+# 스냅샷이 없거나 읽을 수 없을 때(권한/형식 오류 포함)는 Neo4j를 조회합니다.
+GRAPH_SOURCE = os.environ.get('GRAPH_SOURCE', 'neo4j')
+if GRAPH_SOURCE not in ('neo4j', 'snapshot'):
+    print(f"Error: Unknown GRAPH_SOURCE '{GRAPH_SOURCE}'. Using neo4j.")
+    GRAPH_SOURCE = 'neo4j'
+elif GRAPH_SOURCE == 'snapshot' and not SNAPSHOT_BUCKET:
+    print("Error: GRAPH_SOURCE is 'snapshot' but SNAPSHOT_BUCKET is not set. Using neo4j.")
+    GRAPH_SOURCE = 'neo4j'
 
 # 공통 CORS 헤더 정의
 CORS_HEADERS = {
     "Access-Control-Allow-Origin": "*",
     "Access-Control-Allow-Methods": "OPTIONS,GET,POST",
-    "Access-Control-Allow-Headers": "Content-Type,Authorization,uuid",
+    "Access-Control-Allow-Headers": "Content-Type,Authorization,uuid,If-None-Match",
+    "Access-Control-Expose-Headers": "ETag",
     "Content-Type": "application/json"
 }
 
 
-driver = None
+# 페이지 크기 (상위 N개 단어). 장기 사용자도 응답 크기와 렌더링 시간이 일정하게 유지되도록 제한합니다.
+# limit/cursor 없이 호출하면 기존 클라이언트와 같이 전체 단어를 반환하고, cursor만 있으면 DEFAULT_LIMIT로 페이지를 나눕니다.
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 300
+# 확장 엔드포인트에서 한 번에 돌려주는 이웃 단어 수
+MAX_NEIGHBORS = 50
+
+# 그래프 노드 공통 스타일
+WORD_COLOR = "0xFFF0E68C"
+
+
+def word_node(name, study_count=None, last_ts=None):
+    """Word 노드를 만듭니다. 학습 횟수가 있으면 숙련도에 따라 크기를 키웁니다."""
+    node = {"id": f"w_{name}", "label": "Word", "text": name, "size": 20, "color": WORD_COLOR}
+    if study_count is not None:
+        node.update({
+            "size": 20 + min(study_count * 5, 50),
+            "count": study_count,
+            "lastTs": last_ts
+        })
+    return node
+
+
+def base_graph(user_id, target_lang):
+    """User, Language 노드와 STUDYING 관계로 시작하는 (nodes_map, edges_set)을 반환합니다."""
+    user_id_norm = f"u_{user_id}"
+    lang_id_norm = f"lang_{target_lang}"
+    nodes_map = {
+        user_id_norm: {"id": user_id_norm, "label": "User", "text": user_id, "size": 25, "color": "0xFF00BFFF"},
+        lang_id_norm: {"id": lang_id_norm, "label": "Language", "text": target_lang.upper(), "size": 20, "color": "0xFF00FF00"},
+    }
+    edges_set = {(user_id_norm, lang_id_norm, "STUDYING")}  # 엣지 중복 방지용: (source, destination, text) 튜플 저장
+    return nodes_map, edges_set
+
+
+def to_graph_json(nodes_map, edges_set):
+    # Set에 저장된 엣지 튜플을 JSON 형식으로 변환 (중복 없음 보장)
+    final_edges = [{"source": s, "destination": d, "text": t} for s, d, t in edges_set]
+    return {"nodes": list(nodes_map.values()), "edges": final_edges}
+
+
+def encode_cursor(study_count, last_ts, word):
+    raw = json.dumps({"c": study_count, "t": last_ts, "w": word}, ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """nextCursor 문자열을 (count, lastStudied, word)로 되돌립니다. 형식이 틀리면 ValueError."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+        return int(data["c"]), int(data["t"]), str(data["w"])
+    except Exception:
+        raise ValueError("Invalid cursor")
 
-# Neo4j 연결 초기화 함수
-def init_driver():
-    global driver
-    if not driver:
-        if not all([URI, USER, PASSWORD]):
-            raise EnvironmentError("Neo4j connection environment variables are missing.")
-        try:
-            driver = GraphDatabase.driver(URI, auth=(USER, PASSWORD), max_connection_lifetime=300)
-            driver.verify_connectivity() 
-            print("Neo4j driver initialized successfully.")
-        except Exception as e:
-            print(f"Failed to create Neo4j driver: {e}")
-            raise
 
 # 그래프 조회 쿼리 (Contextual Count 및 Graph Data 획득)
-def get_user_learning_graph(tx, user_id, target_lang):
+def get_user_learning_graph(tx, user_id, target_lang, limit=None, since=0, cursor=None):
     """
-    특정 사용자와 언어에 대한 학습망을 조회하고, Scenario를 기반으로 횟수를 계산합니다.
+    특정 사용자와 언어에 대한 학습망 중 상위 N개 단어(핵심)를 조회합니다. limit이 None이면 전체 단어를 반환합니다.
+    횟수는 미리 집계된 UserWordStat 값을 사용하고, 학습 횟수 -> 최근 학습 -> 단어 순으로 정렬합니다.
+    핵심 단어끼리의 RELATED_TO만 포함하고, 나머지 이웃은 neighborCount로 알려 확장 엔드포인트에서 가져오게 합니다.
     """
-    
-    word_metrics_query = f"""
-        MATCH (u:User {{id: $userId}})
-              -[:STUDYING]-> (l:Language {{code: $targetLang}}) 
-              <-[:BELONGS_TO_LANGUAGE]- (w_main:Word)
-              
-        // w_main이 해당 언어 컨텍스트에서 연결된 모든 시나리오(s_all)를 찾습니다.
-        MATCH (s_all:Scenario {{language: $targetLang}})
-              WHERE (s_all)-[:FOCUS_ON]->(w_main) OR 
-                    (s_all)-[:FOCUS_ON]->()-[:RELATED_TO]->(w_main)
-        
-        MATCH (u)-[:PERFORMED]->(s_all) 
-        
-        // u와 l 변수를 Contextual 계산 후에도 유지하도록 WITH 절에 명시
-        WITH u, l, w_main, 
-             COUNT(s_all) AS ContextualStudyCount, 
-             MAX(s_all.createdAtTs) AS ContextualLastStudied
 
-        // Optional: Get related words for the graph visualization
-        // (r_related 관계의 존재 여부만 확인)
-        OPTIONAL MATCH (w_main)-[r_related:RELATED_TO {{targetLang: $targetLang}}]-(w_rel:Word)
+    # (user, word, lang) 지표는 SQSToNeo4jConsumer가 적재 시점에 UserWordStat으로 미리 계산해 둡니다.
+    # 시나리오 전체를 OR 패턴으로 훑지 않고 사용자 노드에서 바로 따라가는 인덱스 조회입니다.
+    word_metrics_query = """
+        MATCH (u:User {id: $userId})-[:HAS_WORD_STAT]->(st:UserWordStat {lang: $targetLang})
+              -[:FOR_WORD]->(w_main:Word)
+        WHERE st.lastStudied >= $since
+          AND ($cursorCount IS NULL
+               OR st.count < $cursorCount
+               OR (st.count = $cursorCount AND st.lastStudied < $cursorTs)
+               OR (st.count = $cursorCount AND st.lastStudied = $cursorTs AND st.word > $cursorWord))
+
+        // 상위 N개 핵심 단어 선택 (keyset 페이지네이션, limit이 없으면 전체)
+        WITH w_main, st
+        ORDER BY st.count DESC, st.lastStudied DESC, st.word ASC
+        """ + ("LIMIT $limit" if limit is not None else "") + """
+        WITH collect({word: w_main, count: st.count, lastStudied: st.lastStudied}) AS core
+        WITH core, [c IN core | c.word] AS core_words
+        UNWIND core AS c
+        WITH c.word AS w_main, c.count AS ContextualStudyCount, c.lastStudied AS ContextualLastStudied, core_words
 
-        // 최종 RETURN: 모든 노드와 계산된 메트릭을 반환합니다.
-        RETURN u, l, w_main, w_rel, ContextualStudyCount, ContextualLastStudied, r_related
+        // 이웃 단어 수와, 그 중 핵심 단어에 속하는 것만 반환
+        OPTIONAL MATCH (w_main)-[:RELATED_TO {targetLang: $targetLang}]-(w_rel:Word)
+        WITH w_main, ContextualStudyCount, ContextualLastStudied, core_words, collect(DISTINCT w_rel) AS neighbors
+
+        RETURN w_main, ContextualStudyCount, ContextualLastStudied,
+               size(neighbors) AS NeighborCount,
+               [n IN neighbors WHERE n IN core_words | n.name] AS CoreNeighbors
     """
-    
-    result_stream = tx.run(word_metrics_query, userId=user_id, targetLang=target_lang)
+
+    cursor_count, cursor_ts, cursor_word = cursor if cursor else (None, None, None)
+    records = list(tx.run(
+        word_metrics_query,
+        userId=user_id, targetLang=target_lang, limit=limit, since=since,
+        cursorCount=cursor_count, cursorTs=cursor_ts, cursorWord=cursor_word
+    ))
 
     # --- 결과 처리 및 JSON 변환 로직 ---
-    nodes_map = {}
-    edges_set = set() # 엣지 중복 방지용: (source, destination, text) 튜플 저장
-    
     # 1. User, Language 노드 추가
-    user_id_norm = f"u_{user_id}"
+    nodes_map, edges_set = base_graph(user_id, target_lang)
     lang_id_norm = f"lang_{target_lang}"
-    
-    nodes_map[user_id_norm] = {"id": user_id_norm, "label": "User", "text": user_id, "size": 25, "color": "0xFF00BFFF"}
-    nodes_map[lang_id_norm] = {"id": lang_id_norm, "label": "Language", "text": target_lang.upper(), "size": 20, "color": "0xFF00FF00"}
-    
-    # STUDYING 관계 추가
-    edges_set.add((user_id_norm, lang_id_norm, "STUDYING"))
-
-    # 2. 결과 레코드 순회하며 Word 노드 및 관계 추가
-    for record in result_stream:
-        w_main = record['w_main']
-        w_rel = record.get('w_rel')
-        study_count = record['ContextualStudyCount']
-        last_ts = record['ContextualLastStudied']
-        
-        w_main_id_norm = f"w_{w_main['name']}"
-
-        # Word 노드 추가/업데이트 (w_main: 숙련도 반영)
-        if w_main_id_norm not in nodes_map or nodes_map[w_main_id_norm].get('count', 0) < study_count:
-            nodes_map[w_main_id_norm] = {
-                "id": w_main_id_norm,
-                "label": "Word",
-                "text": w_main['name'],
-                "size": 20 + min(study_count * 5, 50), 
-                "color": "0xFFF0E68C",
-                "count": study_count,
-                "lastTs": last_ts
-            }
-        
+
+    # 2. 핵심 단어를 순위대로 정렬하며 Word 노드 및 관계 추가
+    records.sort(key=lambda r: (-r['ContextualStudyCount'], -r['ContextualLastStudied'], r['w_main']['name']))
+    for record in records:
+        name = record['w_main']['name']
+        node = word_node(name, record['ContextualStudyCount'], record['ContextualLastStudied'])
+        node["neighborCount"] = record['NeighborCount']
+        nodes_map[node["id"]] = node
+
         # BELONGS_TO_LANGUAGE 엣지 추가 (w_main -> lang)
-        edges_set.add((w_main_id_norm, lang_id_norm, "BELONGS_TO_LANGUAGE"))
-
-        # RELATED_TO 엣지 및 w_rel 노드 추가 (w_rel이 존재할 경우)
-        if w_rel:
-            w_rel_id_norm = f"w_{w_rel['name']}"
-            
-            # w_rel 노드가 nodes_map에 없으면 기본값으로 추가
-            if w_rel_id_norm not in nodes_map:
-                # Note: w_rel은 현재 레코드에서는 숙련도가 계산되지 않았으므로 기본 크기 사용
-                nodes_map[w_rel_id_norm] = {"id": w_rel_id_norm, "label": "Word", "text": w_rel['name'], "size": 20, "color": "0xFFF0E68C"}
-            
-            # RELATED_TO 엣지 추가 (단방향 중복 방지)
-            related_edge_key = (w_main_id_norm, w_rel_id_norm, "RELATED_TO")
-
-            # 엣지 중복 방지: RELATED_TO 엣지 추가
-            # 단방향으로 저장되었으므로, 이 순서대로만 set에 추가하여 중복을 막음.
-            edges_set.add(related_edge_key)
-                 
-            # BELONGS_TO_LANGUAGE 엣지 추가 (w_rel -> lang)
-            edges_set.add((w_rel_id_norm, lang_id_norm, "BELONGS_TO_LANGUAGE"))
-
-
-    # 3. 최종 JSON 구조로 변환
-    # Set에 저장된 엣지 튜플을 JSON 형식으로 변환 (중복 없음 보장)
-    final_edges = [{"source": s, "destination": d, "text": t} for s, d, t in edges_set]
+        edges_set.add((node["id"], lang_id_norm, "BELONGS_TO_LANGUAGE"))
 
-    return {"nodes": list(nodes_map.values()), "edges": final_edges}
+        # RELATED_TO 엣지 추가 (양방향으로 두 번 나오므로 이름 순으로 한 번만 저장)
+        for rel_name in record['CoreNeighbors']:
+            source, destination = sorted([name, rel_name])
+            edges_set.add((f"w_{source}", f"w_{destination}", "RELATED_TO"))
+
+    # 3. 최종 JSON 구조로 변환 (페이지가 가득 찼으면 다음 커서 제공)
+    graph = to_graph_json(nodes_map, edges_set)
+    graph["nextCursor"] = None
+    if limit is not None and len(records) == limit:
+        last = records[-1]
+        graph["nextCursor"] = encode_cursor(
+            last['ContextualStudyCount'], last['ContextualLastStudied'], last['w_main']['name']
+        )
+    return graph
+
+
+def get_word_neighborhood(tx, user_id, target_lang, word_name, limit=MAX_NEIGHBORS):
+    """
+    확장 엔드포인트: 사용자가 학습한 단어 하나의 RELATED_TO 이웃을 조회합니다.
+    이웃 중 사용자가 학습한 단어는 UserWordStat 값으로 크기를 반영합니다. 학습하지 않은 단어면 None.
+    """
+    neighborhood_query = """
+        MATCH (st_main:UserWordStat {userId: $userId, word: $word, lang: $targetLang})-[:FOR_WORD]->(w_main:Word)
+        OPTIONAL MATCH (w_main)-[:RELATED_TO {targetLang: $targetLang}]-(w_rel:Word)
+        WITH st_main, w_main, w_rel
+        OPTIONAL MATCH (st_rel:UserWordStat {userId: $userId, word: w_rel.name, lang: $targetLang})
+        WITH st_main, w_main, w_rel, st_rel
+        ORDER BY coalesce(st_rel.count, 0) DESC, w_rel.name ASC
+        WITH st_main, w_main,
+             collect(DISTINCT {word: w_rel, count: st_rel.count, lastStudied: st_rel.lastStudied})[..$limit] AS neighbors
+        RETURN w_main, st_main.count AS ContextualStudyCount, st_main.lastStudied AS ContextualLastStudied, neighbors
+    """
+    record = tx.run(
+        neighborhood_query, userId=user_id, targetLang=target_lang, word=word_name, limit=limit
+    ).single()
+    if not record:
+        return None
+
+    nodes_map, edges_set = base_graph(user_id, target_lang)
+    lang_id_norm = f"lang_{target_lang}"
+
+    main = word_node(word_name, record['ContextualStudyCount'], record['ContextualLastStudied'])
+    nodes_map[main["id"]] = main
+    edges_set.add((main["id"], lang_id_norm, "BELONGS_TO_LANGUAGE"))
+
+    for neighbor in record['neighbors']:
+        if neighbor['word'] is None:
+            continue
+        rel_name = neighbor['word']['name']
+        node = word_node(rel_name, neighbor['count'], neighbor['lastStudied'])
+        nodes_map[node["id"]] = node
+        edges_set.add((node["id"], lang_id_norm, "BELONGS_TO_LANGUAGE"))
+        source, destination = sorted([word_name, rel_name])
+        edges_set.add((f"w_{source}", f"w_{destination}", "RELATED_TO"))
+
+    return to_graph_json(nodes_map, edges_set)
+
+
+# --- 스냅샷 모드 (Neo4j 없이 응답) ---
+def snapshot_adjacency(snapshot):
+    adjacency = [[] for _ in snapshot["words"]]
+    for i, j in snapshot["edges"]:
+        adjacency[i].append(j)
+        adjacency[j].append(i)
+    return adjacency
+
+
+def graph_from_snapshot(snapshot, user_id, target_lang, limit=None, since=0, cursor=None):
+    """get_user_learning_graph와 같은 순위/페이지 규칙으로 스냅샷에서 핵심 단어 그래프를 만듭니다."""
+    words, counts, last_studied = snapshot["words"], snapshot["counts"], snapshot["lastStudied"]
+    adjacency = snapshot_adjacency(snapshot)
+
+    ranked = sorted(
+        (i for i in range(len(words)) if counts[i] > 0 and last_studied[i] >= since),
+        key=lambda i: (-counts[i], -last_studied[i], words[i])
+    )
+    if cursor:
+        cursor_key = (-cursor[0], -cursor[1], cursor[2])
+        ranked = [i for i in ranked if (-counts[i], -last_studied[i], words[i]) > cursor_key]
+    core = ranked[:limit]
+    core_set = set(core)
+
+    nodes_map, edges_set = base_graph(user_id, target_lang)
+    lang_id_norm = f"lang_{target_lang}"
+    for i in core:
+        node = word_node(words[i], counts[i], last_studied[i])
+        node["neighborCount"] = len(adjacency[i])
+        nodes_map[node["id"]] = node
+        edges_set.add((node["id"], lang_id_norm, "BELONGS_TO_LANGUAGE"))
+        for j in adjacency[i]:
+            if j in core_set:
+                source, destination = sorted([words[i], words[j]])
+                edges_set.add((f"w_{source}", f"w_{destination}", "RELATED_TO"))
+
+    graph = to_graph_json(nodes_map, edges_set)
+    graph["nextCursor"] = None
+    if limit is not None and len(core) == limit:
+        last = core[-1]
+        graph["nextCursor"] = encode_cursor(counts[last], last_studied[last], words[last])
+    return graph
+
+
+def neighborhood_from_snapshot(snapshot, user_id, target_lang, word_name, limit=MAX_NEIGHBORS):
+    """get_word_neighborhood와 같은 형식으로 스냅샷에서 단어 하나의 이웃을 만듭니다."""
+    words, counts, last_studied = snapshot["words"], snapshot["counts"], snapshot["lastStudied"]
+    if word_name not in words:
+        return None
+    main_index = words.index(word_name)
+    if counts[main_index] <= 0:
+        return None
+
+    nodes_map, edges_set = base_graph(user_id, target_lang)
+    lang_id_norm = f"lang_{target_lang}"
+    main = word_node(word_name, counts[main_index], last_studied[main_index])
+    nodes_map[main["id"]] = main
+    edges_set.add((main["id"], lang_id_norm, "BELONGS_TO_LANGUAGE"))
+
+    neighbors = sorted(snapshot_adjacency(snapshot)[main_index], key=lambda j: (-counts[j], words[j]))[:limit]
+    for j in neighbors:
+        if counts[j] > 0:
+            node = word_node(words[j], counts[j], last_studied[j])
+        else:
+            node = word_node(words[j])
+        nodes_map[node["id"]] = node
+        edges_set.add((node["id"], lang_id_norm, "BELONGS_TO_LANGUAGE"))
+        source, destination = sorted([word_name, words[j]])
+        edges_set.add((f"w_{source}", f"w_{destination}", "RELATED_TO"))
+
+    return to_graph_json(nodes_map, edges_set)
+
+
+def parse_page_params(query_params):
+    """
+    limit/since/cursor 쿼리 파라미터를 검증합니다. 잘못된 값이면 ValueError.
+    limit과 cursor가 모두 없으면 페이지를 나누지 않습니다. (limit=None)
+    """
+    since = int(query_params.get("since") or 0)
+    cursor = decode_cursor(query_params["cursor"]) if query_params.get("cursor") else None
+    if not query_params.get("limit") and cursor is None:
+        return None, since, None
+    limit = int(query_params.get("limit") or DEFAULT_LIMIT)
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+    return limit, since, cursor
+
+def graph_response(event, body, etag):
+    """ETag를 붙여 응답합니다. 클라이언트가 같은 ETag를 갖고 있으면 본문 없이 304를 반환합니다."""
+    headers = {**CORS_HEADERS, "ETag": etag, "Cache-Control": "private, no-cache"}
+    request_headers = {k.lower(): v for k, v in (event.get("headers") or {}).items()}
+    if request_headers.get("if-none-match") == etag:
+        return {"statusCode": 304, "body": "", "headers": headers}
+    return {"statusCode": 200, "body": body, "headers": headers}
 
 # --- Lambda 핸들러 ---
 def lambda_handler(event, context):
@@ -146,18 +314,61 @@ def lambda_handler(event, context):
     if targetLanguage == "jp":
         targetLanguage = "ja"
 
+    path_params = event.get("pathParameters") or {}
+    query_params = event.get("queryStringParameters") or {}
     try:
-        init_driver()
-        
-        with driver.session() as session:
-            # 3️. 그래프 데이터 조회 및 JSON 구조로 변환
-            graph_data = session.execute_read(get_user_learning_graph, user_id, targetLanguage)
+        limit, since, cursor = parse_page_params(query_params)
+    except ValueError as e:
+        return {"statusCode": 400, "body": json.dumps({"error": str(e)}), "headers": CORS_HEADERS}
+
+    try:
+        # 스냅샷 모드: S3 스냅샷 한 번 읽기로 응답 (없으면 아래 Neo4j 경로로 진행)
+        word_name = unquote(path_params["name"]) if path_params.get("name") else None
+        if GRAPH_SOURCE == "snapshot":
+            snapshot = load_snapshot(user_id, targetLanguage)
+            if snapshot:
+                if word_name:
+                    graph_data = neighborhood_from_snapshot(
+                        snapshot, user_id, targetLanguage, word_name, min(limit or MAX_NEIGHBORS, MAX_NEIGHBORS)
+                    )
+                    if graph_data is None:
+                        return {"statusCode": 404, "body": json.dumps({"error": "Word not found"}), "headers": CORS_HEADERS}
+                else:
+                    graph_data = graph_from_snapshot(snapshot, user_id, targetLanguage, limit, since, cursor)
+                body = json.dumps(graph_data, ensure_ascii=False)
+                return graph_response(event, body, make_etag(body))
+            print(f"Snapshot not found for {user_id}/{targetLanguage}, falling back to Neo4j")
 
-        return {
-            "statusCode": 200,
-            "body": json.dumps(graph_data, ensure_ascii=False),
-            "headers": CORS_HEADERS,
-        }
+        # 확장 엔드포인트: /word-mode/history/{targetLanguage}/word/{name}
+        if word_name:
+            graph_data = run_read(
+                "word_neighborhood", get_word_neighborhood, user_id, targetLanguage, word_name, min(limit or MAX_NEIGHBORS, MAX_NEIGHBORS)
+            )
+            if graph_data is None:
+                return {"statusCode": 404, "body": json.dumps({"error": "Word not found"}), "headers": CORS_HEADERS}
+            body = json.dumps(graph_data, ensure_ascii=False)
+            return graph_response(event, body, make_etag(body))
+
+        # 2️. 응답 캐시 확인 (파라미터 없는 기본 조회만 캐시, 적재 이후 변화가 없으면 Neo4j를 조회하지 않음)
+        cacheable = limit is None and not since
+        version = 0
+        if cacheable:
+            version, cached_body, cached_etag = get_cache_entry(user_id, targetLanguage)
+            if cached_body is not None:
+                print(f"Graph cache hit: {user_id}/{targetLanguage} v{version}")
+                return graph_response(event, cached_body, cached_etag)
+
+        # 3️. 그래프 데이터 조회 및 JSON 구조로 변환 (드라이버는 첫 조회 때 생성)
+        graph_data = run_read(
+            "user_learning_graph", get_user_learning_graph, user_id, targetLanguage, limit, since, cursor
+        )
+
+        # 4️. 응답 캐시 저장 (조회 중 새 적재가 있었으면 저장하지 않음)
+        body = json.dumps(graph_data, ensure_ascii=False)
+        etag = make_etag(body)
+        if cacheable:
+            save_cache_entry(user_id, targetLanguage, version, body, etag)
+        return graph_response(event, body, etag)
 
     except exceptions.ServiceUnavailable as e:
         print(f"Neo4j Service Unavailable: {e}")
@@ -165,4 +376,7 @@ def lambda_handler(event, context):
     
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
-        return {"statusCode": 500, "body": json.dumps({"error": "Internal Server Error", "detail": str(e)}), "headers": CORS_HEADERS}
\ No newline at end of file
+        return {"statusCode": 500, "body": json.dumps({"error": "Internal Server Error", "detail": str(e)}), "headers": CORS_HEADERS}
+
+    finally:
+        log_query_metrics()
\ No newline at end of file
@@ -0,0 +1,56 @@
+import argparse
+import csv
+import boto3
+from label_dictionary import LABELS_KO, label_table
+
+# LABELS_KO 사전을 오프라인으로 늘리는 스크립트입니다. (배포 패키지에서 실행되지 않음)
+# Rekognition 레이블 목록 CSV(AWS 문서의 "Rekognition labels" 다운로드, 첫 열이 레이블 이름)와
+# 운영 중 학습된 LABEL_TABLE_NAME 테이블을 합쳐, 사전에 없는 레이블을 LABELS_KO 형식으로 출력합니다.
+# 테이블에 있는 번역을 우선 사용하고, 없으면 Translate로 번역합니다. 검수 후 label_dictionary.py에 붙여 넣습니다.
+#
+# 사용법:
+#   LABEL_TABLE_NAME=... python generate_label_dictionary.py --labels-csv rekognition_labels.csv > new_labels.txt
+#   LABEL_TABLE_NAME=... python generate_label_dictionary.py               # 학습된 레이블만 출력
+
+
+def load_learned_labels():
+    if not label_table:
+        return {}
+    learned = {}
+    scan_kwargs = {}
+    while True:
+        page = label_table.scan(**scan_kwargs)
+        for item in page.get("Items", []):
+            learned[item["labelEn"]] = item["labelKo"]
+        if "LastEvaluatedKey" not in page:
+            return learned
+        scan_kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+
+
+def load_label_names(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = csv.reader(f)
+        next(rows, None)  # 헤더
+        return {row[0].strip() for row in rows if row and row[0].strip()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LABELS_KO 사전 항목 생성")
+    parser.add_argument("--labels-csv", help="Rekognition 레이블 목록 CSV 경로")
+    args = parser.parse_args()
+
+    learned = load_learned_labels()
+    names = set(learned)
+    if args.labels_csv:
+        names |= load_label_names(args.labels_csv)
+
+    translate_client = boto3.client("translate")
+    for label_en in sorted(names - set(LABELS_KO)):
+        label_ko = learned.get(label_en) or translate_client.translate_text(
+            Text=label_en, SourceLanguageCode="en", TargetLanguageCode="ko"
+        )["TranslatedText"]
+        print(f'    "{label_en}": "{label_ko}",')
+
+
+if __name__ == "__main__":
+    main()
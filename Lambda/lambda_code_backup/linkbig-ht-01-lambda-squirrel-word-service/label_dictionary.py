@@ -0,0 +1,279 @@
+import os
+import boto3
+from botocore.exceptions import ClientError
+
+# Rekognition 레이블(영문) -> 한국어 사전
+# 자주 인식되는 사물 레이블을 미리 정리해 두어 Translate 호출 없이 바로 사용합니다.
+# 번역기 결과가 어색한 레이블(예: Cup -> 컵, Cell Phone -> 휴대폰)은 학습용 단어로 다듬어 두었습니다.
+LABELS_KO = {
+    "Accessories": "액세서리",
+    "Airplane": "비행기",
+    "Alarm Clock": "알람 시계",
+    "Animal": "동물",
+    "Apple": "사과",
+    "Apron": "앞치마",
+    "Armchair": "안락의자",
+    "Avocado": "아보카도",
+    "Baby": "아기",
+    "Backpack": "배낭",
+    "Bag": "가방",
+    "Ball": "공",
+    "Balloon": "풍선",
+    "Banana": "바나나",
+    "Basket": "바구니",
+    "Bathtub": "욕조",
+    "Bear": "곰",
+    "Bed": "침대",
+    "Beer": "맥주",
+    "Bench": "벤치",
+    "Beverage": "음료",
+    "Bicycle": "자전거",
+    "Bird": "새",
+    "Blanket": "담요",
+    "Book": "책",
+    "Bookcase": "책장",
+    "Boot": "부츠",
+    "Bottle": "병",
+    "Bowl": "그릇",
+    "Box": "상자",
+    "Bread": "빵",
+    "Briefcase": "서류 가방",
+    "Broccoli": "브로콜리",
+    "Bucket": "양동이",
+    "Building": "건물",
+    "Burger": "햄버거",
+    "Bus": "버스",
+    "Butterfly": "나비",
+    "Cabinet": "수납장",
+    "Cake": "케이크",
+    "Calculator": "계산기",
+    "Calendar": "달력",
+    "Camera": "카메라",
+    "Candle": "양초",
+    "Candy": "사탕",
+    "Cap": "모자",
+    "Car": "자동차",
+    "Carpet": "카펫",
+    "Carrot": "당근",
+    "Cat": "고양이",
+    "Cell Phone": "휴대폰",
+    "Chair": "의자",
+    "Cheese": "치즈",
+    "Chocolate": "초콜릿",
+    "Chopsticks": "젓가락",
+    "Clock": "시계",
+    "Clothing": "옷",
+    "Coat": "코트",
+    "Coffee": "커피",
+    "Coffee Cup": "커피잔",
+    "Coin": "동전",
+    "Computer": "컴퓨터",
+    "Computer Keyboard": "키보드",
+    "Computer Mouse": "마우스",
+    "Cookie": "쿠키",
+    "Couch": "소파",
+    "Cow": "소",
+    "Cup": "컵",
+    "Curtain": "커튼",
+    "Cushion": "쿠션",
+    "Desk": "책상",
+    "Dog": "개",
+    "Doll": "인형",
+    "Door": "문",
+    "Dress": "드레스",
+    "Drink": "음료",
+    "Duck": "오리",
+    "Earring": "귀걸이",
+    "Egg": "달걀",
+    "Electronics": "전자 기기",
+    "Envelope": "봉투",
+    "Eraser": "지우개",
+    "Eyeglasses": "안경",
+    "Fan": "선풍기",
+    "Fish": "물고기",
+    "Flag": "깃발",
+    "Flower": "꽃",
+    "Food": "음식",
+    "Footwear": "신발",
+    "Fork": "포크",
+    "Fruit": "과일",
+    "Furniture": "가구",
+    "Glass": "유리잔",
+    "Glasses": "안경",
+    "Glove": "장갑",
+    "Grapes": "포도",
+    "Guitar": "기타",
+    "Hair Dryer": "드라이기",
+    "Hamburger": "햄버거",
+    "Handbag": "핸드백",
+    "Hat": "모자",
+    "Headphones": "헤드폰",
+    "Helmet": "헬멧",
+    "Horse": "말",
+    "House": "집",
+    "Ice Cream": "아이스크림",
+    "Jacket": "재킷",
+    "Jeans": "청바지",
+    "Jewelry": "장신구",
+    "Juice": "주스",
+    "Kettle": "주전자",
+    "Key": "열쇠",
+    "Keyboard": "키보드",
+    "Kitchen": "부엌",
+    "Knife": "칼",
+    "Lamp": "램프",
+    "Laptop": "노트북",
+    "Leaf": "잎",
+    "Lemon": "레몬",
+    "Light Bulb": "전구",
+    "Lipstick": "립스틱",
+    "Magazine": "잡지",
+    "Map": "지도",
+    "Mask": "마스크",
+    "Meal": "식사",
+    "Microphone": "마이크",
+    "Microwave": "전자레인지",
+    "Milk": "우유",
+    "Mirror": "거울",
+    "Mobile Phone": "휴대폰",
+    "Money": "돈",
+    "Monitor": "모니터",
+    "Motorcycle": "오토바이",
+    "Mouse": "마우스",
+    "Mug": "머그컵",
+    "Necklace": "목걸이",
+    "Newspaper": "신문",
+    "Noodle": "국수",
+    "Notebook": "공책",
+    "Orange": "오렌지",
+    "Oven": "오븐",
+    "Painting": "그림",
+    "Pants": "바지",
+    "Paper": "종이",
+    "Pen": "펜",
+    "Pencil": "연필",
+    "Person": "사람",
+    "Phone": "전화기",
+    "Piano": "피아노",
+    "Picture Frame": "액자",
+    "Pillow": "베개",
+    "Pizza": "피자",
+    "Plant": "식물",
+    "Plastic Bag": "비닐봉지",
+    "Plate": "접시",
+    "Pot": "냄비",
+    "Potted Plant": "화분",
+    "Purse": "지갑",
+    "Rabbit": "토끼",
+    "Refrigerator": "냉장고",
+    "Remote Control": "리모컨",
+    "Rice": "밥",
+    "Ring": "반지",
+    "Robot": "로봇",
+    "Rug": "깔개",
+    "Salad": "샐러드",
+    "Sandwich": "샌드위치",
+    "Scarf": "목도리",
+    "Scissors": "가위",
+    "Screen": "화면",
+    "Shelf": "선반",
+    "Shirt": "셔츠",
+    "Shoe": "신발",
+    "Shorts": "반바지",
+    "Sink": "싱크대",
+    "Skirt": "치마",
+    "Sneaker": "운동화",
+    "Soap": "비누",
+    "Sock": "양말",
+    "Sofa": "소파",
+    "Soup": "수프",
+    "Speaker": "스피커",
+    "Spoon": "숟가락",
+    "Stapler": "스테이플러",
+    "Strawberry": "딸기",
+    "Suitcase": "여행 가방",
+    "Sunglasses": "선글라스",
+    "Sweater": "스웨터",
+    "Table": "탁자",
+    "Tablet Computer": "태블릿",
+    "Tea": "차",
+    "Teddy Bear": "곰 인형",
+    "Telephone": "전화기",
+    "Television": "텔레비전",
+    "Tie": "넥타이",
+    "Tissue": "휴지",
+    "Toilet": "변기",
+    "Tomato": "토마토",
+    "Toothbrush": "칫솔",
+    "Towel": "수건",
+    "Toy": "장난감",
+    "Train": "기차",
+    "Tree": "나무",
+    "Truck": "트럭",
+    "T-Shirt": "티셔츠",
+    "Umbrella": "우산",
+    "Vase": "꽃병",
+    "Vegetable": "채소",
+    "Wallet": "지갑",
+    "Washing Machine": "세탁기",
+    "Watch": "손목시계",
+    "Water": "물",
+    "Water Bottle": "물병",
+    "Wheel": "바퀴",
+    "Window": "창문",
+    "Wine": "와인",
+    "Wine Glass": "와인잔",
+    "Wristwatch": "손목시계",
+}
+
+# 사전에 없는 레이블을 학습해 두는 DynamoDB 테이블 (PK: labelEn)
+LABEL_TABLE_NAME = os.environ.get("LABEL_TABLE_NAME")
+
+dynamodb = boto3.resource("dynamodb")
+translate_client = boto3.client("translate")
+label_table = dynamodb.Table(LABEL_TABLE_NAME) if LABEL_TABLE_NAME else None
+
+# 컨테이너 재사용 동안 조회한 레이블을 메모리에 보관
+_learned_labels = {}
+
+
+def translate_label(label_en):
+    """
+    Rekognition 레이블을 한국어로 변환합니다.
+    내장 사전 -> 메모리 캐시 -> DynamoDB 테이블 순으로 찾고,
+    처음 보는 레이블만 Translate를 호출한 뒤 테이블에 저장합니다.
+    반환값: (한국어 레이블, 조회 출처)
+    """
+    if label_en in LABELS_KO:
+        return LABELS_KO[label_en], "dictionary"
+    if label_en in _learned_labels:
+        return _learned_labels[label_en], "memory"
+
+    if label_table:
+        try:
+            item = label_table.get_item(Key={"labelEn": label_en}).get("Item")
+            if item:
+                _learned_labels[label_en] = item["labelKo"]
+                return item["labelKo"], "table"
+        except ClientError as e:
+            print(f"[Label Dictionary] 테이블 조회 실패: {e}")
+
+    translated = translate_client.translate_text(
+        Text=label_en,
+        SourceLanguageCode="en",
+        TargetLanguageCode="ko"
+    )["TranslatedText"]
+    _learned_labels[label_en] = translated
+
+    if label_table:
+        try:
+            label_table.put_item(
+                Item={"labelEn": label_en, "labelKo": translated, "source": "translate"},
+                ConditionExpression="attribute_not_exists(labelEn)"
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                print(f"[Label Dictionary] 테이블 저장 실패: {e}")
+
+    return translated, "translate"
+
@@ -1,37 +1,193 @@
 import json
 import boto3
+from boto3.dynamodb.conditions import Key
 import base64
 from urllib.parse import unquote_plus
 from decimal import Decimal
+from io import BytesIO
 import os
+import re
+from botocore.exceptions import ClientError
+from label_dictionary import translate_label
+
+# 축소본 생성용 Pillow는 Lambda 기본 런타임에 없어 레이어로 배포합니다. (예: Klayers Pillow 레이어)
+# 레이어가 없으면 축소 없이 원본을 S3Object로 그대로 넘깁니다.
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
 
 # AWS 클라이언트 초기화
 s3_client = boto3.client("s3")
 rekognition_client = boto3.client("rekognition")
-translate_client = boto3.client("translate")
 dynamodb = boto3.resource("dynamodb")
 
 TABLE_NAME = os.environ.get("TABLE_NAME")
 
-def lambda_handler(event, context):
+# 인식 결과를 WebSocket으로 바로 전달하기 위한 설정 (사용자별 연결은 uuid 인덱스로 조회)
+CONNECTIONS_TABLE_NAME = os.environ.get("CONNECTIONS_TABLE_NAME")
+CONNECTIONS_USER_INDEX = os.environ.get("CONNECTIONS_USER_INDEX", "uuid-index")
+WEBSOCKET_ENDPOINT_URL = os.environ.get("WEBSOCKET_ENDPOINT_URL")
+
+connections_table = dynamodb.Table(CONNECTIONS_TABLE_NAME) if CONNECTIONS_TABLE_NAME else None
+apigw_management = (
+    boto3.client("apigatewaymanagementapi", endpoint_url=WEBSOCKET_ENDPOINT_URL)
+    if WEBSOCKET_ENDPOINT_URL else None
+)
+
+# confirm 전까지 붙어 있는 태그. 수명 주기 규칙이 이 태그가 남은 업로드를 정리합니다.
+PENDING_UPLOAD_TAG = {"Key": "upload-status", "Value": "pending"}
+# confirm이 확정한 이미지 태그. temp-uploads에서 user/{id}/uploads/로 복사될 때도 이 태그로 생성되므로 다시 인식하지 않습니다.
+CONFIRMED_STATUS = "confirmed"
+
+# Rekognition이 S3Object로 직접 읽을 수 있는 원본 조건
+DIRECT_EXTENSIONS = {"jpg", "jpeg", "png"}
+MAX_DIRECT_BYTES = int(os.environ.get("MAX_DIRECT_BYTES", str(5 * 1024 * 1024)))
+
+# 조건을 벗어나는 원본은 축소한 JPEG를 원본 옆에 캐시해 재사용합니다.
+RESIZED_SUFFIX = ".rekognition.jpg"
+RESIZED_MAX_EDGE = 1024
+RESIZED_JPEG_QUALITY = 85
+
+
+# 인식 대상 사진 업로드 경로. user/{id}/ 아래의 다른 파일(단문 학습 음성 등)과 축소본 캐시는 건너뜁니다.
+# temp-uploads/는 이전 버전 앱의 업로드 경로입니다.
+UPLOAD_KEY_PATTERN = re.compile(
+    r"^(?:user/[^/]+/uploads|temp-uploads)/[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\.[a-z0-9]+$",
+    re.IGNORECASE,
+)
+
+
+def is_upload_key(file_key):
+    return UPLOAD_KEY_PATTERN.match(file_key) is not None
+
+
+def get_resized_key(file_key):
+    return os.path.splitext(file_key)[0] + RESIZED_SUFFIX
+
+
+def downscale_image(img_bytes):
+    """EXIF 방향을 반영하고 긴 변을 RESIZED_MAX_EDGE로 줄인 JPEG 바이트를 반환합니다."""
+    with Image.open(BytesIO(img_bytes)) as img:
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((RESIZED_MAX_EDGE, RESIZED_MAX_EDGE))
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        output = BytesIO()
+        img.save(output, format="JPEG", quality=RESIZED_JPEG_QUALITY, optimize=True)
+        return output.getvalue()
+
+
+def prepare_image(bucket_name, file_key, size_bytes):
+    """
+    detect_labels에 넘길 Image 파라미터를 준비합니다.
+    - 지원 포맷이고 크기 제한 이내면 S3Object로 직접 참조 (Lambda에서 다운로드하지 않음)
+    - 그 외에는 축소본을 캐시에서 찾거나 새로 만들어 사용
+    """
+    ext = file_key.rsplit(".", 1)[-1].lower()
+    if ext in DIRECT_EXTENSIONS and size_bytes is not None and size_bytes <= MAX_DIRECT_BYTES:
+        return {"S3Object": {"Bucket": bucket_name, "Name": file_key}}
+
+    if Image is None:
+        # Pillow 레이어가 없으면 축소할 수 없으므로 원본을 그대로 사용 (Rekognition 제한을 넘으면 인식 실패로 처리됨)
+        print("Pillow is not available, passing the original image to Rekognition.")
+        return {"S3Object": {"Bucket": bucket_name, "Name": file_key}}
+
+    resized_key = get_resized_key(file_key)
     try:
-        # 1️. S3 이벤트에서 파일 정보 추출
-        record = event["Records"][0]
-        bucket_name = record["s3"]["bucket"]["name"]
-        file_key = unquote_plus(record["s3"]["object"]["key"])
-        print(f"Reading image from s3://{bucket_name}/{file_key}")
+        s3_client.head_object(Bucket=bucket_name, Key=resized_key)
+        print(f"Reusing resized image: {resized_key}")
+        return {"S3Object": {"Bucket": bucket_name, "Name": resized_key}}
+    except ClientError:
+        pass
+
+    s3_object = s3_client.get_object(Bucket=bucket_name, Key=file_key)
+    resized_bytes = downscale_image(s3_object["Body"].read())
+    # 축소본은 인식에만 쓰므로 pending으로 두어 수명 주기 규칙이 정리하게 합니다.
+    s3_client.put_object(
+        Bucket=bucket_name,
+        Key=resized_key,
+        Body=resized_bytes,
+        ContentType="image/jpeg",
+        Tagging=f"{PENDING_UPLOAD_TAG['Key']}={PENDING_UPLOAD_TAG['Value']}"
+    )
+    print(f"Resized image cached: {resized_key} ({len(resized_bytes)} bytes)")
+    return {"Bytes": resized_bytes}
+
+
+def push_recognition_result(user_id, payload):
+    """사용자의 살아 있는 WebSocket 연결에 인식 결과를 전송합니다. 실패해도 폴링 경로로 조회 가능합니다."""
+    if not (connections_table and apigw_management and user_id):
+        return 0
+
+    try:
+        connections = connections_table.query(
+            IndexName=CONNECTIONS_USER_INDEX,
+            KeyConditionExpression=Key("uuid").eq(user_id)
+        ).get("Items", [])
+    except ClientError as e:
+        print(f"Failed to look up connections for push: {e}")
+        return 0
+
+    sent = 0
+    data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    for connection in connections:
+        connection_id = connection["connectionId"]
+        try:
+            apigw_management.post_to_connection(ConnectionId=connection_id, Data=data)
+            sent += 1
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "GoneException":
+                print(f"Connection {connection_id} is gone, removing it.")
+                connections_table.delete_item(Key={"connectionId": connection_id})
+            else:
+                print(f"Failed to push to {connection_id}: {e}")
+    print(f"Pushed recognition result to {sent} connection(s)")
+    return sent
+
+
+def is_confirmed(bucket_name, file_key):
+    """confirm이 이미 확정한(또는 확정하며 복사한) 객체인지 태그로 확인합니다."""
+    tags = s3_client.get_object_tagging(Bucket=bucket_name, Key=file_key).get("TagSet", [])
+    return any(
+        tag["Key"] == PENDING_UPLOAD_TAG["Key"] and tag["Value"] == CONFIRMED_STATUS
+        for tag in tags
+    )
+
 
-        # 파일명 기반 시나리오 ID
-        scenario_id = os.path.splitext(os.path.basename(file_key))[0]
-        print(f"Scenario ID: {scenario_id}")
+def process_record(record):
+    """S3 이벤트 레코드 하나를 인식해 DynamoDB에 결과를 저장합니다."""
+    bucket_name = record["s3"]["bucket"]["name"]
+    file_key = unquote_plus(record["s3"]["object"]["key"])
+    size_bytes = record["s3"]["object"].get("size")
+    print(f"Reading image from s3://{bucket_name}/{file_key}")
+
+    # 파일명 기반 시나리오 ID
+    scenario_id = os.path.splitext(os.path.basename(file_key))[0]
+    print(f"Scenario ID: {scenario_id}")
+
+    # 확정된 이미지로 생긴 이벤트(레거시 temp-uploads 이동 등)는 다시 인식하지 않습니다.
+    try:
+        if is_confirmed(bucket_name, file_key):
+            print(f"Skipping confirmed upload: {file_key}")
+            return {"scenarioId": scenario_id, "skipped": "confirmed"}
+    except ClientError as e:
+        print(f"Failed to read tags for {file_key}: {e}")
+
+    try:
+        # 확정 전 업로드 표시 (confirm에서 confirmed로 교체)
+        s3_client.put_object_tagging(
+            Bucket=bucket_name,
+            Key=file_key,
+            Tagging={"TagSet": [PENDING_UPLOAD_TAG]}
+        )
 
-        # 2️. S3에서 이미지 바이트 읽기 
-        s3_object = s3_client.get_object(Bucket=bucket_name, Key=file_key)
-        img_bytes = s3_object["Body"].read()
+        # 2️. Rekognition 입력 준비 (S3 직접 참조 또는 축소본)
+        image = prepare_image(bucket_name, file_key, size_bytes)
 
         # 3️. Rekognition 객체 탐지 수행
         labels = rekognition_client.detect_labels(
-            Image={"Bytes": img_bytes},
+            Image=image,
             MaxLabels=2
         )["Labels"]
 
@@ -55,18 +211,13 @@ def lambda_handler(event, context):
         confidence = Decimal(str(selected_label["Confidence"]))
         print(f"Detected object (EN): {detected_name} ({confidence:.2f}%)")
 
-        # 4️. Translate로 한국어 번역
-        translated = translate_client.translate_text(
-            Text=detected_name,
-            SourceLanguageCode="en",
-            TargetLanguageCode="ko"
-        )
-        object_name_kr = translated["TranslatedText"]
-        print(f"Translated object (KR): {object_name_kr}")
+        # 4️. 레이블 사전으로 한국어 변환 (처음 보는 레이블만 Translate 호출)
+        object_name_kr, label_source = translate_label(detected_name)
+        print(f"Translated object (KR): {object_name_kr} (source={label_source})")
 
         # 5️. DynamoDB 업데이트 (영문 + 한글 + 신뢰도 저장)
         table = dynamodb.Table(TABLE_NAME)
-        table.update_item(
+        updated = table.update_item(
             Key={"scenarioId": scenario_id},
             UpdateExpression=(
                 "SET recognizedWord = :rw, recognizedWordEn = :rwe, "
@@ -78,37 +229,62 @@ def lambda_handler(event, context):
                 ":rwe": detected_name,
                 ":st": "COMPLETED",
                 ":cf": confidence
-            }
-        )
+            },
+            ReturnValues="ALL_NEW"
+        )["Attributes"]
 
-        # 6️. Lambda 응답
-        return {
-            "statusCode": 200,
-            "body": json.dumps(
-                {
-                    "scenarioId": scenario_id,
-                    "recognizedWord": object_name_kr,
-                    "recognizedWordEn": detected_name,
-                    "confidence": round(float(confidence), 2),
-                    "fileKey": file_key,
-                },
-                ensure_ascii=False,
-            ),
+        result = {
+            "scenarioId": scenario_id,
+            "recognizedWord": object_name_kr,
+            "recognizedWordEn": detected_name,
+            "confidence": round(float(confidence), 2),
+            "fileKey": file_key,
         }
 
+        # 6️. 클라이언트에 WebSocket으로 결과 전송 (폴링 대체)
+        push_recognition_result(
+            updated.get("userId"),
+            {"action": "recognitionResult", "status": "COMPLETED", **result}
+        )
+
+        # 7️. 레코드 처리 결과
+        return result
+
     except Exception as e:
         print(f"Error occurred: {e}")
 
         # 실패 시 DynamoDB 상태 업데이트
         try:
             table = dynamodb.Table(TABLE_NAME)
-            table.update_item(
+            updated = table.update_item(
                 Key={"scenarioId": scenario_id},
                 UpdateExpression="SET #st = :st",
                 ExpressionAttributeNames={"#st": "status"},
                 ExpressionAttributeValues={":st": "FAILED"},
+                ReturnValues="ALL_NEW"
+            )["Attributes"]
+            push_recognition_result(
+                updated.get("userId"),
+                {"action": "recognitionResult", "status": "FAILED", "scenarioId": scenario_id}
             )
         except Exception as inner_e:
             print(f"Failed to update DynamoDB with error status: {inner_e}")
 
-        return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
+        return {"scenarioId": scenario_id, "error": str(e)}
+
+
+def lambda_handler(event, context):
+    # 1️. S3 이벤트의 모든 레코드 처리 (사진 업로드가 아닌 객체와 축소본 캐시는 건너뜀)
+    results = []
+    for record in event.get("Records", []):
+        file_key = unquote_plus(record["s3"]["object"]["key"])
+        if not is_upload_key(file_key):
+            print(f"Skipping non-upload object: {file_key}")
+            continue
+        results.append(process_record(record))
+
+    failed = [r for r in results if "error" in r]
+    return {
+        "statusCode": 500 if failed else 200,
+        "body": json.dumps(results, ensure_ascii=False),
+    }
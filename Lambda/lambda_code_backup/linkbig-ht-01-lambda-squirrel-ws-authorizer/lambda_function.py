@@ -1,12 +1,13 @@
-import json
 import os
-from db import get_connection
+from db import get_cursor
+from log_utils import get_logger
 
-def lambda_handler(event, context):
+logger = get_logger("WS Authorizer")
 
-    print("--- ws-authorizer started ---")
+def lambda_handler(event, context):
 
-    print(f"[WS Authorizer] Incoming event: {json.dumps(event, ensure_ascii=False)}")
+    logger.start_request(context)
+    logger.debug("Incoming event", event=event)
 
     # --- [수정됨] 헤더와 쿼리 파라미터에서 UUID 동시 확인 ---
 
@@ -21,11 +22,11 @@ def lambda_handler(event, context):
         user_uuid = query_params.get("user_uuid")
         source = "query params"
 
-    print(f"[WS Authorizer] Received UUID from {source}: {user_uuid}")
+    logger.debug("Received UUID from %s: %s", source, user_uuid)
     
     # --- [수정됨] 3. 두 곳 모두 uuid가 없으면 인증 거부 ---
     if not user_uuid:
-        print("[WS Authorizer] No user_uuid in headers or query params. Denying.")
+        logger.info("No user_uuid in headers or query params. Denying.")
         return generate_policy(
             principal_id="anonymous",
             effect="Deny",
@@ -33,18 +34,16 @@ def lambda_handler(event, context):
             reason="Missing user_uuid"
         )
 
-    connection = None
     cursor = None
     try:
         # 4. 데이터베이스 연결 및 사용자 정보 조회
-        connection = get_connection()
-        cursor = connection.cursor(dictionary=True)
+        cursor = get_cursor(dictionary=True)
         cursor.execute("SELECT gender, nickname FROM user WHERE uuid = %s", (user_uuid,))
         user = cursor.fetchone()
-        print(f"[WS Authorizer] DB Query Result: {user}")
+        logger.debug("DB Query Result", user=user)
 
         if not user:
-            print(f"[WS Authorizer] No user found for UUID {user_uuid}")
+            logger.info("No user found for UUID %s", user_uuid)
             return generate_policy(
                 principal_id=user_uuid,
                 effect="Deny",
@@ -60,7 +59,7 @@ def lambda_handler(event, context):
         gender_for_context = "female" if gender_from_db == "F" else "male"
         
         if gender_from_db not in ("M", "F"):
-             print(f"[WS Authorizer] Warning: Unexpected gender '{gender_from_db}', defaulting to 'male'.")
+             logger.warning("Unexpected gender '%s', defaulting to 'male'.", gender_from_db)
 
         # 6. 인증 성공 정책 생성 및 반환
         # context에 포함된 정보는 후속 Lambda 함수(onConnect, onMessage 등)에서 사용 가능합니다.
@@ -78,7 +77,7 @@ def lambda_handler(event, context):
 
     except Exception as e:
         # 오류 발생 시 인증 거부
-        print(f"[WS Authorizer] Error: {e}")
+        logger.error("Error: %s", e)
         return generate_policy(
             principal_id="anonymous",
             effect="Deny",
@@ -87,11 +86,9 @@ def lambda_handler(event, context):
         )
 
     finally:
-        # 7. 데이터베이스 연결 해제
-        if connection and connection.is_connected():
-            if cursor:
-                cursor.close()
-            connection.close()
+        # 커넥션은 컨테이너 단위로 재사용하므로 커서만 닫습니다.
+        if cursor:
+            cursor.close()
 
 def generate_policy(principal_id, effect, resource, reason="", extra_context=None):
     """API Gateway가 요구하는 형식의 정책 문서를 생성하는 헬퍼 함수"""
@@ -111,5 +108,5 @@ def generate_policy(principal_id, effect, resource, reason="", extra_context=Non
         },
         "context": context
     }
-    print(f"[WS Authorizer] Generated policy: {json.dumps(policy, ensure_ascii=False)}")
+    logger.debug("Generated policy", policy=policy)
     return policy
\ No newline at end of file